@@ -0,0 +1,51 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Records.Parsers import parse_name, reformat_dict
+from src.Records.RecordStore import RecordStore
+from synthetic import synthetic_filenames
+
+
+def measure(build, count):
+    started = time.perf_counter()
+    build(count)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    result = build(count)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained, peak, elapsed
+
+
+def build_dicts(count):
+    return reformat_dict([parse_name(filename, folder) for folder, filename in synthetic_filenames(count)])
+
+
+def build_store(count):
+    return RecordStore.from_parsed(parse_name(filename, folder) for folder, filename in synthetic_filenames(count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare memory of list-of-dicts records and RecordStore')
+    parser.add_argument('--count', type=int, default=1000000)
+    args = parser.parse_args()
+
+    print(f"{'layout':<16}{'retained MiB':>14}{'peak MiB':>12}{'bytes/entry':>14}{'seconds':>10}")
+    for name, build in [('list of dicts', build_dicts), ('RecordStore', build_store)]:
+        retained, peak, elapsed = measure(build, args.count)
+        print(f"{name:<16}{retained / 2 ** 20:>14.1f}{peak / 2 ** 20:>12.1f}"
+              f"{retained / args.count:>14.1f}{elapsed:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
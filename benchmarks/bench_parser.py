@@ -0,0 +1,143 @@
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Loaders.Scanner import build_stores, find_instances, load_store
+from src.Records.Parsers import parse_name
+from synthetic import synthetic_filenames
+
+
+def baseline_parse_names(listing):
+    parsed_files = []
+    for subfolder, files in listing:
+        for filename in sorted(files):
+            parts = filename.split(',')
+            file_dict = {}
+
+            for part in parts:
+                key_value = part.split(':')
+                if len(key_value) == 2:
+                    key, value = key_value[0].strip(), key_value[1].strip()
+
+                    if key in ['id', 'time', 'execs', 'rep']:
+                        try:
+                            value = int(value)
+                        except ValueError:
+                            pass
+
+                    if key == 'src':
+                        if '+' in value:
+                            try:
+                                value = [int(v) for v in value.split('+')]
+                            except ValueError:
+                                value = [value]
+                        else:
+                            try:
+                                value = [int(value)]
+                            except ValueError:
+                                value = [value]
+
+                    file_dict[key] = value
+            file_dict['filename'] = filename
+            file_dict['folder'] = subfolder
+            parsed_files.append(file_dict)
+
+    return parsed_files
+
+
+def baseline_reformat_dict(parsed_files):
+    id_to_element = {file_dict.get('id'): file_dict for file_dict in parsed_files}
+
+    for file_dict in parsed_files:
+        src_values = file_dict.get('src')
+        if not src_values or file_dict.get('folder') in ['crashes', 'hangs']:
+            continue
+
+        for src_value in src_values:
+            try:
+                parent_element = id_to_element.get(src_value)
+                if parent_element:
+                    parent_element.setdefault('children', []).append(file_dict['id'])
+            except Exception as e:
+                print(f"Error when adding a child to a parent item: {e}")
+
+    return parsed_files
+
+
+def baseline_load(listing):
+    return baseline_reformat_dict(baseline_parse_names(listing))
+
+
+def baseline_listing(folder_path):
+    listing = []
+    for subfolder in ['queue', 'crashes', 'hangs']:
+        subfolder_path = os.path.join(folder_path, subfolder)
+        if os.path.isdir(subfolder_path):
+            listing.append((subfolder, os.listdir(subfolder_path)))
+    return listing
+
+
+def baseline_load_dir(folder_path):
+    return [baseline_load(baseline_listing(os.path.join(folder_path, instance)))
+            for instance in find_instances(folder_path)]
+
+
+def fast_parse(listing):
+    return [parse_name(filename, subfolder) for subfolder, names in listing for filename in sorted(names)]
+
+
+def timed(label, function, *args, repeat=3):
+    elapsed = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        gc.disable()
+        started = time.perf_counter()
+        result = function(*args)
+        run_time = time.perf_counter() - started
+        gc.enable()
+        elapsed = run_time if elapsed is None else min(elapsed, run_time)
+    print(f"{label:<34}{elapsed:>10.2f} s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the filename parser and store build against the original '
+                                                 'parse_filename + reformat_dict')
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--dir', help='also benchmark scanning a real AFL++ output directory')
+    args = parser.parse_args()
+
+    names = {}
+    for subfolder, filename in synthetic_filenames(args.count):
+        names.setdefault(subfolder, []).append(filename)
+    listing = list(names.items())
+
+    baseline, baseline_time = timed('baseline parse_filename', baseline_parse_names, listing)
+    fast, fast_time = timed('parse_name', fast_parse, listing)
+    if baseline != fast:
+        print("Error: parse_name results differ from the baseline parse_filename")
+        sys.exit(1)
+    del baseline, fast
+    print(f"{'parse_name speedup':<34}{baseline_time / fast_time:>10.2f} x")
+
+    _, baseline_load_time = timed('parse_filename + reformat_dict', baseline_load, listing)
+    _, serial_time = timed('build_stores, 1 worker', build_stores, [listing], 1)
+    workers = args.workers or os.cpu_count() or 1
+    print(f"{'store speedup, 1 worker':<34}{baseline_load_time / serial_time:>10.2f} x")
+    if workers > 1:
+        _, parallel_time = timed(f"build_stores, {workers} workers", build_stores, [listing], workers)
+        print(f"{'store speedup, parallel':<34}{baseline_load_time / parallel_time:>10.2f} x")
+
+    if args.dir:
+        _, baseline_dir_time = timed('baseline directory load', baseline_load_dir, args.dir)
+        _, store_dir_time = timed('load_store directory', load_store, args.dir, args.workers)
+        print(f"{'directory speedup':<34}{baseline_dir_time / store_dir_time:>10.2f} x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from src.FilterWidgets.Filters import Filter
+from src.Loaders.IndexCache import folder_states, load_store_cached, write_index
+from src.Loaders.Scanner import find_instances, load_store
+from src.Records.Lineage import Lineage
+from src.ShowWidgets.DiffWidgets import diff_parents
+from src.ShowWidgets.DumpCache import DumpCache
+from src.ShowWidgets.DumpWidgets import DumpWidgets
+from bench_parser import baseline_listing, baseline_parse_names, baseline_reformat_dict
+from synthetic import add_generator_arguments, generator_from_args
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+NOISE_FLOOR = 0.002
+LOOKUPS = 1000
+SEARCHES = 50
+DUMPS = 50
+QUERIES = ['op:havoc', 'folder:crashes', 'time>3600000 op:splice', 'depth>=4', 'src:1,2,3']
+STAGE_GROUPS = ['load', 'tree', 'lookup', 'search', 'dump']
+
+
+def best_time(function, *args, repeat=3):
+    best = result = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        gc.disable()
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - started
+        gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def file_path(folder_path, store, record):
+    return os.path.join(folder_path, store.subfolder(record), store.filename(record))
+
+
+class Suite:
+    def __init__(self, folder_path, repeat=3, workers=1, seed=0):
+        self.folder_path = folder_path
+        self.repeat = repeat
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.results = {}
+        self.store = None
+        self.app = None
+
+    def measure(self, stage, function, *args):
+        result, elapsed = best_time(function, *args, repeat=self.repeat)
+        self.results[stage] = elapsed
+        print(f"{stage:<32}{elapsed * 1000:>12.2f} ms")
+        return result
+
+    def sample(self, count):
+        return [self.rng.randrange(len(self.store)) for _ in range(count)]
+
+    def ensure_store(self):
+        if self.store is None:
+            self.store = load_store(self.folder_path, self.workers)
+        return self.store
+
+    def run_load(self):
+        if find_instances(self.folder_path) == ['']:
+            listing = baseline_listing(self.folder_path)
+            parsed = self.measure('load.parse_filename', baseline_parse_names, listing)
+            self.measure('load.reformat_dict', baseline_reformat_dict, parsed)
+            del parsed
+        self.store = self.measure('load.load_store', load_store, self.folder_path, self.workers)
+        self.measure('load.lineage', lambda: Lineage(self.store).update())
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            index_path = os.path.join(temp_dir, 'index')
+            states = folder_states(self.folder_path)
+            self.measure('load.index_write', write_index, self.store, self.folder_path, states, index_path)
+            self.measure('load.index_read', load_store_cached, self.folder_path, self.workers, index_path)
+
+    def run_tree(self):
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtWidgets import QApplication
+        import main
+
+        store = self.ensure_store()
+        self.app = QApplication.instance() or QApplication([])
+        window = self.measure('tree.window', main.MainWindow, store, self.folder_path, False, False)
+        self.measure('tree.populate_tree', window.populate_tree, store)
+
+        def show():
+            window.show()
+            self.app.processEvents()
+            window.hide()
+        self.measure('tree.first_paint', show)
+
+        records = self.sample(LOOKUPS // 10)
+        self.measure('lookup.index_for_record', lambda: [window.tree_model.index_for_record(record)
+                                                         for record in records])
+
+        model = window.tree_model
+        fanout = max(range(len(store)), key=store.child_count)
+        window.tree.expand(model.index_for_record(fanout))
+
+        def resort():
+            for column in (3, 4, 5, 7):
+                model.sort(column, Qt.DescendingOrder)
+            model.sort(0, Qt.AscendingOrder)
+        self.measure('tree.resort_fanout', resort)
+        window.close()
+
+    def run_lookup(self):
+        store = self.ensure_store()
+        keys = [(store.folder(record), store.id(record), store.instance(record)) for record in self.sample(LOOKUPS)]
+        self.measure('lookup.record_for', lambda: [store.record_for(*key) for key in keys])
+
+    def run_search(self):
+        store = self.ensure_store()
+        filters = Filter(store)
+        self.measure('search.build_indexes', lambda: [Filter(store).query(query) for query in QUERIES])
+        ids = [str(store.id(record)) for record in self.sample(SEARCHES)]
+        self.measure('search.search_by_id', lambda: [filters.search_by_id(item_id) for item_id in ids])
+        filters.query(' '.join(QUERIES))
+        self.measure('search.query', lambda: [filters.query(query) for query in QUERIES])
+
+    def run_dump(self):
+        store = self.ensure_store()
+        paths = [file_path(self.folder_path, store, record) for record in self.sample(DUMPS)]
+
+        def dump_cold():
+            dump_widgets = DumpWidgets(DumpCache())
+            for path in paths:
+                hex_dump = dump_widgets.generate_hex_dump(path)
+                if not isinstance(hex_dump, str):
+                    hex_dump.close()
+            dump_widgets.shutdown()
+        self.measure('dump.generate_hex_dump', dump_cold)
+
+        pairs = []
+        for record in self.sample(DUMPS * 4):
+            parents = [(file_path(self.folder_path, store, parent), '') for parent in store.src_records(record)]
+            if parents:
+                pairs.append((file_path(self.folder_path, store, record), parents))
+            if len(pairs) == DUMPS:
+                break
+
+        def diff_all():
+            for path, parents in pairs:
+                for diff in diff_parents(path, parents):
+                    if not isinstance(diff, str):
+                        diff.close()
+        self.measure('dump.diff_parents', diff_all)
+
+    def run(self, groups):
+        for group in groups:
+            getattr(self, f'run_{group}')()
+        return self.results
+
+
+def read_baseline(baseline_path):
+    if not os.path.isfile(baseline_path):
+        return {}
+    try:
+        with open(baseline_path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading baseline '{baseline_path}': {e}")
+        return {}
+
+
+def write_baseline(baseline_path, baseline):
+    with open(baseline_path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, reference, threshold):
+    regressions = []
+    print(f"\n{'stage':<32}{'ms':>12}{'baseline':>12}{'change':>10}")
+    for stage, elapsed in results.items():
+        previous = reference.get(stage)
+        if previous is None:
+            print(f"{stage:<32}{elapsed * 1000:>12.2f}{'-':>12}{'new':>10}")
+            continue
+        change = elapsed / previous - 1 if previous else 0
+        regressed = change > threshold and elapsed - previous > NOISE_FLOOR
+        marker = '  REGRESSION' if regressed else ''
+        print(f"{stage:<32}{elapsed * 1000:>12.2f}{previous * 1000:>12.2f}{change:>+10.0%}{marker}")
+        if regressed:
+            regressions.append(stage)
+    return regressions
+
+
+def config_key(args):
+    if args.dir:
+        return f"dir:{os.path.basename(os.path.normpath(args.dir))}"
+    return (f"count={args.count},instances={args.instances},fanout={args.fanout},"
+            f"max_size={args.max_size},seed={args.seed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark load, tree, lookup, search and dump stages '
+                                                 'against a saved baseline')
+    add_generator_arguments(parser)
+    parser.add_argument('--dir', help='benchmark an existing output directory instead of generating one')
+    parser.add_argument('--stages', default=','.join(STAGE_GROUPS),
+                        help=f"comma-separated stage groups ({', '.join(STAGE_GROUPS)})")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1, help='parser processes for load_store')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='fail when a stage is slower than the baseline by more than this fraction')
+    parser.add_argument('--save', action='store_true', help='record the results as the new baseline')
+    args = parser.parse_args()
+
+    groups = [group for group in args.stages.split(',') if group]
+    unknown = [group for group in groups if group not in STAGE_GROUPS]
+    if unknown:
+        parser.error(f"unknown stage group '{unknown[0]}'")
+
+    temp_dir = None
+    folder_path = args.dir
+    if folder_path is None:
+        temp_dir = tempfile.mkdtemp(prefix='afl-bench-')
+        folder_path = os.path.join(temp_dir, 'out')
+        started = time.perf_counter()
+        generator_from_args(args).write(folder_path)
+        print(f"Generated {args.count} entries in {time.perf_counter() - started:.1f} s\n")
+
+    try:
+        results = Suite(folder_path, args.repeat, args.workers, args.seed).run(groups)
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    key = config_key(args)
+    baseline = read_baseline(args.baseline)
+    regressions = compare(results, baseline.get(key, {}), args.threshold)
+    if args.save:
+        baseline.setdefault(key, {}).update(results)
+        write_baseline(args.baseline, baseline)
+        print(f"\nSaved baseline for {key} to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+import argparse
+import os
+import random
+import re
+import sys
+
+import numpy as np
+
+OP_WEIGHTS = {'havoc': 50, 'flip1': 6, 'flip2': 3, 'flip4': 2, 'arith8': 6, 'arith16': 2, 'int8': 4, 'int16': 3,
+              'ext_UO': 2, 'quick': 8, 'colorization': 4}
+SIGNALS = ['11', '06', '08', '07']
+SEED_COUNT = 16
+MAX_FLIPS = 8
+PLOT_INTERVAL = 5
+MAP_SIZE = 65536
+PLOT_HEADER = ('# relative_time, cycles_done, cur_item, corpus_count, pending_total, pending_favs, map_size, '
+               'saved_crashes, saved_hangs, max_depth, execs_per_sec, total_execs, edges_found\n')
+TIME_PATTERN = re.compile(r'time:([0-9]+)')
+
+
+def parse_ops(value):
+    weights = {}
+    for part in value.split(','):
+        op, _, weight = part.partition(':')
+        try:
+            weights[op] = float(weight) if weight else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad weight in '{part}', expected op:weight")
+    return weights
+
+
+def instance_names(instances):
+    if instances <= 1:
+        return ['']
+    return ['main'] + [f'secondary{number:02d}' for number in range(1, instances)]
+
+
+class OutputGenerator:
+    def __init__(self, count, instances=1, fanout=4.0, splice_ratio=0.1, op_weights=OP_WEIGHTS, fault_ratio=0.02,
+                 hang_ratio=0.25, sync_ratio=0.05, min_size=16, max_size=4096, seed=0, with_content=True):
+        self.count = count
+        self.instances = instance_names(instances)
+        self.fanout = max(fanout, 1.0)
+        self.splice_ratio = splice_ratio
+        self.ops = [op for op in op_weights if op != 'splice']
+        self.op_weights = [op_weights[op] for op in self.ops]
+        self.fault_ratio = fault_ratio
+        self.hang_ratio = hang_ratio
+        self.sync_ratio = sync_ratio if len(self.instances) > 1 else 0
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.with_content = with_content
+        self.rng = random.Random(seed)
+
+        self.next_ids = {(instance, folder): 0 for instance in self.instances for folder in ('queue', 'crashes', 'hangs')}
+        self.parents = {instance: [] for instance in self.instances}
+        self.elapsed = {instance: 0 for instance in self.instances}
+
+    def entry_size(self):
+        return min(int(self.min_size * (self.max_size / self.min_size) ** self.rng.random() ** 2), self.max_size)
+
+    def take_id(self, instance, folder):
+        item_id = self.next_ids[(instance, folder)]
+        self.next_ids[(instance, folder)] = item_id + 1
+        return item_id
+
+    def mutate(self, content):
+        rng = self.rng
+        data = bytearray(content)
+        if rng.random() < 0.3:
+            position = rng.randrange(len(data) + 1)
+            data[position:position] = rng.randbytes(rng.randrange(1, 16))
+        for _ in range(rng.randrange(1, MAX_FLIPS)):
+            if data:
+                data[rng.randrange(len(data))] = rng.randrange(256)
+        return bytes(data[:self.max_size])
+
+    def stamp(self, instance):
+        self.elapsed[instance] += self.rng.randrange(1, 2000)
+        time_ms = self.elapsed[instance]
+        return f"time:{time_ms},execs:{time_ms * self.rng.randrange(200, 2000)}"
+
+    def seed_entry(self, instance, number):
+        item_id = self.take_id(instance, 'queue')
+        content = self.rng.randbytes(self.entry_size()) if self.with_content else b''
+        self.parents[instance].append((item_id, content))
+        return instance, 'queue', f"id:{item_id:06d},time:0,execs:0,orig:seed{number:03d}", content
+
+    def derived_entry(self, instance):
+        rng = self.rng
+        parents = self.parents[instance]
+        parent_id, parent_content = rng.choice(parents)
+        src = f"{parent_id:06d}"
+        if rng.random() < self.splice_ratio:
+            other_id, other_content = rng.choice(parents)
+            src += f"+{other_id:06d}"
+            if self.with_content:
+                cut = rng.randrange(len(parent_content) + 1)
+                parent_content = parent_content[:cut] + other_content[rng.randrange(len(other_content) + 1):]
+            op = 'splice'
+        else:
+            op = rng.choices(self.ops, self.op_weights)[0]
+        content = self.mutate(parent_content or rng.randbytes(self.min_size)) if self.with_content else b''
+        tail = f"op:{op},rep:{2 ** rng.randrange(7)}"
+
+        if rng.random() < self.fault_ratio:
+            if rng.random() < self.hang_ratio:
+                folder, prefix = 'hangs', ''
+            else:
+                folder, prefix = 'crashes', f",sig:{rng.choice(SIGNALS)}"
+            item_id = self.take_id(instance, folder)
+            return instance, folder, f"id:{item_id:06d}{prefix},src:{src},{self.stamp(instance)},{tail}", content
+
+        item_id = self.take_id(instance, 'queue')
+        name = f"id:{item_id:06d},src:{src},{self.stamp(instance)},{tail}"
+        if rng.random() < 0.2:
+            name += ',+cov'
+        if rng.random() < 1 / self.fanout:
+            parents.append((item_id, content))
+        return instance, 'queue', name, content
+
+    def synced_entry(self, instance):
+        other = self.rng.choice([name for name in self.instances if name != instance])
+        source_id, content = self.rng.choice(self.parents[other])
+        item_id = self.take_id(instance, 'queue')
+        if self.rng.random() < 1 / self.fanout:
+            self.parents[instance].append((item_id, content))
+        return instance, 'queue', f"id:{item_id:06d},sync:{other},src:{source_id:06d}", content
+
+    def entries(self):
+        produced = 0
+        for instance in self.instances:
+            for number in range(min(SEED_COUNT, self.count - produced)):
+                produced += 1
+                yield self.seed_entry(instance, number)
+        while produced < self.count:
+            instance = self.rng.choice(self.instances)
+            if self.rng.random() < self.sync_ratio:
+                yield self.synced_entry(instance)
+            else:
+                yield self.derived_entry(instance)
+            produced += 1
+
+    def names(self):
+        for instance, folder, name, _ in self.entries():
+            yield os.path.join(instance, folder), name
+
+    def write(self, folder_path, plot_interval=PLOT_INTERVAL):
+        created = set()
+        found = {(instance, folder): [] for instance in self.instances for folder in ('queue', 'crashes', 'hangs')}
+        for instance, folder, name, content in self.entries():
+            subfolder_path = os.path.join(folder_path, instance, folder)
+            if subfolder_path not in created:
+                os.makedirs(subfolder_path, exist_ok=True)
+                created.add(subfolder_path)
+            with open(os.path.join(subfolder_path, name), 'wb') as f:
+                f.write(content)
+            match = TIME_PATTERN.search(name)
+            if match:
+                found[(instance, folder)].append(int(match.group(1)))
+        for instance in self.instances:
+            for folder in ('queue', 'crashes', 'hangs'):
+                os.makedirs(os.path.join(folder_path, instance, folder), exist_ok=True)
+            self.write_stats(os.path.join(folder_path, instance), *(found[(instance, folder)]
+                                                                    for folder in ('queue', 'crashes', 'hangs')),
+                             plot_interval)
+
+    def write_stats(self, instance_path, queue_times, crash_times, hang_times, plot_interval):
+        rng = np.random.default_rng(self.rng.randrange(2 ** 32))
+        run_time = max(max(queue_times + crash_times + hang_times, default=0) // 1000, 1) + plot_interval
+        seconds = np.arange(0, run_time, plot_interval)
+        corpus = np.searchsorted(np.sort(queue_times), seconds * 1000, 'right')
+        crashes = np.searchsorted(np.sort(crash_times), seconds * 1000, 'right')
+        hangs = np.searchsorted(np.sort(hang_times), seconds * 1000, 'right')
+        edges = np.minimum((np.log1p(corpus) * 600).astype(np.int64), MAP_SIZE)
+        speed = np.clip(rng.normal(2000, 300, len(seconds)), 50, None)
+        total_execs = np.cumsum(speed * plot_interval).astype(np.int64)
+        cycles = total_execs // max(len(queue_times), 1) // 5000
+        pending = np.maximum(corpus - (seconds // 60), 0)
+
+        with open(os.path.join(instance_path, 'plot_data'), 'w') as f:
+            f.write(PLOT_HEADER)
+            for row in range(len(seconds)):
+                f.write(f"{seconds[row]}, {cycles[row]}, {corpus[row] // 2}, {corpus[row]}, {pending[row]}, "
+                        f"{pending[row] // 8}, {edges[row] * 100 / MAP_SIZE:.2f}%, {crashes[row]}, {hangs[row]}, "
+                        f"{int(np.log2(corpus[row] + 1))}, {speed[row]:.2f}, {total_execs[row]}, {edges[row]}\n")
+
+        with open(os.path.join(instance_path, 'fuzzer_stats'), 'w') as f:
+            stats = {'start_time': 1700000000, 'last_update': 1700000000 + int(seconds[-1]),
+                     'run_time': int(seconds[-1]), 'fuzzer_pid': 4242, 'cycles_done': int(cycles[-1]),
+                     'execs_done': int(total_execs[-1]), 'execs_per_sec': f"{speed[-1]:.2f}",
+                     'corpus_count': int(corpus[-1]), 'pending_total': int(pending[-1]),
+                     'bitmap_cvg': f"{edges[-1] * 100 / MAP_SIZE:.2f}%", 'saved_crashes': int(crashes[-1]),
+                     'saved_hangs': int(hangs[-1]), 'edges_found': int(edges[-1]), 'total_edges': MAP_SIZE,
+                     'afl_banner': os.path.basename(instance_path) or 'target', 'afl_version': '++4.10c'}
+            for key, value in stats.items():
+                f.write(f"{key:<18}: {value}\n")
+
+
+def synthetic_filenames(count, seed=0):
+    return OutputGenerator(count, seed=seed, with_content=False).names()
+
+
+def add_generator_arguments(parser):
+    parser.add_argument('--count', type=int, default=100000, help='number of entries across all instances')
+    parser.add_argument('--instances', type=int, default=1, help='number of fuzzer instances (main + secondaries)')
+    parser.add_argument('--fanout', type=float, default=4.0, help='mean number of children per productive parent')
+    parser.add_argument('--splice-ratio', type=float, default=0.1, help='share of entries produced by splicing')
+    parser.add_argument('--ops', type=parse_ops, default=OP_WEIGHTS, help='op mix, e.g. havoc:5,flip1:1,quick:2')
+    parser.add_argument('--fault-ratio', type=float, default=0.02, help='share of entries that are crashes or hangs')
+    parser.add_argument('--hang-ratio', type=float, default=0.25, help='share of faults that are hangs')
+    parser.add_argument('--sync-ratio', type=float, default=0.05,
+                        help='share of queue entries synced from another instance')
+    parser.add_argument('--min-size', type=int, default=16, help='smallest input size in bytes')
+    parser.add_argument('--max-size', type=int, default=4096, help='largest input size in bytes')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def generator_from_args(args):
+    return OutputGenerator(args.count, args.instances, args.fanout, args.splice_ratio, args.ops, args.fault_ratio,
+                           args.hang_ratio, args.sync_ratio, args.min_size, args.max_size, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic AFL++ output directory')
+    parser.add_argument('folder_path')
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    if os.path.exists(args.folder_path) and os.listdir(args.folder_path):
+        print(f"Error: '{args.folder_path}' is not empty")
+        sys.exit(1)
+    generator_from_args(args).write(args.folder_path)
+    print(f"Wrote {args.count} entries to {args.folder_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import csv
+import heapq
+import json
+import os
+import sys
+from collections import Counter
+from contextlib import redirect_stdout
+
+from src.Profiling.Instruments import INSTRUMENTS
+
+RECORD_FIELDS = ['instance', 'folder', 'id', 'src', 'sync', 'time', 'execs', 'op', 'rep', 'orig', 'depth',
+                 'children', 'descendants', 'faults', 'filename']
+
+
+def open_store(args):
+    from src.Loaders.Archives import is_archive
+    from src.Loaders.IndexCache import load_store_cached
+    from src.Loaders.Scanner import load_store
+
+    with redirect_stdout(sys.stderr):
+        if args.no_index or is_archive(args.folder_path):
+            return load_store(args.folder_path, args.workers)
+        return load_store_cached(args.folder_path, args.workers)
+
+
+def named_counts(counter, names):
+    return {names[code]: count for code, count in counter.most_common()}
+
+
+def collect_stats(store, filters, top):
+    from src.Records.RecordStore import FOLDERS, QUEUE_CODE
+
+    depths = filters.column('depth')
+    queue_depths = [depth for depth, folder in zip(depths, store.folders) if folder == QUEUE_CODE]
+    lineage = filters.lineage
+    top_parents = heapq.nlargest(top, range(len(store)), key=lineage.sizes.__getitem__)
+
+    return {
+        'entries': len(store),
+        'skipped': len(store.skipped),
+        'folders': named_counts(Counter(store.folders), FOLDERS),
+        'instances': named_counts(Counter(store.instances), store.instance_list()),
+        'ops': named_counts(Counter(store.ops), ['none' if value is None else value for value in store.strings.values]),
+        'depth': {
+            'max': max(queue_depths, default=0),
+            'mean': round(sum(queue_depths) / len(queue_depths), 2) if queue_depths else 0,
+            'histogram': dict(sorted(Counter(queue_depths).items())),
+        },
+        'top_parents': [record_row(store, filters, record, ['instance', 'folder', 'id', 'children', 'descendants',
+                                                            'faults'])
+                        for record in top_parents if lineage.descendants(record)],
+    }
+
+
+def record_row(store, filters, record, fields):
+    row = {}
+    for field in fields:
+        if field == 'depth':
+            row[field] = filters.column('depth')[record]
+        elif field == 'children':
+            row[field] = store.child_count(record)
+        elif field == 'descendants':
+            row[field] = filters.lineage.descendants(record)
+        elif field == 'faults':
+            row[field] = filters.lineage.fault_count(record)
+        else:
+            row[field] = store.get(record, field)
+    return row
+
+
+def write_stats_csv(stats, output):
+    writer = csv.writer(output)
+    writer.writerow(['section', 'key', 'value'])
+    for section in ('entries', 'skipped'):
+        writer.writerow([section, '', stats[section]])
+    for section in ('folders', 'instances', 'ops'):
+        for key, value in stats[section].items():
+            writer.writerow([section, key, value])
+    writer.writerow(['depth', 'max', stats['depth']['max']])
+    writer.writerow(['depth', 'mean', stats['depth']['mean']])
+    for depth, count in stats['depth']['histogram'].items():
+        writer.writerow(['depth_histogram', depth, count])
+    for row in stats['top_parents']:
+        writer.writerow(['top_parents', f"{row['instance']}/{row['folder']}:{row['id']}".lstrip('/'),
+                         row['descendants']])
+
+
+def write_records(store, filters, records, fields, output_format, output):
+    if output_format == 'csv':
+        writer = csv.writer(output)
+        writer.writerow(fields)
+        for record in records:
+            row = record_row(store, filters, record, fields)
+            if isinstance(row.get('src'), list):
+                row['src'] = '+'.join(map(str, row['src']))
+            writer.writerow(['' if row[field] is None else row[field] for field in fields])
+    else:
+        for record in records:
+            output.write(json.dumps(record_row(store, filters, record, fields)))
+            output.write('\n')
+
+
+def run_stats(args, store, filters):
+    stats = collect_stats(store, filters, args.top)
+    if args.format == 'csv':
+        write_stats_csv(stats, sys.stdout)
+    else:
+        json.dump(stats, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+def run_export(args, store, filters):
+    records = range(len(store))
+    if args.query:
+        records = filters.query(args.query)
+    write_records(store, filters, records, args.fields, args.format, sys.stdout)
+
+
+def run_query(args, store, filters):
+    write_records(store, filters, filters.query(args.query), args.fields, args.format, sys.stdout)
+
+
+def field_list(value):
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in RECORD_FIELDS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown field '{unknown[0]}', expected one of {', '.join(RECORD_FIELDS)}")
+    return fields
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Headless analysis of AFL++ output directories')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('folder_path')
+    common.add_argument('--format', choices=['json', 'csv'], default='json')
+    common.add_argument('--workers', type=int, help='processes used to parse large or multi-instance outputs')
+    common.add_argument('--no-index', action='store_true', help='rescan everything instead of using the saved index')
+    common.add_argument('--profile', metavar='TRACE', help='record timings and write a Chrome trace (JSON) to TRACE')
+    common.add_argument('--cprofile', metavar='STATS', help='also write cProfile statistics to STATS')
+
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    stats = commands.add_parser('stats', parents=[common], help='counts per folder/instance/op, depth, top parents')
+    stats.add_argument('--top', type=int, default=10, help='number of most productive parents to list')
+    stats.set_defaults(run=run_stats)
+
+    export = commands.add_parser('export', parents=[common], help='one row per entry (JSON lines or CSV)')
+    export.add_argument('--query', help='only export entries matching a filter query')
+    export.add_argument('--fields', type=field_list, default=RECORD_FIELDS)
+    export.set_defaults(run=run_export)
+
+    query = commands.add_parser('query', parents=[common], help='entries matching a filter query, e.g. "op:havoc depth>3"')
+    query.add_argument('query')
+    query.add_argument('--fields', type=field_list, default=RECORD_FIELDS)
+    query.set_defaults(run=run_query)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.profile and not args.cprofile:
+        return run(args)
+
+    INSTRUMENTS.enable(cprofile=bool(args.cprofile))
+    try:
+        return run(args)
+    finally:
+        INSTRUMENTS.disable()
+        with redirect_stdout(sys.stderr):
+            if args.profile:
+                INSTRUMENTS.write_trace(args.profile)
+            if args.cprofile:
+                INSTRUMENTS.write_profile(args.cprofile)
+
+
+def run(args):
+    from src.FilterWidgets.Filters import Filter
+
+    try:
+        store = open_store(args)
+    except Exception as e:
+        print(f"Error during file processing: {e}", file=sys.stderr)
+        return 1
+
+    filters = Filter(store)
+    try:
+        args.run(args, store, filters)
+    except ValueError as e:
+        print(f"Query error: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,85 +1,120 @@
+import argparse
 import os
 import sys
-
-from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget,
-                             QDockWidget, QTextBrowser, QLineEdit, QPushButton, QListWidget, QAction)
-
+import time
+from array import array
+
+import numpy as np
+from PyQt5.QtCore import QEvent, Qt, QTimer
+from PyQt5.QtGui import QFontDatabase, QTextCursor
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QTreeView, QVBoxLayout, QWidget,
+                             QDockWidget, QTextBrowser, QLineEdit, QPushButton, QListView, QAction, QLabel,
+                             QComboBox, QProgressBar, QMenu, QFileDialog, QHBoxLayout, QScrollBar,
+                             QAbstractSlider)
+
+from src.Exporters.BulkExport import BulkExport, fault_records, subtree_records
+from src.FilterWidgets.ContentSearch import ContentSearch, parse_pattern
 from src.FilterWidgets.Filters import Filter
-from src.ShowWidgets.DumpWidgets import DumpWidgets
-
-
-def parse_filename(folder_path):
-    if not os.path.isdir(folder_path):
-        print(f"Error when specifying a path '{folder_path}'")
-        return []
-
-    parsed_files = []
-    subfolders = ['queue', 'crashes', 'hangs']
-
-    for subfolder in subfolders:
-        subfolder_path = os.path.join(folder_path, subfolder)
-        if not os.path.isdir(subfolder_path):
-            continue
-
-        try:
-            files = sorted(os.listdir(subfolder_path))
-        except Exception as e:
-            print(f"Error reading a folder '{subfolder_path}': {e}")
-            continue
-
-        for filename in files:
-            parts = filename.split(',')
-            file_dict = {}
-
-            for part in parts:
-                key_value = part.split(':')
-                if len(key_value) == 2:
-                    key, value = key_value[0].strip(), key_value[1].strip()
-
-                    if key in ['id', 'time', 'execs', 'rep']:
-                        try:
-                            value = int(value)
-                        except ValueError:
-                            pass
-
-                    if key == 'src':
-                        if '+' in value:
-                            try:
-                                value = [int(v) for v in value.split('+')]
-                            except ValueError:
-                                value = [value]
-                        else:
-                            try:
-                                value = [int(value)]
-                            except ValueError:
-                                value = [value]
-
-                    file_dict[key] = value
-            file_dict['filename'] = filename
-            file_dict['folder'] = subfolder
-            parsed_files.append(file_dict)
-
-    return parsed_files
-
-
-def reformat_dict(parsed_files):
-    id_to_element = {file_dict.get('id'): file_dict for file_dict in parsed_files}
-
-    for file_dict in parsed_files:
-        src_values = file_dict.get('src')
-        if not src_values or file_dict.get('folder') in ['crashes', 'hangs']:
-            continue
-
-        for src_value in src_values:
-            try:
-                parent_element = id_to_element.get(src_value)
-                if parent_element:
-                    parent_element.setdefault('children', []).append(file_dict['id'])
-            except Exception as e:
-                print(f"Error when adding a child to a parent item: {e}")
-
-    return parsed_files
+from src.FilterWidgets.ResultModel import ResultModel
+from src.Loaders.Archives import archive_for, is_archive, open_archive
+from src.Loaders.Clusters import Clusters
+from src.Loaders.ContentHashes import ContentHashes
+from src.Loaders.IndexCache import index_path_for, load_store_cached
+from src.Loaders.FuzzerStats import FuzzerStats
+from src.Loaders.Progressive import ProgressiveLoader
+from src.Loaders.Scanner import find_instances, load_store, output_subfolders
+from src.Loaders.Watchers import OutputWatcher
+from src.Profiling.Instruments import INSTRUMENTS, count, span, timed
+from src.Records.Lineage import Lineage
+from src.Records.Parsers import parse_name
+from src.Records.RecordStore import ABSENT, FOLDER_CODES, QUEUE_CODE, RecordStore
+from src.ShowWidgets.DiffWidgets import diff_parents
+from src.ShowWidgets.DumpWidgets import BYTES_PER_ROW, DumpWidgets, HexDump, ROWS_PER_PAGE
+from src.ShowWidgets.PlotWidgets import TimeSeriesPlot, format_duration
+from src.ShowWidgets.SelectionJobs import SelectionJobs, discard
+from src.TreeWidgets.ClusterModel import ClusterModel
+from src.TreeWidgets.SortKeys import GROUP_MODES, SortKeys
+from src.TreeWidgets.TreeModel import TreeModel
+
+PREFETCH_CHILDREN = 4
+FOLLOW_INTERVAL_MS = 250
+FOLLOW_BATCH = 5000
+SEARCH_DELAY_MS = 200
+HASH_INTERVAL_MS = 500
+CLUSTER_INTERVAL_MS = 1000
+SCROLL_GAP_MS = 100
+RESULT_DELAY_MS = 60
+LOAD_INTERVAL_MS = 30
+LOAD_BUDGET_MS = 12
+PROFILE_INTERVAL_MS = 1000
+PROFILE_READOUT = ['select_info', 'select_dump', 'select_diff', 'search']
+PREVIEW_RECORDS = 8
+HEX_SCROLL_KEYS = {
+    (Qt.Key_PageDown, False): QAbstractSlider.SliderPageStepAdd,
+    (Qt.Key_PageUp, False): QAbstractSlider.SliderPageStepSub,
+    (Qt.Key_Down, True): QAbstractSlider.SliderSingleStepAdd,
+    (Qt.Key_Up, True): QAbstractSlider.SliderSingleStepSub,
+    (Qt.Key_End, True): QAbstractSlider.SliderToMaximum,
+    (Qt.Key_Home, True): QAbstractSlider.SliderToMinimum,
+}
+CONTENT_POLL_MS = 100
+STATS_INTERVAL_MS = 1000
+EXPORT_POLL_MS = 200
+EXPORT_FILTER = "Directory (*);;Tarball (*.tar *.tar.gz *.tgz *.tar.xz *.tar.bz2)"
+STATS_FIELDS = [("Run time", ['run_time']), ("Execs/s", ['execs_per_sec']), ("Execs", ['execs_done']),
+                ("Corpus", ['corpus_count', 'paths_total']), ("Crashes", ['saved_crashes', 'unique_crashes']),
+                ("Hangs", ['saved_hangs', 'unique_hangs']), ("Coverage", ['bitmap_cvg']),
+                ("Edges", ['edges_found']), ("Cycles", ['cycles_done']), ("Stability", ['stability'])]
+SEARCH_MODES = [("Query", None), ("Hex bytes", 'hex'), ("Text", 'text'), ("Regex", 'regex')]
+SEARCH_PLACEHOLDERS = {
+    None: "e.g. op:havoc time>3600000 folder:crashes",
+    'hex': "e.g. 7f 45 4c 46 or de ad ?? ef",
+    'text': "e.g. Content-Length:",
+    'regex': "e.g. \\xff\\xd8.{2}JFIF",
+}
+
+
+def record_label(store, record):
+    return f"{store.subfolder(record)}:{store.id(record)}"
+
+
+def record_preview(store, records, total):
+    more = ', …' if total > len(records) else ''
+    return f"{total} ({', '.join(record_label(store, record) for record in records)}{more})"
+
+
+@timed('info_lines', 'selection')
+def info_lines(store, lineage, hashes, clusters, record, stop):
+    lines = []
+    fields = ['instance', 'orig', 'id', 'sync', 'src', 'time', 'execs', 'op', 'rep']
+    for field in fields:
+        value = store.get(record, field)
+        if value:
+            lines.append(f"{field.capitalize()}: {value}")
+
+    path = lineage.path(record, stop)
+    lines.append(f"Depth: {lineage.depth(record, stop)}")
+    lines.append(f"Seed: {store.get(path[0], 'orig', store.filename(path[0]))}")
+    if len(path) > 1:
+        lines.append(f"Path: {' → '.join(record_label(store, step) for step in path)}")
+    lines.append(f"Descendants: {lineage.descendants(record, stop)}")
+
+    fault_count = lineage.fault_count(record, stop)
+    if fault_count:
+        faults = lineage.fault_descendants(record, PREVIEW_RECORDS, stop)
+        lines.append(f"Crash/hang descendants: {record_preview(store, faults, fault_count)}")
+
+    if hashes and hashes.digest(record):
+        lines.append(f"Content hash: {hashes.digest(record)}")
+        duplicates = hashes.duplicates(record)
+        if duplicates:
+            lines.append(f"Identical to: {record_preview(store, duplicates[:PREVIEW_RECORDS], len(duplicates))}")
+
+    if clusters:
+        similar = [member for member in clusters.cluster_of(record) if member != record]
+        if similar:
+            lines.append(f"Similar to: {record_preview(store, similar[:PREVIEW_RECORDS], len(similar))}")
+    return lines
 
 
 class InfoDockWidget(QDockWidget):
@@ -89,103 +124,656 @@ class InfoDockWidget(QDockWidget):
         self.setWidget(QTextBrowser())
         self.text_browser = self.widget()
 
-    def update_info(self, file_dict):
-        self.text_browser.clear()
-        if file_dict:
-            fields = ['orig', 'id', 'src', 'time', 'execs', 'op', 'rep']
-            for field in fields:
-                if file_dict.get(field):
-                    self.text_browser.append(f"{field.capitalize()}: {file_dict.get(field)}")
+    def set_lines(self, lines):
+        self.text_browser.setPlainText('\n'.join(lines))
 
 
 class HexDumpDockWidget(QDockWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle('Hex Dump')
-        self.setWidget(QTextBrowser())
-        self.text_browser = self.widget()
-
-    def update_hex_dump(self, html_content):
-        self.text_browser.setHtml(html_content)
+        self.text_browser = QTextBrowser()
+        self.text_browser.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.text_browser.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.scroll_bar = QScrollBar(Qt.Vertical)
+        self.scroll_bar.valueChanged.connect(self.render_window)
+
+        widget = QWidget()
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        layout.addWidget(self.text_browser)
+        layout.addWidget(self.scroll_bar)
+        widget.setLayout(layout)
+        self.setWidget(widget)
+
+        self.hex_dump = None
+        self.first_row = None
+        self.stale = False
+        self.target = None
+        self.visibilityChanged.connect(self.render_if_visible)
+        self.text_browser.installEventFilter(self)
+        self.text_browser.viewport().installEventFilter(self)
+
+    def update_hex_dump(self, hex_dump):
+        if self.hex_dump:
+            self.hex_dump.close()
+        self.hex_dump = None
+        self.first_row = None
+        if self.target and (not isinstance(hex_dump, HexDump) or hex_dump.file_path != self.target[0]):
+            self.target = None
+
+        if not isinstance(hex_dump, HexDump):
+            self.stale = False
+            self.update_scroll_range()
+            self.text_browser.setHtml(hex_dump)
+            return
+
+        self.hex_dump = hex_dump
+        self.stale = True
+        self.render_if_visible()
+
+    def show_offset(self, file_path, offset):
+        self.target = (file_path, offset)
+        if self.hex_dump and self.hex_dump.file_path == file_path:
+            self.stale = True
+            self.render_if_visible()
+
+    def visible_rows(self):
+        return max(self.text_browser.viewport().height() // self.text_browser.fontMetrics().lineSpacing(), 1)
+
+    def update_scroll_range(self):
+        rows = self.visible_rows()
+        self.scroll_bar.setPageStep(rows)
+        self.scroll_bar.setRange(0, max(self.hex_dump.row_count - rows, 0) if self.hex_dump else 0)
+
+    def render_if_visible(self, visible=None):
+        if self.stale and self.hex_dump and self.isVisible():
+            self.stale = False
+            self.update_scroll_range()
+            target_row = self.target[1] // BYTES_PER_ROW if self.target else 0
+            self.first_row = None
+            self.scroll_bar.setValue(max(target_row - self.visible_rows() // 4, 0))
+            self.render_window()
+            if self.target:
+                self.select_byte(self.target[1])
+                self.target = None
+
+    def render_window(self, value=None):
+        first_row = self.scroll_bar.value()
+        if not self.hex_dump or first_row == self.first_row:
+            return
+        self.first_row = first_row
+        self.text_browser.setHtml(self.hex_dump.render_rows(first_row, max(ROWS_PER_PAGE, self.visible_rows() + 1)))
+        self.text_browser.verticalScrollBar().setValue(0)
+
+    def select_byte(self, offset):
+        row_start = offset - offset % BYTES_PER_ROW
+        cursor = self.text_browser.document().find(f"{row_start:08x}  ")
+        if cursor.isNull():
+            return
+        column = offset % BYTES_PER_ROW
+        position = cursor.position() + column * 3 + (column >= BYTES_PER_ROW // 2)
+        cursor.setPosition(position)
+        cursor.setPosition(position + 2, QTextCursor.KeepAnchor)
+        self.text_browser.setTextCursor(cursor)
+
+    def eventFilter(self, watched, event):
+        if watched is self.text_browser.viewport():
+            if event.type() == QEvent.Wheel:
+                QApplication.sendEvent(self.scroll_bar, event)
+                return True
+            if event.type() == QEvent.Resize and self.hex_dump and not self.stale:
+                self.update_scroll_range()
+                self.first_row = None
+                self.render_window()
+        elif event.type() == QEvent.KeyPress:
+            action = HEX_SCROLL_KEYS.get((event.key(), bool(event.modifiers() & Qt.ControlModifier)))
+            if action is not None:
+                self.scroll_bar.triggerAction(action)
+                return True
+        return super().eventFilter(watched, event)
+
+
+class DiffDockWidget(QDockWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle('Diff')
+        self.diffs = []
+        self.byte_diff = None
+        self.first_row = None
+
+        self.parent_combo = QComboBox()
+        self.parent_combo.currentIndexChanged.connect(self.show_diff)
+        self.summary_label = QLabel()
+        self.text_browser = QTextBrowser()
+        self.text_browser.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.text_browser.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.scroll_bar = QScrollBar(Qt.Vertical)
+        self.scroll_bar.valueChanged.connect(self.render_window)
+
+        rows_layout = QHBoxLayout()
+        rows_layout.setSpacing(0)
+        rows_layout.addWidget(self.text_browser)
+        rows_layout.addWidget(self.scroll_bar)
+
+        widget = QWidget()
+        layout = QVBoxLayout()
+        layout.addWidget(self.parent_combo)
+        layout.addWidget(self.summary_label)
+        layout.addLayout(rows_layout)
+        widget.setLayout(layout)
+        self.setWidget(widget)
+        self.visibilityChanged.connect(self.render_if_visible)
+        self.text_browser.installEventFilter(self)
+        self.text_browser.viewport().installEventFilter(self)
+
+    def show_pending(self, has_parents):
+        self.clear()
+        self.summary_label.setText("Comparing…" if has_parents else "No parent to compare with")
+
+    def set_diffs(self, diffs):
+        self.clear()
+        self.diffs = diffs
+        self.parent_combo.blockSignals(True)
+        self.parent_combo.addItems([diff.parent_label if not isinstance(diff, str) else "error" for diff in diffs])
+        self.parent_combo.blockSignals(False)
+        self.parent_combo.setVisible(len(diffs) > 1)
+        self.render_if_visible()
+
+    def render_if_visible(self, visible=None):
+        if self.diffs and self.byte_diff is None and self.isVisible():
+            self.show_diff(self.parent_combo.currentIndex() if self.parent_combo.count() else 0)
+
+    def visible_rows(self):
+        return max(self.text_browser.viewport().height() // self.text_browser.fontMetrics().lineSpacing(), 1)
+
+    def update_scroll_range(self):
+        rows = self.visible_rows()
+        self.scroll_bar.setPageStep(rows)
+        self.scroll_bar.setRange(0, max(self.byte_diff.row_count - rows, 0) if self.byte_diff else 0)
+
+    def show_diff(self, position):
+        if not 0 <= position < len(self.diffs):
+            return
+        diff = self.diffs[position]
+        self.first_row = None
+        if isinstance(diff, str):
+            self.byte_diff = None
+            self.update_scroll_range()
+            self.summary_label.setText(diff)
+            self.text_browser.clear()
+            return
+        self.byte_diff = diff
+        self.summary_label.setText(diff.summary())
+        self.update_scroll_range()
+        self.scroll_bar.setValue(0)
+        self.render_window()
+
+    def render_window(self, value=None):
+        first_row = self.scroll_bar.value()
+        if not self.byte_diff or first_row == self.first_row:
+            return
+        self.first_row = first_row
+        self.text_browser.setHtml(self.byte_diff.render_rows(first_row, max(ROWS_PER_PAGE, self.visible_rows() + 1)))
+        self.text_browser.verticalScrollBar().setValue(0)
+
+    def eventFilter(self, watched, event):
+        if watched is self.text_browser.viewport():
+            if event.type() == QEvent.Wheel:
+                QApplication.sendEvent(self.scroll_bar, event)
+                return True
+            if event.type() == QEvent.Resize and self.byte_diff:
+                self.update_scroll_range()
+                self.first_row = None
+                self.render_window()
+        elif event.type() == QEvent.KeyPress:
+            action = HEX_SCROLL_KEYS.get((event.key(), bool(event.modifiers() & Qt.ControlModifier)))
+            if action is not None:
+                self.scroll_bar.triggerAction(action)
+                return True
+        return super().eventFilter(watched, event)
+
+    def clear(self):
+        for diff in self.diffs:
+            if not isinstance(diff, str):
+                diff.close()
+        self.diffs = []
+        self.byte_diff = None
+        self.first_row = None
+        self.parent_combo.blockSignals(True)
+        self.parent_combo.clear()
+        self.parent_combo.blockSignals(False)
+        self.parent_combo.setVisible(False)
+        self.update_scroll_range()
+        self.text_browser.clear()
 
 
 class FilterWidget(QWidget):
     def __init__(self, main_window):
         super().__init__()
         self.main_window = main_window
-        self.filters = Filter(self.main_window.parsed_files)
+        self.filters = Filter(self.main_window.store, self.main_window.lineage, self.main_window.hashes)
 
         layout = QVBoxLayout()
 
+        self.content_search = ContentSearch(self.main_window.store, self.main_window.folder_path)
+        self.content_timer = QTimer(self)
+        self.content_timer.timeout.connect(self.drain_content_hits)
+
+        self.mode_combo = QComboBox()
+        for label, _ in SEARCH_MODES:
+            self.mode_combo.addItem(label)
+        self.mode_combo.currentIndexChanged.connect(self.change_mode)
+
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Input here")
+        self.search_input.setPlaceholderText(SEARCH_PLACEHOLDERS[None])
         self.search_input.returnPressed.connect(self.search)
+        self.search_input.textChanged.connect(self.schedule_search)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.search)
 
         self.search_button = QPushButton("Search")
         self.search_button.clicked.connect(self.search)
-
-        self.result_list = QListWidget()
-        self.result_list.currentItemChanged.connect(self.select_item)
-
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_content_search)
+        self.cancel_button.hide()
+
+        self.result_model = ResultModel(self.main_window.store, self)
+        self.result_list = QListView()
+        self.result_list.setUniformItemSizes(True)
+        self.result_list.setModel(self.result_model)
+        self.result_list.selectionModel().currentChanged.connect(self.select_item)
+        self.result_list.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.result_list.customContextMenuRequested.connect(self.show_result_menu)
+        self.result_label = QLabel()
+
+        layout.addWidget(self.mode_combo)
         layout.addWidget(self.search_input)
         layout.addWidget(self.search_button)
+        layout.addWidget(self.cancel_button)
+        layout.addWidget(self.result_label)
         layout.addWidget(self.result_list)
 
         self.setLayout(layout)
 
+    def mode(self):
+        return SEARCH_MODES[self.mode_combo.currentIndex()][1]
+
+    def show_result_menu(self, position):
+        menu = QMenu(self)
+        menu.addAction("Export results…", self.export_results)
+        menu.addAction("Export unique results…", lambda: self.export_results(unique=True))
+        menu.exec_(self.result_list.viewport().mapToGlobal(position))
+
+    def export_results(self, unique=False):
+        records = list(self.result_model.records)
+        if not records:
+            self.main_window.statusBar().showMessage("No results to export")
+            return
+        self.main_window.start_export(records, f"results of '{self.search_input.text()}'", unique)
+
+    def change_mode(self, position):
+        self.cancel_content_search()
+        self.search_input.setPlaceholderText(SEARCH_PLACEHOLDERS[self.mode()])
+        self.result_model.set_records(array('q'))
+        self.result_label.setText("")
+        if self.mode() is None:
+            self.search()
+
+    def schedule_search(self, text=None):
+        if self.mode() is None:
+            self.search_timer.start()
+
+    @timed('search', 'ui')
     def search(self):
+        self.search_timer.stop()
         search_term = self.search_input.text()
-        self.result_list.clear()
+        if self.mode() is not None:
+            self.start_content_search(search_term, self.mode())
+            return
+
+        try:
+            records = self.filters.query(search_term)
+        except ValueError as e:
+            self.result_label.setText(str(e))
+            return
+
+        self.result_model.set_records(records)
+        self.result_label.setText(f"{len(records)} matches" if search_term.strip() else "")
+
+    def start_content_search(self, text, mode):
+        try:
+            pattern, is_regex = parse_pattern(text, mode)
+        except ValueError as e:
+            self.result_label.setText(str(e))
+            return
+
+        self.content_search.start(pattern, is_regex)
+        self.result_model.set_records(array('q'), self.content_search.offsets)
+        self.cancel_button.show()
+        self.content_timer.start(CONTENT_POLL_MS)
+
+    def drain_content_hits(self):
+        running = self.content_search.is_running()
+        self.result_model.add_records(self.content_search.drain())
+        self.result_label.setText(self.content_search.status_text())
+        if not running:
+            self.content_timer.stop()
+            self.cancel_button.hide()
+
+    def cancel_content_search(self):
+        if self.content_search.is_running():
+            self.content_search.cancel()
+            self.drain_content_hits()
+
+    def shutdown(self):
+        self.content_timer.stop()
+        self.content_search.shutdown()
+
+    def add_records(self, records):
+        self.filters.add_records(records)
+
+    def select_item(self, index, previous=None):
+        record = self.result_model.record(index)
+        if record is None:
+            return
+        offset = self.result_model.first_offset(index)
+        if offset is None:
+            self.main_window.select_record(record)
+        else:
+            self.main_window.show_offset(record, offset)
+
+
+class ClusterWidget(QWidget):
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.clusters = main_window.clusters
+        self.version = 0
+
+        layout = QVBoxLayout()
+        self.cluster_label = QLabel()
+        self.cluster_model = ClusterModel(main_window.store, self)
+        self.cluster_tree = QTreeView()
+        self.cluster_tree.setUniformRowHeights(True)
+        self.cluster_tree.setModel(self.cluster_model)
+        self.cluster_tree.selectionModel().currentChanged.connect(self.select_item)
+
+        layout.addWidget(self.cluster_label)
+        layout.addWidget(self.cluster_tree)
+        self.setLayout(layout)
+
+    def refresh(self):
+        if self.clusters.version == self.version:
+            return
+        self.version = self.clusters.version
+        self.cluster_model.set_clusters(self.clusters.clusters())
+        self.cluster_label.setText(self.clusters.status_text())
+
+    def select_item(self, index, previous=None):
+        record = self.cluster_model.record(index)
+        if record is not None:
+            self.main_window.select_record(record)
+
+
+def entry_times(store, instance):
+    code = store.instance_names.codes.get(instance)
+    if code is None:
+        return {}
+    times = np.array(store.times, dtype=np.int64)
+    keep = (np.array(store.instances, dtype=np.int64) == code - 1) & (times != ABSENT)
+    folders = np.array(store.folders, dtype=np.int64)[keep]
+    times = times[keep] / 1000
+    return {folder: np.sort(times[folders == folder_code]) for folder, folder_code in FOLDER_CODES.items()}
+
+
+def stats_summary(stats):
+    parts = []
+    for label, keys in STATS_FIELDS:
+        value = next((stats[key] for key in keys if key in stats), None)
+        if value is None:
+            continue
+        if label == "Run time" and value.isdigit():
+            value = format_duration(int(value))
+        parts.append(f"{label}: {value}")
+    return "   ".join(parts) if parts else "No fuzzer_stats found"
 
-        if search_term:
-            try:
-                matching_items = self.filters.search_by_id(search_term)
-                for item in matching_items:
-                    self.result_list.addItem(f"{item['folder']}: {item['id']}")
-            except ValueError as e:
-                print(f"Search error: {e}")
 
-    def select_item(self, item):
-        if item:
-            folder, item_id = item.text().split(': ')
-            item_id = int(item_id)
-            self.main_window.select_item_in_tree(folder, item_id)
+class StatsDockWidget(QDockWidget):
+    def __init__(self, main_window):
+        super().__init__("Stats", main_window)
+        self.main_window = main_window
+        self.instances = find_instances(main_window.folder_path) or ['']
+        self.readers = {}
+        self.reader = None
+        self.instance = None
+        self.drawn = None
+        self.times_key = None
+        self.times = {}
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+
+        widget = QWidget()
+        layout = QVBoxLayout()
+        self.instance_combo = QComboBox()
+        self.instance_combo.addItems([instance or "default" for instance in self.instances])
+        self.instance_combo.setVisible(len(self.instances) > 1)
+        self.instance_combo.currentIndexChanged.connect(self.select_instance)
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        self.speed_plot = TimeSeriesPlot("Execs/s")
+        self.coverage_plot = TimeSeriesPlot("Coverage")
+        self.corpus_plot = TimeSeriesPlot("Corpus")
+        self.fault_plot = TimeSeriesPlot("Faults")
+        for item in (self.instance_combo, self.summary_label, self.speed_plot, self.coverage_plot,
+                     self.corpus_plot, self.fault_plot):
+            layout.addWidget(item)
+        widget.setLayout(layout)
+        self.setWidget(widget)
+        self.visibilityChanged.connect(self.render_if_visible)
+
+    def start(self):
+        self.select_instance(self.instance_combo.currentIndex())
+        self.timer.start(STATS_INTERVAL_MS)
+
+    def stop(self):
+        self.timer.stop()
+        for reader in self.readers.values():
+            reader.stop()
+
+    def select_instance(self, position):
+        if self.reader:
+            self.reader.stop()
+        self.instance = self.instances[max(position, 0)]
+        self.reader = self.readers.get(self.instance)
+        if self.reader is None:
+            self.reader = FuzzerStats(os.path.join(self.main_window.folder_path, self.instance))
+            self.readers[self.instance] = self.reader
+        self.reader.start()
+        self.drawn = None
+        self.render_if_visible()
+
+    def render_if_visible(self, visible=None):
+        if self.isVisible():
+            self.refresh()
+
+    def filename_times(self):
+        store = self.main_window.store
+        key = (self.instance, len(store))
+        if key != self.times_key:
+            self.times_key = key
+            self.times = entry_times(store, self.instance)
+        return self.times
+
+    def refresh(self):
+        if self.reader is None or not self.isVisible():
+            return
+        state = (self.instance, self.reader.version, len(self.main_window.store))
+        if state == self.drawn:
+            return
+        self.drawn = state
+
+        with span('stats_refresh', 'ui'):
+            reader = self.reader
+            self.summary_label.setText(stats_summary(reader.snapshot()))
+            times = self.filename_times()
+            queue = times.get('queue', np.empty(0))
+            faults = np.concatenate((times.get('crashes', np.empty(0)), times.get('hangs', np.empty(0))))
+            duration = max([reader.duration()] + [float(values[-1]) for values in times.values() if len(values)])
+
+            corpus = reader.series('corpus')
+            if len(queue):
+                points = corpus[0] if corpus else np.linspace(0, duration, 512)
+                entries = np.searchsorted(queue, points, 'right').astype(float)
+                queue_curve = (points, entries, entries, entries, "queue files")
+            else:
+                queue_curve = None
+
+            self.speed_plot.set_data([reader.series('speed')], duration)
+            self.coverage_plot.set_data([reader.series('coverage')], duration)
+            self.corpus_plot.set_data([corpus, queue_curve], duration)
+            self.fault_plot.set_data([reader.series('crashes'), reader.series('hangs')], duration, faults)
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, parsed_files):
+    def __init__(self, store, folder_path, hash_contents=True, cluster_faults=True, loader=None):
         super().__init__()
         self.setWindowTitle("AFL++ output list")
         self.setGeometry(300, 200, 1200, 700)
-        self.parsed_files = parsed_files
-        self.id_to_element = {file_dict['id']: file_dict for file_dict in parsed_files}
+        self.store = store
+        self.lineage = Lineage(store)
+        self.folder_path = folder_path
+        self.hashes = ContentHashes(store, folder_path) if hash_contents else None
+        self.hash_timer = QTimer(self)
+        self.hash_timer.timeout.connect(self.apply_hashes)
+        self.hash_label = QLabel()
+        self.clusters = Clusters(store, folder_path) if cluster_faults else None
+        self.cluster_timer = QTimer(self)
+        self.cluster_dock = QDockWidget("Clusters", self)
         self.dump_widgets = DumpWidgets()
-
-        self.tree = QTreeWidget()
+        self.selection_jobs = SelectionJobs(parent=self)
+        self.selection_jobs.finished.connect(self.apply_selection_result)
+        self.selected_at = 0
+        self.scrolling = False
+        self.pending_results = {}
+        self.result_timer = QTimer(self)
+        self.result_timer.setSingleShot(True)
+        self.result_timer.setInterval(RESULT_DELAY_MS)
+        self.result_timer.timeout.connect(self.apply_pending_results)
+
+        self.tree = QTreeView()
+        self.tree.setUniformRowHeights(True)
+        self.tree.header().setSortIndicator(0, Qt.AscendingOrder)
+        self.tree.setSortingEnabled(True)
         self.info_dock = InfoDockWidget()
         self.hex_dump_dock = HexDumpDockWidget()
+        self.diff_dock = DiffDockWidget()
         self.filter_dock = QDockWidget("Filter", self)
         self.filter_widget = FilterWidget(self)
+        self.cache_label = QLabel()
+        self.watcher = None
+        self.follow_timer = QTimer(self)
+        self.follow_timer.timeout.connect(self.apply_new_entries)
+        self.follow_requested = False
+        self.instance_combo = QComboBox()
+        self.instance_combo.currentIndexChanged.connect(self.select_instance)
+        self.sort_keys = SortKeys(store, self.lineage, self.hashes)
+        self.group_combo = QComboBox()
+        self.group_combo.addItems([label for _, label in GROUP_MODES])
+        self.group_combo.currentIndexChanged.connect(self.select_group_mode)
+
+        self.loader = loader
+        self.load_timer = QTimer(self)
+        self.load_timer.timeout.connect(self.apply_loaded_parts)
+        self.load_label = QLabel()
+        self.load_progress = QProgressBar()
+        self.load_progress.setMaximumWidth(200)
+        self.orphans = []
+        self.profile_timer = QTimer(self)
+        self.profile_timer.timeout.connect(self.update_profile_label)
+        self.profile_label = QLabel()
+        self.stats_dock = StatsDockWidget(self)
+        self.exporter = BulkExport(store, folder_path, self.lineage, self.hashes)
+        self.export_timer = QTimer(self)
+        self.export_timer.timeout.connect(self.update_export_progress)
+        self.export_label = QLabel()
+        self.export_progress = QProgressBar()
+        self.export_progress.setMaximumWidth(200)
+        self.export_cancel_button = QPushButton("Cancel export")
+        self.export_cancel_button.clicked.connect(self.cancel_export)
 
         self.init_ui()
 
     def init_ui(self):
         main_widget = QWidget()
         main_layout = QVBoxLayout()
-        self.tree.setHeaderLabels(["ID", "Src", "Index"])
-        self.populate_tree(self.parsed_files)
+        self.populate_tree(self.store)
+        self.refresh_instances()
+        combo_layout = QHBoxLayout()
+        combo_layout.addWidget(self.instance_combo)
+        combo_layout.addWidget(self.group_combo)
+        main_layout.addLayout(combo_layout)
         main_layout.addWidget(self.tree)
+        self.tree.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tree.customContextMenuRequested.connect(self.show_tree_menu)
         main_widget.setLayout(main_layout)
         self.setCentralWidget(main_widget)
 
         self.addDockWidget(Qt.RightDockWidgetArea, self.info_dock)
         self.addDockWidget(Qt.RightDockWidgetArea, self.hex_dump_dock)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.diff_dock)
+        self.tabifyDockWidget(self.hex_dump_dock, self.diff_dock)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.stats_dock)
+        self.tabifyDockWidget(self.info_dock, self.stats_dock)
+        self.info_dock.raise_()
+        self.hex_dump_dock.raise_()
 
         self.filter_dock.setWidget(self.filter_widget)
         self.addDockWidget(Qt.LeftDockWidgetArea, self.filter_dock)
 
-        self.tree.currentItemChanged.connect(self.show_item_info)
+        if self.clusters:
+            self.cluster_widget = ClusterWidget(self)
+            self.cluster_dock.setWidget(self.cluster_widget)
+            self.addDockWidget(Qt.LeftDockWidgetArea, self.cluster_dock)
+            self.cluster_timer.timeout.connect(self.cluster_widget.refresh)
+
+        self.statusBar().addPermanentWidget(self.load_label)
+        self.statusBar().addPermanentWidget(self.load_progress)
+        self.statusBar().addPermanentWidget(self.hash_label)
+        self.statusBar().addPermanentWidget(self.cache_label)
+        self.statusBar().addPermanentWidget(self.profile_label)
+        for widget in (self.export_label, self.export_progress, self.export_cancel_button):
+            self.statusBar().addPermanentWidget(widget)
+            widget.hide()
+        self.update_cache_label()
+        if INSTRUMENTS.enabled:
+            self.profile_timer.start(PROFILE_INTERVAL_MS)
+        else:
+            self.profile_label.hide()
+
+        if self.hashes:
+            self.hashes.start()
+            self.hash_timer.start(HASH_INTERVAL_MS)
+        if self.clusters:
+            self.clusters.start()
+            self.cluster_timer.start(CLUSTER_INTERVAL_MS)
+        self.stats_dock.start()
+
         self.create_menu()
+        if archive_for(self.folder_path):
+            self.follow_action.setEnabled(False)
+
+        if self.loader:
+            self.follow_action.setEnabled(False)
+            self.loader.start()
+            self.load_timer.start(LOAD_INTERVAL_MS)
+        else:
+            self.load_label.hide()
+            self.load_progress.hide()
 
     def create_menu(self):
         menubar = self.menuBar()
@@ -199,88 +787,413 @@ class MainWindow(QMainWindow):
         hex_dump_action.triggered.connect(self.show_hex_dump_dock)
         run_menu.addAction(hex_dump_action)
 
+        diff_action = QAction("Diff", self)
+        diff_action.triggered.connect(self.show_diff_dock)
+        run_menu.addAction(diff_action)
+
         filter_action = QAction("Filter", self)
         filter_action.triggered.connect(self.show_filter_dock)
         run_menu.addAction(filter_action)
 
+        if self.clusters:
+            cluster_action = QAction("Clusters", self)
+            cluster_action.triggered.connect(self.show_cluster_dock)
+            run_menu.addAction(cluster_action)
+
+        stats_action = QAction("Stats", self)
+        stats_action.triggered.connect(self.show_stats_dock)
+        run_menu.addAction(stats_action)
+
+        live_menu = menubar.addMenu("Live")
+
+        self.follow_action = QAction("Follow output directory", self)
+        self.follow_action.setCheckable(True)
+        self.follow_action.toggled.connect(self.toggle_follow)
+        live_menu.addAction(self.follow_action)
+
+        export_menu = menubar.addMenu("Export")
+        export_menu.addAction("Export filter results…", self.filter_widget.export_results)
+        export_menu.addAction("Export unique filter results…", lambda: self.filter_widget.export_results(unique=True))
+        export_menu.addSeparator()
+        self.link_action = QAction("Hardlink files when possible", self)
+        self.link_action.setCheckable(True)
+        export_menu.addAction(self.link_action)
+        export_menu.addAction("Cancel export", self.cancel_export)
+
     def show_info_dock(self):
         self.info_dock.setVisible(True)
 
     def show_hex_dump_dock(self):
         self.hex_dump_dock.setVisible(True)
 
+    def show_diff_dock(self):
+        self.diff_dock.setVisible(True)
+        self.diff_dock.raise_()
+
     def show_filter_dock(self):
         self.filter_dock.setVisible(True)
 
-    def populate_tree(self, parsed_files):
-        folder_items = {'queue': {}, 'crashes': {}, 'hangs': {}}
-        index_map = {'queue': 'Q', 'crashes': 'C', 'hangs': 'H'}
-
-        for file_dict in parsed_files:
-            index = index_map[file_dict['folder']]
-            tree_item = QTreeWidgetItem([str(file_dict["id"]), ', '.join(map(str, file_dict.get("src", []))), index])
-            folder_items[file_dict['folder']][file_dict["id"]] = tree_item
-
-        for file_dict in parsed_files:
-            if not file_dict.get("src") or file_dict['folder'] in ['crashes', 'hangs']:
-                self.tree.addTopLevelItem(folder_items[file_dict['folder']][file_dict["id"]])
-
-        for file_dict in parsed_files:
-            if file_dict['folder'] not in ['crashes', 'hangs']:
-                tree_item = folder_items[file_dict['folder']][file_dict["id"]]
-                for parent_id in file_dict.get("src", []):
-                    parent_item = folder_items['queue'].get(parent_id)
-                    if parent_item:
-                        parent_item.addChild(tree_item)
-
-    def show_item_info(self, item):
+    def show_cluster_dock(self):
+        self.cluster_dock.setVisible(True)
+
+    def show_stats_dock(self):
+        self.stats_dock.setVisible(True)
+        self.stats_dock.raise_()
+
+    @timed('populate_tree', 'ui')
+    def populate_tree(self, store, instance=None):
+        group_mode = GROUP_MODES[self.group_combo.currentIndex()][0]
+        self.tree_model = TreeModel(store, self.lineage, self.hashes, instance, self, self.sort_keys, group_mode)
+        header = self.tree.header()
+        self.tree_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+        self.tree.setModel(self.tree_model)
+        self.tree.selectionModel().currentChanged.connect(self.show_item_info)
+
+    def refresh_instances(self):
+        instances = self.store.instance_list()
+        if self.instance_combo.count() != len(instances) + 1:
+            self.instance_combo.blockSignals(True)
+            current = self.instance_combo.currentIndex()
+            self.instance_combo.clear()
+            self.instance_combo.addItem("All instances")
+            self.instance_combo.addItems(instances)
+            self.instance_combo.setCurrentIndex(max(current, 0))
+            self.instance_combo.blockSignals(False)
+        self.instance_combo.setVisible(len(instances) > 1)
+
+    def select_instance(self, position):
+        self.populate_tree(self.store, position - 1 if position > 0 else None)
+
+    def select_group_mode(self, position):
+        record = self.tree_model.record(self.tree.currentIndex())
+        self.tree_model.set_group_mode(GROUP_MODES[position][0])
+        if record is not None:
+            self.select_record(record)
+
+    def show_tree_menu(self, position):
+        record = self.tree_model.record(self.tree.indexAt(position))
+        if record is None:
+            return
+        label = record_label(self.store, record)
+        menu = QMenu(self)
+        menu.addAction("Export subtree…", lambda: self.start_export(
+            subtree_records(self.store, record), f"subtree of {label}"))
+        menu.addAction("Export lineage to seed…", lambda: self.start_export(
+            self.lineage.path(record), f"lineage of {label}"))
+        faults_action = menu.addAction("Export unique crashes/hangs below…", lambda: self.start_export(
+            fault_records(self.lineage, record), f"faults below {label}", unique=True))
+        faults_action.setEnabled(self.lineage.fault_count(record) > 0 or self.store.folders[record] != QUEUE_CODE)
+        menu.exec_(self.tree.viewport().mapToGlobal(position))
+
+    def start_export(self, records, label, unique=False, target=None):
+        if target is None:
+            target, _ = QFileDialog.getSaveFileName(self, f"Export {label}", "", EXPORT_FILTER,
+                                                    options=QFileDialog.DontConfirmOverwrite)
+            if not target:
+                return
         try:
-            item_id = int(item.text(0))
-            index = item.text(2)
-            folder = {'Q': 'queue', 'C': 'crashes', 'H': 'hangs'}[index]
-
-            file_dict = None
-            for d in self.parsed_files:
-                if d["id"] == item_id and d['folder'] == folder:
-                    file_dict = d
-                    break
-
-            if file_dict:
-                self.info_dock.update_info(file_dict)
-                if 'filename' in file_dict:
-                    file_path = os.path.join(folder_path, file_dict['folder'], file_dict['filename'])
-                    hex_dump_html = self.dump_widgets.generate_hex_dump(file_path)
-                    self.hex_dump_dock.update_hex_dump(hex_dump_html)
+            self.exporter.start(records, target, label, unique, self.link_action.isChecked())
+        except (OSError, ValueError) as e:
+            self.statusBar().showMessage(f"Error: {e}")
+            return
+        self.export_progress.setRange(0, max(len(records), 1))
+        self.export_progress.setValue(0)
+        for widget in (self.export_label, self.export_progress, self.export_cancel_button):
+            widget.show()
+        self.export_timer.start(EXPORT_POLL_MS)
+        self.update_export_progress()
+
+    def update_export_progress(self):
+        exporter = self.exporter
+        self.export_label.setText(exporter.status_text())
+        self.export_progress.setRange(0, max(exporter.total, 1))
+        self.export_progress.setValue(exporter.done)
+        if not exporter.is_running():
+            self.export_timer.stop()
+            for widget in (self.export_label, self.export_progress, self.export_cancel_button):
+                widget.hide()
+            self.statusBar().showMessage(exporter.status_text())
+
+    def cancel_export(self):
+        self.exporter.cancel()
+        self.update_export_progress()
+
+    def file_path_for(self, record):
+        return os.path.join(self.folder_path, self.store.subfolder(record), self.store.filename(record))
+
+    def prefetch_neighbours(self, index):
+        records = self.tree_model.neighbour_records(index, PREFETCH_CHILDREN)
+        self.dump_widgets.prefetch([self.file_path_for(record) for record in records])
+
+    def update_cache_label(self):
+        self.cache_label.setText(self.dump_widgets.cache.stats_text())
+
+    def update_profile_label(self):
+        self.profile_label.setText(INSTRUMENTS.readout(PROFILE_READOUT))
+
+    def show_item_info(self, index, previous=None):
+        if not index.isValid():
+            return
+        try:
+            record = self.tree_model.record(index)
+            if record is not None:
+                self.request_selection_jobs(record)
+            self.prefetch_neighbours(index)
         except Exception as e:
             print(f"Error in displaying item information: {e}")
 
-    def select_item_in_tree(self, folder, item_id):
-        items = self.tree.findItems(str(item_id), Qt.MatchExactly | Qt.MatchRecursive, 0)
-        if items:
-            for item in items:
-                if item.text(2) == {'queue': 'Q', 'crashes': 'C', 'hangs': 'H'}[folder]:
-                    self.tree.setCurrentItem(item)
-                    self.show_item_info(item)
-                    break
+    def request_selection_jobs(self, record):
+        now = time.perf_counter()
+        self.scrolling = (now - self.selected_at) * 1000 < SCROLL_GAP_MS
+        self.selected_at = now
+        self.discard_pending_results()
+        count('selections')
+
+        jobs = self.selection_jobs
+        jobs.begin()
+        file_path = self.file_path_for(record)
+        parents = [(self.file_path_for(parent), record_label(self.store, parent))
+                   for parent in self.store.src_records(record) if parent != record]
+        jobs.submit('info', info_lines, self.store, self.lineage, self.hashes, self.clusters, record, len(self.store))
+        jobs.submit('dump', self.dump_widgets.generate_hex_dump, file_path)
+        self.diff_dock.show_pending(bool(parents))
+        if parents:
+            jobs.submit('diff', diff_parents, file_path, parents)
+
+    def apply_selection_result(self, generation, kind, result):
+        if not self.selection_jobs.is_current(generation):
+            discard(result)
+            return
+        if kind == 'info' or not self.scrolling:
+            self.show_selection_result(kind, result)
+            return
+        self.pending_results[kind] = result
+        self.result_timer.start()
+
+    def apply_pending_results(self):
+        results, self.pending_results = self.pending_results, {}
+        for kind, result in results.items():
+            self.show_selection_result(kind, result)
+
+    def discard_pending_results(self):
+        self.result_timer.stop()
+        for result in self.pending_results.values():
+            discard(result)
+        self.pending_results = {}
+
+    def show_selection_result(self, kind, result):
+        INSTRUMENTS.record(f'select_{kind}', 'selection', self.selected_at, time.perf_counter())
+        if kind == 'info':
+            self.info_dock.set_lines(result if isinstance(result, list) else [result])
+        elif kind == 'dump':
+            self.hex_dump_dock.update_hex_dump(result)
+            self.update_cache_label()
+        elif kind == 'diff':
+            self.diff_dock.set_diffs(result if isinstance(result, list) else [result])
+
+    def apply_hashes(self):
+        changed = self.hashes.drain()
+        if changed:
+            self.hash_label.setText(self.hashes.status_text())
+            self.tree.viewport().update()
+
+    def select_item_in_tree(self, folder, item_id, instance=''):
+        record = self.store.record_for(folder, item_id, instance)
+        if record is not None:
+            self.select_record(record)
+
+    def show_offset(self, record, offset):
+        self.hex_dump_dock.show_offset(self.file_path_for(record), offset)
+        self.hex_dump_dock.setVisible(True)
+        self.hex_dump_dock.raise_()
+        self.select_record(record)
+
+    def select_record(self, record):
+        index = self.tree_model.index_for_record(record)
+        if index.isValid():
+            self.tree.setCurrentIndex(index)
+            self.tree.scrollTo(index)
+
+    @timed('apply_loaded_parts', 'ui')
+    def apply_loaded_parts(self):
+        if self.loader.finished:
+            if self.loader.is_saved():
+                self.adopt_child_index()
+            return
+
+        deadline = time.perf_counter() + LOAD_BUDGET_MS / 1000
+        first = len(self.store)
+        while time.perf_counter() < deadline:
+            part = self.loader.next_part()
+            if part is None:
+                break
+            records = self.store.merge(part)
+            self.store.link_children()
+            self.orphans.extend(record for record in records if self.store.syncs[record]
+                                and self.store.folders[record] == QUEUE_CODE and not self.store.parent_records(record))
+
+        new_records = range(first, len(self.store))
+        self.loader.loaded = len(self.store)
+        if new_records:
+            count('records_loaded', len(new_records))
+            self.refresh_instances()
+            self.tree_model.add_records(new_records)
+            self.filter_widget.add_records(new_records)
+
+        if self.loader.total:
+            self.load_progress.setMaximum(self.loader.total)
+            self.load_progress.setValue(len(self.store))
+        else:
+            self.load_progress.setMaximum(0)
+        self.load_label.setText(self.loader.status_text())
+
+        if self.loader.is_finished():
+            self.loader.finished = time.perf_counter()
+            self.load_progress.hide()
+            self.load_label.setText(self.loader.status_text())
+            self.loader.start_save(self.store)
+
+    @timed('adopt_child_index', 'ui')
+    def adopt_child_index(self):
+        self.load_timer.stop()
+        self.store.child_offsets, self.store.child_values = self.loader.child_index
+        self.store.extra_children = {}
+
+        orphans, self.orphans = self.orphans, []
+        if any(self.store.parent_records(record) for record in orphans):
+            self.lineage.reset()
+            self.sort_keys.reset()
+            self.filter_widget.filters.sorted_indexes.pop('depth', None)
+            self.select_instance(self.instance_combo.currentIndex())
+
+        if self.hashes:
+            self.hashes.schedule()
+        if self.clusters:
+            self.clusters.schedule()
+
+        self.follow_action.setEnabled(True)
+        if self.follow_requested:
+            self.follow_action.setChecked(True)
+
+    def request_follow(self):
+        if self.follow_action.isEnabled():
+            self.follow_action.setChecked(True)
+        else:
+            self.follow_requested = True
+
+    def toggle_follow(self, checked):
+        if checked:
+            self.start_follow()
+        else:
+            self.stop_follow()
+
+    def start_follow(self):
+        if self.watcher:
+            return
+        self.watcher = OutputWatcher(self.folder_path, self.store.iter_files(), output_subfolders(self.folder_path))
+        self.watcher.start()
+        self.follow_timer.start(FOLLOW_INTERVAL_MS)
+        self.statusBar().showMessage(f"Following {self.folder_path} ({self.watcher.mode})")
+
+    def stop_follow(self):
+        if not self.watcher:
+            return
+        self.follow_timer.stop()
+        self.watcher.stop()
+        self.watcher = None
+        self.statusBar().showMessage("Follow mode stopped")
+
+    @timed('apply_new_entries', 'ui')
+    def apply_new_entries(self):
+        batch = self.watcher.drain(FOLLOW_BATCH)
+        if not batch:
+            return
+
+        new_records = self.store.extend(parse_name(filename, subfolder) for subfolder, filename in batch)
+        if not new_records:
+            return
+
+        count('records_followed', len(new_records))
+        self.tree_model.add_records(new_records)
+        self.filter_widget.add_records(new_records)
+        if self.hashes:
+            self.hashes.schedule()
+        if self.clusters:
+            self.clusters.schedule()
+        self.statusBar().showMessage(f"Following {self.folder_path} ({self.watcher.mode}): "
+                                     f"{len(new_records)} new entries, {len(self.store)} total")
+
+    def closeEvent(self, event):
+        self.profile_timer.stop()
+        if self.loader:
+            self.load_timer.stop()
+            self.loader.stop()
+        self.stop_follow()
+        if self.hashes:
+            self.hash_timer.stop()
+            self.hashes.stop()
+        if self.clusters:
+            self.cluster_timer.stop()
+            self.clusters.stop()
+        self.stats_dock.stop()
+        self.export_timer.stop()
+        self.exporter.cancel()
+        self.filter_widget.shutdown()
+        self.dump_widgets.shutdown()
+        self.discard_pending_results()
+        self.selection_jobs.shutdown()
+        super().closeEvent(event)
 
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
 
-    if len(sys.argv) != 2:
-        print('Use: python3 main.py /путь/к/папке')
-        sys.exit(1)
-
-    folder_path = sys.argv[1]
-
+    parser = argparse.ArgumentParser(usage='python3 main.py [--follow] /путь/к/папке|archive.tar.gz|archive.zip')
+    parser.add_argument('--no-hash', action='store_true', help='do not hash test case contents in the background')
+    parser.add_argument('--no-cluster', action='store_true', help='do not group similar crashes and hangs')
+    parser.add_argument('--workers', type=int, help='processes used to parse large or multi-instance outputs')
+    parser.add_argument('folder_path')
+    parser.add_argument('--follow', action='store_true', help='watch the output directory for new entries')
+    parser.add_argument('--no-index', action='store_true', help='rescan everything instead of using the saved index')
+    parser.add_argument('--progressive', action='store_true',
+                        help='open the window at once and load entries in the background '
+                             '(default when there is no saved index)')
+    parser.add_argument('--profile', metavar='TRACE',
+                        help='record timings and write a Chrome trace (JSON) to TRACE on exit')
+    parser.add_argument('--cprofile', metavar='STATS', help='also write cProfile statistics of the UI thread to STATS')
+    args = parser.parse_args(app.arguments()[1:])
+    if args.profile or args.cprofile:
+        INSTRUMENTS.enable(cprofile=bool(args.cprofile))
+
+    folder_path = args.folder_path
+
+    loader = None
+    sequential = False
     try:
-        parsed_files = parse_filename(folder_path)
-        reformatted_files = reformat_dict(parsed_files)
+        if is_archive(folder_path):
+            store = load_store(folder_path, args.workers)
+            sequential = not open_archive(folder_path).random_access
+        elif args.progressive or (not args.no_index and not os.path.isfile(index_path_for(folder_path))):
+            store = RecordStore()
+            loader = ProgressiveLoader(folder_path, use_index=not args.no_index)
+        elif args.no_index:
+            store = load_store(folder_path, args.workers)
+        else:
+            store = load_store_cached(folder_path, args.workers)
     except Exception as e:
         print(f"Error during file processing: {e}")
         sys.exit(1)
 
-    main_win = MainWindow(reformatted_files)
+    main_win = MainWindow(store, folder_path, not args.no_hash and not sequential, not args.no_cluster, loader)
     main_win.show()
-
-    sys.exit(app.exec_())
+    if args.follow:
+        main_win.request_follow()
+
+    status = app.exec_()
+    if INSTRUMENTS.enabled:
+        INSTRUMENTS.disable()
+        if args.profile:
+            INSTRUMENTS.write_trace(args.profile)
+        if args.cprofile:
+            INSTRUMENTS.write_profile(args.cprofile)
+    sys.exit(status)
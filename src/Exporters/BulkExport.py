@@ -0,0 +1,404 @@
+import fcntl
+import hashlib
+import io
+import json
+import os
+import tarfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from src.Loaders.Archives import archive_codec, archive_for
+from src.Profiling.Instruments import span
+from src.Records.RecordStore import ABSENT, QUEUE_CODE
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_SUFFIX = '.manifest.json'
+MANIFEST_FIELDS = ['instance', 'folder', 'id', 'sync', 'time', 'execs', 'op', 'rep', 'orig']
+EXPORT_BATCH = 256
+COPY_CHUNK = 1024 * 1024
+MAX_ERRORS = 100
+DEFAULT_WORKERS = 8
+FICLONE = 0x40049409
+TARBALL_MODES = {'': ('w', {}), 'gz': ('w:gz', {'compresslevel': 1}), 'bz2': ('w:bz2', {'compresslevel': 1}),
+                 'xz': ('w:xz', {'preset': 1})}
+COPY_METHODS = ['hardlink', 'reflink', 'copy_file_range']
+
+
+def subtree_records(store, record):
+    records = [record]
+    seen = {record}
+    for current in records:
+        for child in store.children(current):
+            if child not in seen:
+                seen.add(child)
+                records.append(child)
+    return records
+
+
+def fault_records(lineage, record):
+    faults = lineage.fault_descendants(record)
+    if lineage.store.folders[record] != QUEUE_CODE:
+        faults.insert(0, record)
+    return faults
+
+
+def relative_path(store, record):
+    return os.path.join(store.subfolder(record), store.filename(record))
+
+
+def copy_descriptors(source_fd, target_fd, size, methods):
+    if 'reflink' in methods:
+        try:
+            fcntl.ioctl(target_fd, FICLONE, source_fd)
+            return 'reflink'
+        except OSError:
+            methods.discard('reflink')
+
+    if 'copy_file_range' in methods:
+        copied = 0
+        try:
+            while copied < size:
+                count = os.copy_file_range(source_fd, target_fd, size - copied)
+                if count == 0:
+                    break
+                copied += count
+            return 'copy_file_range'
+        except OSError:
+            methods.discard('copy_file_range')
+            if copied:
+                os.lseek(source_fd, copied, os.SEEK_SET)
+                os.lseek(target_fd, copied, os.SEEK_SET)
+
+    while True:
+        chunk = os.read(source_fd, COPY_CHUNK)
+        if not chunk:
+            return 'copy'
+        write_data(target_fd, chunk)
+
+
+def temp_path_for(target_path):
+    return f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def replace_file(target_path, write):
+    temp_path = temp_path_for(target_path)
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        try:
+            result = write(fd)
+        finally:
+            os.close(fd)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return result
+
+
+def write_data(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def link_file(source_path, target_path, methods):
+    try:
+        os.link(source_path, target_path)
+        return True
+    except FileExistsError:
+        if os.path.samefile(source_path, target_path):
+            return True
+        os.unlink(target_path)
+    except OSError:
+        methods.discard('hardlink')
+        return False
+    try:
+        os.link(source_path, target_path)
+        return True
+    except OSError:
+        return False
+
+
+def copy_file(source_path, target_path, methods):
+    if 'hardlink' in methods and link_file(source_path, target_path, methods):
+        return 'hardlink', os.stat(target_path).st_size
+
+    source_fd = os.open(source_path, os.O_RDONLY)
+    try:
+        size = os.fstat(source_fd).st_size
+        return replace_file(target_path, lambda target_fd: copy_descriptors(source_fd, target_fd, size, methods)), size
+    finally:
+        os.close(source_fd)
+
+
+class BulkExport:
+    def __init__(self, store, folder_path, lineage, hashes=None, workers=DEFAULT_WORKERS):
+        self.store = store
+        self.folder_path = folder_path
+        self.lineage = lineage
+        self.hashes = hashes
+        self.workers = workers
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.target = None
+            self.label = ''
+            self.total = 0
+            self.done = 0
+            self.done_bytes = 0
+            self.duplicates = 0
+            self.methods = Counter()
+            self.errors = []
+            self.error_count = 0
+            self.started = None
+            self.finished = None
+            self.cancelled = False
+            self.failure = None
+            self.store_stop = 0
+
+    def start(self, records, target, label='', unique=False, link=False):
+        self.cancel()
+        codec = archive_codec(target)
+        if codec is not None and codec not in TARBALL_MODES:
+            raise ValueError(f"Cannot export to '{target}', use a directory, .tar, .tar.gz, .tar.xz or .tar.bz2")
+        self.reset()
+        self.target = target
+        self.label = label
+        self.total = len(records)
+        self.store_stop = len(self.store)
+        self.started = time.perf_counter()
+        self.stop_event = threading.Event()
+        jobs = [(record, relative_path(self.store, record)) for record in records]
+        methods = set(COPY_METHODS if link else COPY_METHODS[1:])
+        if not hasattr(os, 'copy_file_range'):
+            methods.discard('copy_file_range')
+        self.thread = threading.Thread(target=self.run, args=(jobs, target, codec, unique, methods, self.stop_event),
+                                       name='bulk-export', daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        if self.finished is None:
+            self.cancelled = True
+            self.finished = time.perf_counter()
+
+    def is_running(self):
+        return self.thread is not None and self.finished is None
+
+    def run(self, jobs, target, codec, unique, methods, stop_event):
+        try:
+            with span('bulk_export', 'background'):
+                with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bulk-export') as pool:
+                    archive = archive_for(self.folder_path)
+                    if archive is not None and not archive.random_access:
+                        jobs.sort(key=lambda job: (archive.entry(self.source_path(job[1])) or (0,))[0])
+                    if unique:
+                        jobs = self.unique_jobs(pool, jobs, stop_event)
+                    if codec is None:
+                        self.export_directory(pool, jobs, target, methods, stop_event)
+                    else:
+                        self.export_tarball(pool, jobs, target, codec, stop_event)
+        except Exception as e:
+            print(f"Error during export to '{target}': {e}")
+            self.failure = str(e)
+        finally:
+            if self.error_count:
+                print(f"Error: {self.error_count} file(s) could not be exported to '{target}', "
+                      f"first: {self.errors[0][1]}")
+            if not stop_event.is_set():
+                self.finished = time.perf_counter()
+
+    def source_path(self, relative):
+        return os.path.join(self.folder_path, relative)
+
+    def content_key(self, job):
+        record, relative = job
+        if self.hashes is not None:
+            digest = self.hashes.digest(record)
+            if digest is not None:
+                return digest
+        archive = archive_for(self.folder_path)
+        try:
+            if archive is not None:
+                data = archive.read(self.source_path(relative))
+            else:
+                with open(self.source_path(relative), 'rb') as f:
+                    data = f.read()
+        except (OSError, ValueError):
+            return relative
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def unique_jobs(self, pool, jobs, stop_event):
+        unique = []
+        seen = set()
+        for job, key in zip(jobs, pool.map(self.content_key, jobs)):
+            if stop_event.is_set():
+                break
+            if key not in seen:
+                seen.add(key)
+                unique.append(job)
+        with self.lock:
+            self.duplicates = len(jobs) - len(unique)
+            self.total = len(unique)
+        return unique
+
+    def add_error(self, relative, error):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((relative, str(error)))
+
+    def finish_batch(self, exported, methods, errors):
+        with self.lock:
+            self.done += len(exported) + len(errors)
+            self.done_bytes += sum(size for _, _, size, _ in exported)
+            self.methods.update(methods)
+            for relative, error in errors:
+                self.add_error(relative, error)
+
+    def copy_batch(self, jobs, target, methods, stop_event):
+        archive = archive_for(self.folder_path)
+        exported, used, errors = [], Counter(), []
+        for record, relative in jobs:
+            if stop_event.is_set():
+                break
+            destination = os.path.join(target, relative)
+            try:
+                if archive is not None:
+                    data = archive.read(self.source_path(relative))
+                    replace_file(destination, lambda fd: write_data(fd, data))
+                    size, method = len(data), 'archive'
+                else:
+                    method, size = copy_file(self.source_path(relative), destination, methods)
+            except (OSError, ValueError) as e:
+                errors.append((relative, e))
+                continue
+            exported.append((record, relative, size, method))
+            used[method] += 1
+        self.finish_batch(exported, used, errors)
+        return exported
+
+    def export_directory(self, pool, jobs, target, methods, stop_event):
+        for directory in {os.path.dirname(relative) for _, relative in jobs}:
+            os.makedirs(os.path.join(target, directory), exist_ok=True)
+        archive = archive_for(self.folder_path)
+        if archive is not None and not archive.random_access:
+            exported = []
+            for start in range(0, len(jobs), EXPORT_BATCH):
+                exported.extend(self.copy_batch(jobs[start:start + EXPORT_BATCH], target, methods, stop_event))
+        else:
+            futures = [pool.submit(self.copy_batch, jobs[start:start + EXPORT_BATCH], target, methods, stop_event)
+                       for start in range(0, len(jobs), EXPORT_BATCH)]
+            exported = []
+            for future in futures:
+                exported.extend(future.result())
+        self.write_manifest(target.rstrip(os.sep) + MANIFEST_SUFFIX, exported, stop_event.is_set())
+
+    def read_job(self, job):
+        record, relative = job
+        try:
+            archive = archive_for(self.folder_path)
+            if archive is not None:
+                return job, archive.read(self.source_path(relative)), None
+            with open(self.source_path(relative), 'rb') as f:
+                return job, f.read(), None
+        except (OSError, ValueError) as e:
+            return job, None, e
+
+    def export_tarball(self, pool, jobs, target, codec, stop_event):
+        mode, options = TARBALL_MODES[codec]
+        mtime = int(time.time())
+        exported = []
+        with tarfile.open(target, mode, **options) as tar:
+            window = EXPORT_BATCH * self.workers
+            for start in range(0, len(jobs), window):
+                if stop_event.is_set():
+                    break
+                added, errors = [], []
+                for (record, relative), data, error in pool.map(self.read_job, jobs[start:start + window]):
+                    if error is not None:
+                        errors.append((relative, error))
+                        continue
+                    info = tarfile.TarInfo(relative)
+                    info.size = len(data)
+                    info.mtime = mtime
+                    info.mode = 0o644
+                    tar.addfile(info, io.BytesIO(data))
+                    added.append((record, relative, len(data), 'tar'))
+                self.finish_batch(added, Counter(tar=len(added)), errors)
+                exported.extend(added)
+
+            manifest = self.manifest(exported, stop_event.is_set())
+            info = tarfile.TarInfo(MANIFEST_NAME)
+            info.size = len(manifest)
+            info.mtime = mtime
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(manifest))
+
+    def record_entry(self, record, relative, size):
+        store = self.store
+        lineage = self.lineage
+        entry = {'path': relative, 'size': size}
+        for field in MANIFEST_FIELDS:
+            value = store.get(record, field)
+            if value is not None:
+                entry[field] = value
+        entry['depth'] = lineage.depths[record]
+        entry['parents'] = [relative_path(store, parent) for parent in store.src_records(record)]
+        seed = lineage.seeds[record]
+        if seed != ABSENT and seed != record:
+            entry['seed'] = relative_path(store, seed)
+        digest = self.hashes.digest(record) if self.hashes is not None else None
+        if digest is not None:
+            entry['blake2b'] = digest
+        return entry
+
+    def manifest(self, exported, cancelled):
+        with self.lock:
+            header = {
+                'source': os.path.abspath(self.folder_path),
+                'label': self.label,
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'complete': not cancelled and not self.error_count,
+                'count': len(exported),
+                'bytes': sum(size for _, _, size, _ in exported),
+                'duplicates_skipped': self.duplicates,
+                'methods': dict(self.methods),
+                'errors': [{'path': relative, 'error': error} for relative, error in self.errors],
+            }
+        with self.lineage.lock:
+            self.lineage.update(self.store_stop)
+            header['records'] = [self.record_entry(record, relative, size) for record, relative, size, _ in exported]
+        return json.dumps(header).encode('utf-8')
+
+    def write_manifest(self, manifest_path, exported, cancelled):
+        with open(manifest_path, 'wb') as f:
+            f.write(self.manifest(exported, cancelled))
+
+    def status_text(self):
+        if self.started is None:
+            return ""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        rate = self.done_bytes / 2 ** 20 / elapsed if elapsed > 0 else 0
+        state = "Export cancelled" if self.cancelled else "Exported" if self.finished else "Exporting"
+        text = (f"{state} {self.done:,} / {self.total:,} files to {os.path.basename(self.target)} "
+                f"({self.done_bytes / 2 ** 20:,.1f} MiB, {rate:,.0f} MiB/s)")
+        if self.duplicates:
+            text += f", {self.duplicates:,} duplicates skipped"
+        if self.error_count:
+            text += f", {self.error_count:,} errors"
+        if self.failure:
+            text += f": {self.failure}"
+        return text
@@ -0,0 +1,217 @@
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from src.Loaders.Archives import archive_for
+from src.Profiling.Instruments import span
+
+PATTERN_MODES = ('hex', 'text', 'regex')
+MAX_OFFSETS = 16
+SHARD_FILES = 128
+MMAP_MIN = 64 * 1024
+POLL_INTERVAL = 0.1
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 8)
+HEX_SEPARATORS = re.compile(r'\\x|0x|[\s,:]')
+HEX_TOKEN = re.compile(r'[0-9a-fA-F]{2}|\?\?')
+
+
+def parse_pattern(text, mode):
+    if not text:
+        raise ValueError("Enter a pattern to search for")
+    if mode == 'text':
+        return text.encode('utf-8', 'surrogateescape'), False
+    if mode == 'regex':
+        pattern = text.encode('utf-8', 'surrogateescape')
+        try:
+            re.compile(pattern, re.DOTALL)
+        except re.error as e:
+            raise ValueError(f"Invalid regex: {e}")
+        return pattern, True
+    if mode != 'hex':
+        raise ValueError(f"Unknown pattern mode '{mode}'")
+
+    compact = HEX_SEPARATORS.sub('', text)
+    tokens = [compact[i:i + 2] for i in range(0, len(compact), 2)]
+    if not tokens or not all(HEX_TOKEN.fullmatch(token) for token in tokens):
+        raise ValueError(f"'{text}' is not a hex byte sequence (use ?? for any byte)")
+    if '??' not in tokens:
+        return bytes.fromhex(compact), False
+    return b''.join(b'.' if token == '??' else re.escape(bytes.fromhex(token)) for token in tokens), True
+
+
+def find_offsets(data, pattern, is_regex):
+    offsets = []
+    if is_regex:
+        for match in re.compile(pattern, re.DOTALL).finditer(data):
+            offsets.append(match.start())
+            if len(offsets) == MAX_OFFSETS:
+                break
+        return offsets
+
+    position = data.find(pattern)
+    while position != -1 and len(offsets) < MAX_OFFSETS:
+        offsets.append(position)
+        position = data.find(pattern, position + 1)
+    return offsets
+
+
+def search_shard(pattern, is_regex, files):
+    hits = []
+    searched_bytes = 0
+    for record, file_path in files:
+        try:
+            with open(file_path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    continue
+                data = f.read() if size < MMAP_MIN else mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                offsets = find_offsets(data, pattern, is_regex)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+        except (OSError, ValueError):
+            continue
+        searched_bytes += size
+        if offsets:
+            hits.append((record, offsets))
+    return hits, len(files), searched_bytes
+
+
+class ContentSearch:
+    def __init__(self, store, folder_path, workers=DEFAULT_WORKERS):
+        self.store = store
+        self.folder_path = folder_path
+        self.workers = workers
+        self.pool = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.pending = []
+            self.offsets = {}
+            self.total = 0
+            self.searched = 0
+            self.searched_bytes = 0
+            self.started = None
+            self.finished = None
+            self.cancelled = False
+
+    def start(self, pattern, is_regex):
+        self.cancel()
+        self.reset()
+        archive = archive_for(self.folder_path)
+        if archive is None and self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context('forkserver'))
+        self.stop_event = threading.Event()
+        self.total = len(self.store)
+        self.started = time.perf_counter()
+        target, args = self.run, (pattern, is_regex, self.total, self.stop_event)
+        if archive is not None:
+            target, args = self.run_archive, (archive,) + args
+        self.thread = threading.Thread(target=target, args=args, name='content-search', daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        if self.finished is None:
+            self.cancelled = True
+            self.finished = time.perf_counter()
+
+    def shutdown(self):
+        self.cancel()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def shard(self, start, stop):
+        store = self.store
+        return [(record, os.path.join(self.folder_path, store.subfolder(record), store.filename(record)))
+                for record in range(start, stop)]
+
+    def run(self, pattern, is_regex, total, stop_event):
+        in_flight = set()
+        position = 0
+        try:
+            with span('content_search', 'background'):
+                while not stop_event.is_set() and (position < total or in_flight):
+                    while position < total and len(in_flight) < self.workers * 2:
+                        stop = min(position + SHARD_FILES, total)
+                        in_flight.add(self.pool.submit(search_shard, pattern, is_regex, self.shard(position, stop)))
+                        position = stop
+                    done, in_flight = wait(in_flight, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        hits, searched, searched_bytes = future.result()
+                        with self.lock:
+                            if stop_event.is_set():
+                                break
+                            self.pending.extend(hits)
+                            self.searched += searched
+                            self.searched_bytes += searched_bytes
+        except Exception as e:
+            print(f"Error during content search: {e}")
+        finally:
+            for future in in_flight:
+                future.cancel()
+            if not stop_event.is_set():
+                self.finished = time.perf_counter()
+
+    def run_archive(self, archive, pattern, is_regex, total, stop_event):
+        try:
+            with span('content_search', 'background'):
+                records = {file_path: record for record, file_path in self.shard(0, total)}
+                hits, searched, searched_bytes = [], 0, 0
+                for file_path, data in archive.scan(records):
+                    if stop_event.is_set():
+                        break
+                    offsets = find_offsets(data, pattern, is_regex)
+                    if offsets:
+                        hits.append((records[file_path], offsets))
+                    searched += 1
+                    searched_bytes += len(data)
+                    if searched == SHARD_FILES:
+                        with self.lock:
+                            self.pending.extend(hits)
+                            self.searched += searched
+                            self.searched_bytes += searched_bytes
+                        hits, searched, searched_bytes = [], 0, 0
+                with self.lock:
+                    self.pending.extend(hits)
+                    self.searched += searched
+                    self.searched_bytes += searched_bytes
+        except Exception as e:
+            print(f"Error during content search: {e}")
+        finally:
+            if not stop_event.is_set():
+                self.finished = time.perf_counter()
+
+    def drain(self):
+        with self.lock:
+            hits, self.pending = self.pending, []
+            for record, offsets in hits:
+                self.offsets[record] = offsets
+        return [record for record, _ in hits]
+
+    def is_running(self):
+        return self.thread is not None and self.finished is None
+
+    def status_text(self):
+        if self.started is None:
+            return ""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        rate = self.searched_bytes / 2 ** 20 / elapsed if elapsed > 0 else 0
+        state = "Cancelled" if self.cancelled else "Searched" if self.finished else "Searching"
+        return (f"{state} {self.searched:,} / {self.total:,} files ({self.searched_bytes / 2 ** 20:,.1f} MiB, "
+                f"{rate:,.0f} MiB/s): {len(self.offsets):,} matches")
@@ -1,14 +1,300 @@
+import re
+from array import array
+from bisect import bisect_left
+
+from src.Profiling.Instruments import timed
+from src.Records.Lineage import Lineage
+from src.Records.RecordStore import FOLDER_CODES
+
+TERM_PATTERN = re.compile(r'([a-z]+)(>=|<=|:|=|>|<)(.+)')
+NUMERIC_KEYS = ('id', 'time', 'execs', 'rep', 'depth')
+INVERTED_KEYS = ('op', 'folder', 'instance', 'src')
+MAX_VALUE = 2 ** 63 - 1
+
+
+def parse_number(value):
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"'{value}' is not a number")
+    if number != number:
+        raise ValueError(f"'{value}' is not a number")
+    return int(min(max(number, -MAX_VALUE), MAX_VALUE))
+
+
+def value_range(operator, value):
+    number = parse_number(value)
+    if operator in (':', '='):
+        return number, number + 1
+    if operator == '>':
+        return number + 1, MAX_VALUE
+    if operator == '>=':
+        return number, MAX_VALUE
+    if operator == '<':
+        return 0, number
+    return 0, number + 1
+
+
+class SortedIndex:
+    def __init__(self, column, tail_limit=4096):
+        self.column = column
+        self.tail_limit = tail_limit
+        self.rebuild()
+
+    def rebuild(self):
+        column = self.column
+        self.records = array('q', sorted(range(len(column)), key=column.__getitem__))
+        self.values = array('q', map(column.__getitem__, self.records))
+        self.tail = []
+
+    def add(self, records):
+        self.tail.extend(records)
+        if len(self.tail) > max(self.tail_limit, len(self.records) // 8):
+            self.rebuild()
+
+    def bounds(self, low, high):
+        return bisect_left(self.values, max(low, 0)), bisect_left(self.values, high)
+
+    def count(self, low, high):
+        start, stop = self.bounds(low, high)
+        return stop - start + len(self.tail)
+
+    def select(self, low, high):
+        start, stop = self.bounds(low, high)
+        records = self.records[start:stop]
+        column = self.column
+        low = max(low, 0)
+        records.extend(record for record in self.tail if low <= column[record] < high)
+        return records
+
+
+class InvertedIndex:
+    def __init__(self, pairs):
+        self.pairs = pairs
+        self.postings = {}
+
+    def add(self, records):
+        postings = self.postings
+        for value, record in self.pairs(records):
+            posting = postings.get(value)
+            if posting is None:
+                posting = postings[value] = array('q')
+            posting.append(record)
+
+    def count(self, values):
+        return sum(len(self.postings.get(value, ())) for value in values)
+
+    def select(self, values):
+        postings = [self.postings[value] for value in values if value in self.postings]
+        if len(postings) == 1:
+            return array('q', postings[0])
+        return array('q', sorted(set().union(*postings)))
+
+
+class RangeTerm:
+    def __init__(self, index, column, low, high):
+        self.index = index
+        self.column = column
+        self.low = max(low, 0)
+        self.high = high
+
+    def count(self):
+        return self.index.count(self.low, self.high)
+
+    def select(self):
+        return self.index.select(self.low, self.high)
+
+    def test(self, record):
+        return self.low <= self.column[record] < self.high
+
+
+class MatchTerm:
+    def __init__(self, index, values, test):
+        self.index = index
+        self.values = values
+        self.test = test
+
+    def count(self):
+        return self.index.count(self.values)
+
+    def select(self):
+        return self.index.select(self.values)
+
+
+class IdTextTerm:
+    def __init__(self, owner, text):
+        self.owner = owner
+        self.text = text
+
+    def count(self):
+        return len(self.owner.store)
+
+    def select(self):
+        return self.owner.search_id_text(self.text)
+
+    def test(self, record):
+        return self.text in str(self.owner.store.ids[record])
+
+
+class DuplicateTerm:
+    def __init__(self, hashes, store, wanted):
+        self.hashes = hashes
+        self.store = store
+        self.wanted = wanted
+
+    def count(self):
+        if self.wanted:
+            return self.hashes.duplicate_count
+        return len(self.store) - self.hashes.duplicate_count
+
+    def select(self):
+        if self.wanted:
+            return self.hashes.duplicate_records()
+        return array('q', [record for record in range(len(self.store)) if self.test(record)])
+
+    def test(self, record):
+        return (self.hashes.group_size(record) > 1) == self.wanted
+
+
 class Filter:
-    def __init__(self, parsed_files):
-        self.parsed_files = parsed_files
+    def __init__(self, store, lineage=None, hashes=None):
+        self.store = store
+        self.lineage = lineage or Lineage(store)
+        self.hashes = hashes
+        self.sorted_indexes = {}
+        self.inverted_indexes = {}
+        self.id_text = None
+        self.id_stride = 1
+
+    def add_records(self, records):
+        if 'depth' in self.sorted_indexes:
+            self.lineage.update()
+        for index in self.sorted_indexes.values():
+            index.add(records)
+        for index in self.inverted_indexes.values():
+            index.add(records)
+        self.id_text = None
+
+    def column(self, key):
+        if key == 'id':
+            return self.store.ids
+        if key == 'depth':
+            self.lineage.update()
+            return self.lineage.depths
+        return self.store.int_columns[key]
+
+    def sorted_index(self, key):
+        index = self.sorted_indexes.get(key)
+        if index is None:
+            index = self.sorted_indexes[key] = SortedIndex(self.column(key))
+        return index
+
+    def inverted_index(self, key):
+        index = self.inverted_indexes.get(key)
+        if index is None:
+            store = self.store
+            if key == 'op':
+                ops = store.ops
+                index = InvertedIndex(lambda records: zip(map(ops.__getitem__, records), records))
+            elif key == 'folder':
+                folders = store.folders
+                index = InvertedIndex(lambda records: zip(map(folders.__getitem__, records), records))
+            elif key == 'instance':
+                instances = store.instances
+                index = InvertedIndex(lambda records: zip(map(instances.__getitem__, records), records))
+            else:
+                index = InvertedIndex(self.src_pairs)
+            index.add(range(len(store)))
+            self.inverted_indexes[key] = index
+        return index
+
+    def src_values(self, record):
+        store = self.store
+        return store.src_values[store.src_offsets[record]:store.src_offsets[record + 1]]
 
+    def src_pairs(self, records):
+        offsets = self.store.src_offsets
+        values = self.store.src_values
+        for record in records:
+            start = offsets[record]
+            stop = offsets[record + 1]
+            if stop - start == 1:
+                yield values[start], record
+            elif stop > start:
+                for value in set(values[start:stop]):
+                    yield value, record
+
+    def search_id_text(self, text):
+        if self.id_text is None:
+            width = len(str(max(self.store.ids, default=0)))
+            self.id_text = '\n'.join([str(item_id).rjust(width) for item_id in self.store.ids])
+            self.id_stride = width + 1
+
+        stride = self.id_stride
+        starts = {match.start() // stride for match in re.finditer(re.escape(text), self.id_text)}
+        return array('q', sorted(starts))
+
+    def parse_term(self, term):
+        if term.isdigit():
+            return IdTextTerm(self, term)
+
+        match = TERM_PATTERN.fullmatch(term)
+        if not match:
+            raise ValueError(f"Unknown query term '{term}'")
+        key, operator, value = match.groups()
+
+        if key == 'dup':
+            if self.hashes is None:
+                raise ValueError("Content hashes are not available")
+            if operator not in (':', '=') or value not in ('yes', 'no'):
+                raise ValueError(f"Expected dup:yes or dup:no, got '{term}'")
+            return DuplicateTerm(self.hashes, self.store, value == 'yes')
+
+        if key in NUMERIC_KEYS:
+            low, high = value_range(operator, value)
+            return RangeTerm(self.sorted_index(key), self.column(key), low, high)
+        if key not in INVERTED_KEYS or operator not in (':', '='):
+            raise ValueError(f"Unsupported query term '{term}'")
+
+        values = value.split(',')
+        if key == 'op':
+            codes = {self.store.strings.codes.get(op) for op in values} - {None}
+            ops = self.store.ops
+            return MatchTerm(self.inverted_index(key), codes, lambda record: ops[record] in codes)
+        if key == 'folder':
+            unknown = [folder for folder in values if folder not in FOLDER_CODES]
+            if unknown:
+                raise ValueError(f"Unknown folder '{unknown[0]}'")
+            codes = {FOLDER_CODES[folder] for folder in values}
+            folders = self.store.folders
+            return MatchTerm(self.inverted_index(key), codes, lambda record: folders[record] in codes)
+
+        if key == 'instance':
+            codes = {self.store.instance_names.codes.get(instance, 0) - 1 for instance in values} - {-1}
+            instances = self.store.instances
+            return MatchTerm(self.inverted_index(key), codes, lambda record: instances[record] in codes)
+
+        sources = {parse_number(src_value) for src_value in values}
+        return MatchTerm(self.inverted_index(key), sources,
+                         lambda record: not sources.isdisjoint(self.src_values(record)))
+
+    @timed('query', 'ui')
+    def query(self, text):
+        terms = [self.parse_term(term) for term in text.split()]
+        if not terms:
+            return array('q')
+
+        terms.sort(key=lambda term: term.count())
+        records = terms[0].select()
+        for term in terms[1:]:
+            test = term.test
+            records = array('q', [record for record in records if test(record)])
+            if not records:
+                break
+        return records
+
+    @timed('search_by_id', 'ui')
     def search_by_id(self, search_term):
         if not search_term.isdigit():
             raise ValueError("The identifier must be a numeric value")
-
-        matching_items = [
-            file_dict for file_dict in self.parsed_files
-            if search_term.lower() in str(file_dict.get('id', '')).lower()
-        ]
-
-        return matching_items
+        return self.search_id_text(search_term)
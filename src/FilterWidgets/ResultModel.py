@@ -0,0 +1,56 @@
+from array import array
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+RecordRole = Qt.UserRole + 1
+SHOWN_OFFSETS = 4
+
+
+class ResultModel(QAbstractListModel):
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.records = array('q')
+        self.offsets = {}
+
+    def set_records(self, records, offsets=None):
+        self.beginResetModel()
+        self.records = records
+        self.offsets = offsets if offsets is not None else {}
+        self.endResetModel()
+
+    def add_records(self, records):
+        if not records:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.records), len(self.records) + len(records) - 1)
+        self.records.extend(records)
+        self.endInsertRows()
+
+    def first_offset(self, index):
+        offsets = self.offsets.get(self.record(index))
+        return offsets[0] if offsets else None
+
+    def record(self, index):
+        if not index.isValid():
+            return None
+        return self.records[index.row()]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.records)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.records[index.row()]
+        if role == Qt.DisplayRole:
+            label = f"{self.store.subfolder(record)}: {self.store.id(record)}"
+            offsets = self.offsets.get(record)
+            if offsets:
+                more = ', …' if len(offsets) > SHOWN_OFFSETS else ''
+                label += f" @ {', '.join(f'0x{offset:x}' for offset in offsets[:SHOWN_OFFSETS])}{more}"
+            return label
+        if role == RecordRole:
+            return record
+        return None
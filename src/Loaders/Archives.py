@@ -0,0 +1,502 @@
+import bisect
+import bz2
+import lzma
+import os
+import shutil
+import struct
+import subprocess
+import threading
+import zlib
+from collections import OrderedDict
+
+from src.Profiling.Instruments import span, timed
+from src.Records.RecordStore import FOLDERS
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_SUFFIXES = [('.tar.gz', 'gz'), ('.tgz', 'gz'), ('.tar.zst', 'zst'), ('.tzst', 'zst'),
+                    ('.tar.xz', 'xz'), ('.txz', 'xz'), ('.tar.bz2', 'bz2'), ('.tbz2', 'bz2'),
+                    ('.tar', ''), ('.zip', 'zip')]
+READ_CHUNK = 1024 * 1024
+BLOCK_SIZE = 256 * 1024
+BLOCK_CACHE_BYTES = 32 * 1024 * 1024
+CHECKPOINT_SPACING = 8 * 1024 * 1024
+TAR_BLOCK = 512
+TAR_FILE_TYPES = (b'0', b'\0', b'7')
+ZIP_END_SIGNATURE = b'PK\x05\x06'
+ZIP_CENTRAL_SIGNATURE = b'PK\x01\x02'
+ZIP_LOCAL_SIGNATURE = b'PK\x03\x04'
+ZIP_END = struct.Struct('<4s4H2LH')
+ZIP64_LOCATOR = struct.Struct('<4sLQL')
+ZIP64_END = struct.Struct('<4sQ2H2L4Q')
+ZIP_CENTRAL = struct.Struct('<4s6H3L5H2L')
+ZIP_LOCAL = struct.Struct('<4s5H3L2H')
+
+ARCHIVES = {}
+ARCHIVES_LOCK = threading.Lock()
+
+
+def archive_codec(path):
+    lowered = path.lower()
+    for suffix, codec in ARCHIVE_SUFFIXES:
+        if lowered.endswith(suffix):
+            return codec
+    return None
+
+
+def is_archive(path):
+    return archive_codec(path) is not None and os.path.isfile(path)
+
+
+def open_archive(path):
+    full_path = os.path.abspath(path)
+    with ARCHIVES_LOCK:
+        archive = ARCHIVES.get(full_path)
+        if archive is None:
+            codec = archive_codec(full_path)
+            archive = ZipArchive(full_path) if codec == 'zip' else TarArchive(full_path, codec)
+            ARCHIVES[full_path] = archive
+        if path + os.sep not in archive.prefixes:
+            archive.prefixes.append(path + os.sep)
+        return archive
+
+
+def archive_for(file_path):
+    if not ARCHIVES:
+        return None
+    for archive in ARCHIVES.values():
+        if any(file_path.startswith(prefix) for prefix in archive.prefixes):
+            return archive
+    file_path = os.path.abspath(file_path)
+    for path, archive in ARCHIVES.items():
+        if file_path == path or file_path.startswith(path + os.sep):
+            return archive
+    return None
+
+
+def tar_number(field):
+    if field[0] & 0x80:
+        return int.from_bytes(field[1:], 'big')
+    return int(field.split(b'\0', 1)[0].strip() or b'0', 8)
+
+
+def tar_checksum_ok(header):
+    try:
+        expected = tar_number(header[148:156])
+    except ValueError:
+        return False
+    return sum(header) - sum(header[148:156]) + 8 * 32 == expected
+
+
+def pax_records(data):
+    records = {}
+    position = 0
+    while position < len(data):
+        length, _, rest = data[position:position + 32].partition(b' ')
+        if not length.isdigit() or int(length) <= 0:
+            break
+        record = data[position + len(length) + 1:position + int(length) - 1]
+        key, _, value = record.partition(b'=')
+        records[key] = value
+        position += int(length)
+    return records
+
+
+def tar_members(read, skip):
+    offset = 0
+    long_name = None
+    overrides = {}
+    while True:
+        header = read(TAR_BLOCK)
+        if len(header) < TAR_BLOCK or not header.strip(b'\0'):
+            return
+        if offset == 0 and not tar_checksum_ok(header):
+            raise ValueError("Not a tar archive")
+
+        size = tar_number(header[124:136])
+        kind = header[156:157]
+        offset += TAR_BLOCK
+        padded = (size + TAR_BLOCK - 1) // TAR_BLOCK * TAR_BLOCK
+        if kind == b'L':
+            long_name = read(padded)[:size].rstrip(b'\0')
+        elif kind == b'x':
+            overrides = pax_records(read(padded)[:size])
+        else:
+            name = header[:100].split(b'\0', 1)[0]
+            if header[257:262] == b'ustar' and header[345] and not long_name:
+                name = header[345:500].split(b'\0', 1)[0] + b'/' + name
+            name = overrides.get(b'path', long_name or name)
+            size = int(overrides.get(b'size', size))
+            if kind in TAR_FILE_TYPES:
+                yield name.decode('utf-8', 'surrogateescape'), offset, size
+            padded = (size + TAR_BLOCK - 1) // TAR_BLOCK * TAR_BLOCK
+            long_name = None
+            overrides = {}
+            skip(padded)
+        offset += padded
+
+
+def new_decompressor(codec):
+    if codec == 'gz':
+        return zlib.decompressobj(zlib.MAX_WBITS | 16)
+    if codec == 'bz2':
+        return bz2.BZ2Decompressor()
+    if codec == 'xz':
+        return lzma.LZMADecompressor()
+    if codec == 'zst' and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"Unknown compression '{codec}'")
+
+
+class DecompressedStream:
+    def __init__(self, path, codec, checkpoint=None, checkpoints=None):
+        self.codec = codec
+        self.checkpoints = checkpoints
+        self.buffer = b''
+        self.cursor = 0
+        self.file = None
+        self.process = None
+        self.decompressor = None
+
+        if codec == 'zst' and zstandard is None:
+            command = shutil.which('zstd')
+            if command is None:
+                raise OSError(f"Reading '{path}' needs the zstandard module or the zstd command")
+            self.process = subprocess.Popen([command, '-dcq', path], stdout=subprocess.PIPE)
+            self.position = 0
+            return
+
+        self.file = open(path, 'rb')
+        if checkpoint is None:
+            self.position, compressed_offset, self.decompressor = 0, 0, new_decompressor(codec)
+        else:
+            self.position, compressed_offset, state = checkpoint
+            self.decompressor = state.copy()
+            self.file.seek(compressed_offset)
+        self.produced = self.position
+        self.last_checkpoint = self.position
+
+    def decompress(self, chunk):
+        parts = []
+        while chunk:
+            parts.append(self.decompressor.decompress(chunk))
+            if not self.decompressor.eof:
+                break
+            chunk = self.decompressor.unused_data
+            self.decompressor = new_decompressor(self.codec)
+        return b''.join(parts)
+
+    def fill(self):
+        if self.process is not None:
+            data = self.process.stdout.read(READ_CHUNK)
+        else:
+            data = b''
+            while not data:
+                chunk = self.file.read(READ_CHUNK)
+                if not chunk:
+                    break
+                data = self.decompress(chunk)
+                self.produced += len(data)
+                if (self.checkpoints is not None and self.codec == 'gz'
+                        and self.produced - self.last_checkpoint >= CHECKPOINT_SPACING):
+                    self.checkpoints.append((self.produced, self.file.tell(), self.decompressor.copy()))
+                    self.last_checkpoint = self.produced
+        if not data:
+            return False
+        self.buffer = self.buffer[self.cursor:] + data
+        self.cursor = 0
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) - self.cursor < size:
+            if not self.fill():
+                break
+        end = len(self.buffer) if size < 0 else min(self.cursor + size, len(self.buffer))
+        data = self.buffer[self.cursor:end]
+        self.cursor = end
+        self.position += len(data)
+        return data
+
+    def skip(self, count):
+        while count > 0:
+            available = len(self.buffer) - self.cursor
+            if not available and not self.fill():
+                break
+            step = min(count, len(self.buffer) - self.cursor)
+            self.cursor += step
+            self.position += step
+            count -= step
+
+    def close(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process.stdout.close()
+        if self.file is not None:
+            self.file.close()
+
+
+class BlockCache:
+    def __init__(self, path, codec, checkpoints, byte_budget=BLOCK_CACHE_BYTES):
+        self.path = path
+        self.codec = codec
+        self.checkpoints = checkpoints
+        self.positions = [checkpoint[0] for checkpoint in checkpoints]
+        self.byte_budget = byte_budget
+        self.blocks = OrderedDict()
+        self.total_bytes = 0
+        self.stream = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def open_stream(self, target):
+        position = bisect.bisect_right(self.positions, target) - 1
+        checkpoint = self.checkpoints[position] if position >= 0 else None
+        if self.stream is not None:
+            start = checkpoint[0] if checkpoint else 0
+            if start <= self.stream.position <= target:
+                return self.stream
+            self.stream.close()
+        self.stream = DecompressedStream(self.path, self.codec, checkpoint)
+        return self.stream
+
+    def block(self, index):
+        block = self.blocks.get(index)
+        if block is not None:
+            self.blocks.move_to_end(index)
+            self.hits += 1
+            return block
+
+        self.misses += 1
+        target = index * BLOCK_SIZE
+        with span('archive_block', 'selection'):
+            stream = self.open_stream(target)
+            stream.skip(target - stream.position)
+            block = stream.read(BLOCK_SIZE)
+        self.blocks[index] = block
+        self.total_bytes += len(block)
+        while self.total_bytes > self.byte_budget and len(self.blocks) > 1:
+            _, evicted = self.blocks.popitem(last=False)
+            self.total_bytes -= len(evicted)
+        return block
+
+    def read(self, offset, size):
+        parts = []
+        end = offset + size
+        with self.lock:
+            while offset < end:
+                index = offset // BLOCK_SIZE
+                start = offset - index * BLOCK_SIZE
+                part = self.block(index)[start:start + end - offset]
+                if not part:
+                    break
+                parts.append(part)
+                offset += len(part)
+        return b''.join(parts)
+
+    def close(self):
+        with self.lock:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self.blocks.clear()
+            self.total_bytes = 0
+
+
+class Archive:
+    random_access = True
+
+    def __init__(self, path):
+        self.path = path
+        self.prefixes = [path + os.sep]
+        self.mtime_ns = os.stat(path).st_mtime_ns
+        self.members = {}
+        self.listings = {}
+        self.subfolders = None
+
+    def listing(self):
+        if self.subfolders is None:
+            self.subfolders = self.read_listing()
+        return self.subfolders
+
+    def add_member(self, member_name, entry):
+        head, _, name = member_name.rpartition('/')
+        prefix, _, folder = head.rpartition('/')
+        if folder not in FOLDERS or not name:
+            return
+        entries = self.listings.get((prefix, folder))
+        if entries is None:
+            entries = self.listings[prefix, folder] = []
+        entries.append((name, entry))
+
+    def finish_listing(self):
+        prefixes = sorted({prefix for prefix, _ in self.listings})
+        listing = []
+        for prefix in prefixes:
+            instance = '' if len(prefixes) == 1 else prefix.rpartition('/')[2]
+            for folder in FOLDERS:
+                entries = self.listings.get((prefix, folder))
+                if not entries:
+                    continue
+                entries.sort()
+                subfolder = os.path.join(instance, folder)
+                self.members[subfolder] = dict(entries)
+                listing.append((subfolder, list(self.members[subfolder])))
+        self.listings = {}
+        return listing
+
+    def entry(self, file_path):
+        for prefix in self.prefixes:
+            if file_path.startswith(prefix):
+                relative = file_path[len(prefix):]
+                break
+        else:
+            relative = os.path.relpath(os.path.abspath(file_path), self.path)
+        subfolder, _, name = relative.rpartition(os.sep)
+        return self.members.get(subfolder, {}).get(name)
+
+    def member(self, file_path):
+        entry = self.entry(file_path)
+        if entry is None:
+            raise FileNotFoundError(f"'{file_path}' is not in {self.path}")
+        return entry
+
+    def size(self, file_path):
+        return self.member(file_path)[1]
+
+    def read(self, file_path, limit=None):
+        return self.read_entry(self.member(file_path), file_path, limit)
+
+    def scan(self, file_paths):
+        entries = [(entry, file_path) for entry, file_path in zip(map(self.entry, file_paths), file_paths) if entry]
+        entries.sort(key=lambda item: item[0][0])
+        for entry, file_path in entries:
+            try:
+                yield file_path, self.read_entry(entry, file_path)
+            except (OSError, ValueError, EOFError, zlib.error) as e:
+                print(f"Error reading '{file_path}' from the archive: {e}")
+
+    def close(self):
+        pass
+
+
+def zip64_values(extra, values):
+    position = 0
+    while position + 4 <= len(extra):
+        kind, length = struct.unpack_from('<2H', extra, position)
+        if kind == 1:
+            fields = struct.unpack_from(f'<{length // 8}Q', extra, position + 4)
+            wide = iter(fields)
+            return [next(wide) if value == 0xFFFFFFFF else value for value in values]
+        position += 4 + length
+    return values
+
+
+class ZipArchive(Archive):
+    def __init__(self, path):
+        super().__init__(path)
+        self.fd = None
+
+    def read_directory(self):
+        size = os.fstat(self.fd).st_size
+        tail = os.pread(self.fd, min(size, ZIP_END.size + 0xFFFF), max(size - ZIP_END.size - 0xFFFF, 0))
+        position = tail.rfind(ZIP_END_SIGNATURE)
+        if position < 0:
+            raise ValueError("Not a zip archive")
+        _, _, _, _, count, directory_size, directory_offset, _ = ZIP_END.unpack_from(tail, position)
+        if count == 0xFFFF or directory_offset == 0xFFFFFFFF:
+            locator_offset = size - len(tail) + position - ZIP64_LOCATOR.size
+            _, _, end_offset, _ = ZIP64_LOCATOR.unpack(os.pread(self.fd, ZIP64_LOCATOR.size, locator_offset))
+            end = ZIP64_END.unpack(os.pread(self.fd, ZIP64_END.size, end_offset))
+            count, directory_size, directory_offset = end[7], end[8], end[9]
+        return os.pread(self.fd, directory_size, directory_offset)
+
+    @timed('archive_listing', 'load')
+    def read_listing(self):
+        self.fd = os.open(self.path, os.O_RDONLY)
+        directory = self.read_directory()
+        position = 0
+        while position + ZIP_CENTRAL.size <= len(directory):
+            (signature, _, _, flags, method, _, _, _, compressed, size, name_length, extra_length, comment_length,
+             _, _, _, offset) = ZIP_CENTRAL.unpack_from(directory, position)
+            if signature != ZIP_CENTRAL_SIGNATURE:
+                break
+            start = position + ZIP_CENTRAL.size
+            name = directory[start:start + name_length].decode('utf-8' if flags & 0x800 else 'cp437',
+                                                               'surrogateescape')
+            if 0xFFFFFFFF in (compressed, size, offset):
+                extra = directory[start + name_length:start + name_length + extra_length]
+                size, compressed, offset = zip64_values(extra, [size, compressed, offset])
+            if not name.endswith('/'):
+                self.add_member(name, (offset, size, compressed, method, flags))
+            position = start + name_length + extra_length + comment_length
+        return self.finish_listing()
+
+    def read_entry(self, entry, file_path, limit=None):
+        offset, size, compressed, method, flags = entry
+        if flags & 0x1:
+            raise ValueError(f"'{file_path}' is encrypted")
+        header = os.pread(self.fd, ZIP_LOCAL.size, offset)
+        if len(header) < ZIP_LOCAL.size or header[:4] != ZIP_LOCAL_SIGNATURE:
+            raise ValueError(f"Bad local header for '{file_path}'")
+        name_length, extra_length = ZIP_LOCAL.unpack(header)[-2:]
+        data = os.pread(self.fd, compressed, offset + ZIP_LOCAL.size + name_length + extra_length)
+        if method == 0:
+            return data[:limit]
+        if method == 8:
+            return zlib.decompressobj(-zlib.MAX_WBITS).decompress(data, limit or 0)
+        if method == 12:
+            return bz2.decompress(data)[:limit]
+        raise ValueError(f"Unsupported zip compression method {method} for '{file_path}'")
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class TarArchive(Archive):
+    def __init__(self, path, codec):
+        super().__init__(path)
+        self.codec = codec
+        self.random_access = not codec
+        self.checkpoints = []
+        self.blocks = None
+        self.fd = None
+
+    @timed('archive_listing', 'load')
+    def read_listing(self):
+        if not self.codec:
+            self.fd = os.open(self.path, os.O_RDONLY)
+            stream = open(self.path, 'rb')
+            skip = lambda count: stream.seek(count, os.SEEK_CUR)
+        else:
+            stream = DecompressedStream(self.path, self.codec, checkpoints=self.checkpoints)
+            skip = stream.skip
+        try:
+            for name, offset, size in tar_members(stream.read, skip):
+                self.add_member(name, (offset, size))
+        finally:
+            stream.close()
+        if self.codec:
+            self.blocks = BlockCache(self.path, self.codec, self.checkpoints)
+        return self.finish_listing()
+
+    def read_entry(self, entry, file_path, limit=None):
+        offset, size = entry
+        if limit is not None:
+            size = min(size, limit)
+        if self.blocks is not None:
+            return self.blocks.read(offset, size)
+        return os.pread(self.fd, size, offset)
+
+    def close(self):
+        if self.blocks is not None:
+            self.blocks.close()
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,213 @@
+import os
+import queue
+import threading
+from array import array
+
+import numpy as np
+
+from src.Loaders.Archives import archive_for
+from src.Profiling.Instruments import timed
+from src.Records.RecordStore import QUEUE_CODE
+
+SHINGLE = 4
+NUM_HASHES = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_HASHES // BANDS
+SIMILARITY = 0.5
+MAX_BYTES = 64 * 1024
+BATCH_GRAMS = 1 << 16
+POLL_INTERVAL = 0.5
+
+BIN_BITS = NUM_HASHES.bit_length() - 1
+VALUE_BITS = 32 - BIN_BITS
+VALUE_MASK = np.uint64((1 << VALUE_BITS) - 1)
+EMPTY = np.uint32(0xFFFFFFFF)
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+HASH_OFFSET = np.uint64(0x632BE59BD9B4E019)
+BAND_WEIGHTS = np.array([0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F], dtype=np.uint64)[:ROWS_PER_BAND]
+
+
+def shingles(data):
+    data = np.frombuffer(data, dtype=np.uint8)
+    if len(data) < SHINGLE:
+        data = np.concatenate([data, np.zeros(SHINGLE - len(data), dtype=np.uint8)])
+    data = data.astype(np.uint32)
+    return (data[:-3] << 24) | (data[1:-2] << 16) | (data[2:-1] << 8) | data[3:]
+
+
+def densify(row):
+    filled = np.flatnonzero(row != EMPTY)
+    empty = np.flatnonzero(row == EMPTY)
+    nearest = filled[np.searchsorted(filled, empty) % len(filled)]
+    distance = (nearest - empty) % NUM_HASHES
+    row[empty] = row[nearest] + (distance << VALUE_BITS).astype(np.uint32)
+
+
+def signatures(contents):
+    grams = [shingles(data) for data in contents]
+    lengths = np.array([len(gram) for gram in grams])
+    hashed = (np.concatenate(grams).astype(np.uint64) * HASH_MULTIPLIER + HASH_OFFSET) >> np.uint64(32)
+    slots = np.repeat(np.arange(len(grams)) * NUM_HASHES, lengths) + (hashed >> np.uint64(VALUE_BITS)).astype(np.int64)
+
+    rows = np.full(len(grams) * NUM_HASHES, EMPTY, dtype=np.uint32)
+    np.minimum.at(rows, slots, (hashed & VALUE_MASK).astype(np.uint32))
+    rows = rows.reshape(len(grams), NUM_HASHES)
+    for row in np.flatnonzero((rows == EMPTY).any(axis=1)):
+        densify(rows[row])
+    return rows
+
+
+def band_keys(rows):
+    bands = rows.reshape(len(rows), BANDS, ROWS_PER_BAND).astype(np.uint64)
+    return (bands * BAND_WEIGHTS).sum(axis=2, dtype=np.uint64)
+
+
+def read_content(file_path):
+    try:
+        archive = archive_for(file_path)
+        if archive is not None:
+            return archive.read(file_path, MAX_BYTES)
+        with open(file_path, 'rb') as f:
+            return f.read(MAX_BYTES)
+    except OSError:
+        return None
+
+
+class Clusters:
+    def __init__(self, store, folder_path):
+        self.store = store
+        self.folder_path = folder_path
+
+        self.records = array('q')
+        self.rows = {}
+        self.signatures = np.zeros((1024, NUM_HASHES), dtype=np.uint32)
+        self.roots = array('q')
+        self.members = {}
+        self.buckets = [{} for _ in range(BANDS)]
+
+        self.lock = threading.Lock()
+        self.requests = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.scheduled = 0
+        self.version = 0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='crash-clusters', daemon=True)
+            self.thread.start()
+        self.schedule()
+
+    def schedule(self):
+        count = len(self.store)
+        if count > self.scheduled:
+            self.requests.put(range(self.scheduled, count))
+            self.scheduled = count
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                records = self.requests.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            faults = [record for record in records if self.store.folders[record] != QUEUE_CODE]
+            self.add_records(faults)
+
+    def add_records(self, records):
+        batch = []
+        contents = []
+        grams = 0
+        for record in records:
+            if self.stop_event.is_set():
+                return
+            file_path = os.path.join(self.folder_path, self.store.subfolder(record), self.store.filename(record))
+            content = read_content(file_path)
+            if content is None:
+                continue
+            batch.append(record)
+            contents.append(content)
+            grams += max(len(content) - SHINGLE + 1, 1)
+            if grams >= BATCH_GRAMS:
+                self.add_batch(batch, contents)
+                batch, contents, grams = [], [], 0
+        if batch:
+            self.add_batch(batch, contents)
+
+    @timed('cluster_batch', 'background')
+    def add_batch(self, records, contents):
+        rows = signatures(contents)
+        keys = band_keys(rows).tolist()
+
+        with self.lock:
+            first = len(self.records)
+            capacity = len(self.signatures)
+            if first + len(rows) > capacity:
+                grown = np.zeros((max(capacity * 2, first + len(rows)), NUM_HASHES), dtype=np.uint32)
+                grown[:first] = self.signatures[:first]
+                self.signatures = grown
+            self.signatures[first:first + len(rows)] = rows
+            for position, record in enumerate(records):
+                row = first + position
+                self.records.append(record)
+                self.rows[record] = row
+                self.roots.append(row)
+                self.members[row] = [record]
+                row_keys = list(enumerate(keys[position]))
+                candidates = set()
+                for band, key in row_keys:
+                    candidates.update(self.buckets[band].get(key, ()))
+                duplicate = False
+                if candidates:
+                    others = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+                    similar = self.similarities(row, others)
+                    for other in others[similar >= SIMILARITY].tolist():
+                        self.union(row, other)
+                    duplicate = bool((similar == 1).any())
+                if not duplicate:
+                    for band, key in row_keys:
+                        self.buckets[band].setdefault(key, []).append(row)
+            self.version += 1
+
+    def similarities(self, row, others):
+        return np.count_nonzero(self.signatures[others] == self.signatures[row], axis=1) / NUM_HASHES
+
+    def find(self, row):
+        roots = self.roots
+        root = row
+        while roots[root] != root:
+            root = roots[root]
+        while roots[row] != root:
+            roots[row], row = root, roots[row]
+        return root
+
+    def union(self, row, other):
+        row = self.find(row)
+        other = self.find(other)
+        if row == other:
+            return
+        if len(self.members[row]) < len(self.members[other]):
+            row, other = other, row
+        self.roots[other] = row
+        self.members[row].extend(self.members.pop(other))
+
+    def clusters(self):
+        with self.lock:
+            groups = [sorted(members) for members in self.members.values()]
+        groups.sort(key=lambda members: (-len(members), members[0]))
+        return groups
+
+    def cluster_of(self, record):
+        with self.lock:
+            row = self.rows.get(record)
+            if row is None:
+                return []
+            return sorted(self.members[self.find(row)])
+
+    def status_text(self):
+        return f"Clustered {len(self.records)} crashes/hangs into {len(self.members)} groups"
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from src.Loaders.Archives import archive_for
+from src.Loaders.IndexCache import cache_path_for
+from src.Profiling.Instruments import span
+from src.Records.RecordStore import ABSENT
+
+HASH_VERSION = 1
+HASH_MAGIC = b'AFLQHSH\0'
+HEADER = struct.Struct('<8sII')
+DIGEST_SIZE = 16
+MMAP_THRESHOLD = 64 * 1024
+HASH_BATCH = 1024
+POLL_INTERVAL = 0.5
+
+
+def hash_file(file_path):
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_THRESHOLD:
+            return hashlib.blake2b(f.read(), digest_size=DIGEST_SIZE).digest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+def stat_and_hash(file_path, cached):
+    archive = archive_for(file_path)
+    if archive is not None:
+        try:
+            key = (archive.size(file_path), archive.mtime_ns)
+            if cached is not None and cached[:2] == key:
+                return cached
+            return key + (hashlib.blake2b(archive.read(file_path), digest_size=DIGEST_SIZE).digest(),)
+        except OSError:
+            return None
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    key = (stat.st_size, stat.st_mtime_ns)
+    if cached is not None and cached[:2] == key:
+        return cached
+    try:
+        return key + (hash_file(file_path),)
+    except OSError:
+        return None
+
+
+def read_hash_cache(cache_path):
+    with open(cache_path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        return {}
+    magic, version, header_length = HEADER.unpack_from(data)
+    if magic != HASH_MAGIC or version != HASH_VERSION:
+        return {}
+
+    offset = HEADER.size
+    header = json.loads(data[offset:offset + header_length])
+    offset += header_length
+    count = header['count']
+
+    sizes = array('q')
+    sizes.frombytes(data[offset:offset + 8 * count])
+    offset += 8 * count
+    mtimes = array('q')
+    mtimes.frombytes(data[offset:offset + 8 * count])
+    offset += 8 * count
+    digests = data[offset:offset + DIGEST_SIZE * count]
+    offset += DIGEST_SIZE * count
+    names = data[offset:offset + header['names']].decode('utf-8', 'surrogateescape').split('\0') if count else []
+    if len(names) != count or len(digests) != DIGEST_SIZE * count:
+        return {}
+
+    return {name: (sizes[position], mtimes[position],
+                   digests[position * DIGEST_SIZE:(position + 1) * DIGEST_SIZE])
+            for position, name in enumerate(names)}
+
+
+def write_hash_cache(cache_path, entries):
+    names = list(entries)
+    sizes = array('q', (entries[name][0] for name in names))
+    mtimes = array('q', (entries[name][1] for name in names))
+    digests = b''.join(entries[name][2] for name in names)
+    name_blob = '\0'.join(names).encode('utf-8', 'surrogateescape')
+    header_bytes = json.dumps({'version': HASH_VERSION, 'count': len(names), 'names': len(name_blob)}).encode('utf-8')
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(HASH_MAGIC, HASH_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        sizes.tofile(f)
+        mtimes.tofile(f)
+        f.write(digests)
+        f.write(name_blob)
+    os.replace(temp_path, cache_path)
+
+
+class ContentHashes:
+    def __init__(self, store, folder_path, cache_path=None, workers=None):
+        self.store = store
+        self.folder_path = folder_path
+        self.cache_path = cache_path or cache_path_for(folder_path, 'hashes')
+        self.workers = workers or min(8, os.cpu_count() or 1)
+
+        self.groups = array('q')
+        self.sizes = array('q')
+        self.group_sizes = array('q')
+        self.group_first = array('q')
+        self.group_members = {}
+        self.digests = []
+        self.digest_codes = {}
+        self.duplicate_count = 0
+
+        self.entries = {}
+        self.pending = []
+        self.lock = threading.Lock()
+        self.requests = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.scheduled = 0
+        self.hashed = 0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='content-hashes', daemon=True)
+            self.thread.start()
+        self.schedule()
+
+    def schedule(self):
+        count = len(self.store)
+        if count > self.scheduled:
+            self.requests.put(range(self.scheduled, count))
+            self.scheduled = count
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def relative_path(self, record):
+        return os.path.join(self.store.subfolder(record), self.store.filename(record))
+
+    def run(self):
+        try:
+            cache = read_hash_cache(self.cache_path) if os.path.isfile(self.cache_path) else {}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error reading hash cache '{self.cache_path}': {e}")
+            cache = {}
+
+        dirty = False
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='content-hash') as pool:
+            while not self.stop_event.is_set():
+                try:
+                    records = self.requests.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    if dirty:
+                        self.save()
+                        dirty = False
+                    continue
+
+                for start in range(records.start, records.stop, HASH_BATCH):
+                    if self.stop_event.is_set():
+                        break
+                    batch = range(start, min(start + HASH_BATCH, records.stop))
+                    names = [self.relative_path(record) for record in batch]
+                    paths = [os.path.join(self.folder_path, name) for name in names]
+                    with span('hash_batch', 'background'):
+                        results = list(pool.map(stat_and_hash, paths, [cache.get(name) for name in names]))
+                    with self.lock:
+                        for record, name, result in zip(batch, names, results):
+                            if result is not None:
+                                self.entries[name] = result
+                                self.pending.append((record, result[0], result[2]))
+                dirty = True
+
+        if dirty:
+            self.save()
+
+    def save(self):
+        with self.lock:
+            entries = dict(self.entries)
+        try:
+            write_hash_cache(self.cache_path, entries)
+        except OSError as e:
+            print(f"Error writing hash cache '{self.cache_path}': {e}")
+
+    def drain(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return []
+
+        groups = self.groups
+        if len(groups) < len(self.store):
+            groups.extend(array('q', [ABSENT]) * (len(self.store) - len(groups)))
+            self.sizes.extend(array('q', [ABSENT]) * (len(self.store) - len(self.sizes)))
+
+        changed = []
+        for record, size, digest in batch:
+            self.sizes[record] = size
+            code = self.digest_codes.get(digest)
+            if code is None:
+                code = self.digest_codes[digest] = len(self.digests)
+                self.digests.append(digest)
+                self.group_sizes.append(0)
+                self.group_first.append(record)
+            groups[record] = code
+            self.group_sizes[code] += 1
+            size = self.group_sizes[code]
+            if size == 2:
+                self.group_members[code] = array('q', [self.group_first[code], record])
+                self.duplicate_count += 2
+                changed.append(self.group_first[code])
+            elif size > 2:
+                self.group_members[code].append(record)
+                self.duplicate_count += 1
+            changed.append(record)
+        self.hashed += len(batch)
+        return changed
+
+    def group(self, record):
+        if record < len(self.groups):
+            return self.groups[record]
+        return ABSENT
+
+    def group_size(self, record):
+        code = self.group(record)
+        if code == ABSENT:
+            return 0
+        return self.group_sizes[code]
+
+    def file_size(self, record):
+        if record < len(self.sizes):
+            return self.sizes[record]
+        return ABSENT
+
+    def duplicates(self, record):
+        code = self.group(record)
+        return [member for member in self.group_members.get(code, ()) if member != record]
+
+    def digest(self, record):
+        code = self.group(record)
+        if code == ABSENT:
+            return None
+        return self.digests[code].hex()
+
+    def duplicate_records(self):
+        records = array('q')
+        for members in self.group_members.values():
+            records.extend(members)
+        return records
+
+    def status_text(self):
+        return f"Hashed {self.hashed} / {len(self.store)}, {self.duplicate_count} duplicates"
@@ -0,0 +1,253 @@
+import os
+import threading
+
+import numpy as np
+
+from src.Profiling.Instruments import span
+
+POLL_INTERVAL = 1.0
+READ_CHUNK = 16 * 1024 * 1024
+BUCKETS = 4096
+DEFAULT_COLUMNS = ['unix_time', 'cycles_done', 'cur_path', 'paths_total', 'pending_total', 'pending_favs',
+                   'map_size', 'unique_crashes', 'unique_hangs', 'max_depth', 'execs_per_sec']
+COLUMN_ALIASES = {
+    'time': ['relative_time', 'unix_time'],
+    'corpus': ['corpus_count', 'paths_total'],
+    'crashes': ['saved_crashes', 'unique_crashes'],
+    'hangs': ['saved_hangs', 'unique_hangs'],
+    'coverage': ['edges_found', 'map_size'],
+    'speed': ['execs_per_sec'],
+}
+
+
+def read_fuzzer_stats(stats_path):
+    stats = {}
+    with open(stats_path, errors='replace') as f:
+        for line in f:
+            key, separator, value = line.partition(':')
+            if separator:
+                stats[key.strip()] = value.strip()
+    return stats
+
+
+def parse_rows(text, column_count):
+    lines = text.count('\n')
+    if '#' not in text:
+        values = np.fromstring(text.replace('%', '').replace('\n', ','), sep=',')
+        if values.size == lines * column_count:
+            return values.reshape(lines, column_count)
+
+    rows = []
+    for line in text.splitlines():
+        parts = line.replace('%', '').split(',')
+        if line.startswith('#') or len(parts) != column_count:
+            continue
+        try:
+            rows.append([float(part) for part in parts])
+        except ValueError:
+            continue
+    return np.array(rows, dtype=float).reshape(-1, column_count)
+
+
+class Downsampled:
+    def __init__(self, column_count, buckets=BUCKETS):
+        self.buckets = buckets
+        self.step = 1.0
+        self.used = 0
+        self.rows = 0
+        self.lows = np.full((buckets, column_count), np.nan)
+        self.highs = np.full((buckets, column_count), np.nan)
+        self.lasts = np.full((buckets, column_count), np.nan)
+
+    def coarsen(self):
+        half = self.buckets // 2
+        for name in ('lows', 'highs', 'lasts'):
+            column = getattr(self, name)
+            first, second = column[0::2], column[1::2]
+            if name == 'lows':
+                merged = np.fmin(first, second)
+            elif name == 'highs':
+                merged = np.fmax(first, second)
+            else:
+                merged = np.where(np.isnan(second), first, second)
+            column[:half] = merged
+            column[half:] = np.nan
+        self.step *= 2
+        self.used = (self.used + 1) // 2
+
+    def append(self, times, values):
+        if not len(times):
+            return
+        times = np.maximum(times, 0)
+        while times.max() >= self.step * self.buckets:
+            self.coarsen()
+
+        slots = (times // self.step).astype(np.int64)
+        if np.any(slots[1:] < slots[:-1]):
+            order = np.argsort(slots, kind='stable')
+            slots, values = slots[order], values[order]
+        starts = np.flatnonzero(np.concatenate(([True], slots[1:] != slots[:-1])))
+        keys = slots[starts]
+        self.lows[keys] = np.fmin(self.lows[keys], np.minimum.reduceat(values, starts, axis=0))
+        self.highs[keys] = np.fmax(self.highs[keys], np.maximum.reduceat(values, starts, axis=0))
+        self.lasts[keys] = values[np.concatenate((starts[1:], [len(values)])) - 1]
+        self.used = max(self.used, int(keys[-1]) + 1)
+        self.rows += len(times)
+
+    def series(self, column):
+        lasts = self.lasts[:self.used, column]
+        filled = np.flatnonzero(~np.isnan(lasts))
+        return ((filled + 0.5) * self.step, self.lows[filled, column], self.highs[filled, column], lasts[filled])
+
+    def duration(self):
+        return self.used * self.step
+
+
+class FuzzerStats:
+    def __init__(self, instance_path):
+        self.stats_path = os.path.join(instance_path, 'fuzzer_stats')
+        self.plot_path = os.path.join(instance_path, 'plot_data')
+        self.stats = {}
+        self.stats_state = None
+        self.identity = None
+        self.offset = 0
+        self.partial = b''
+        self.columns = None
+        self.samples = None
+        self.latest = None
+        self.time_origin = 0
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.version = 0
+
+    def start(self):
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name='fuzzer-stats', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.poll()
+            self.stop_event.wait(POLL_INTERVAL)
+
+    def poll(self):
+        changed = self.poll_stats()
+        changed = self.poll_plot() or changed
+        if changed:
+            self.version += 1
+        return changed
+
+    def poll_stats(self):
+        try:
+            stat = os.stat(self.stats_path)
+        except OSError:
+            return False
+        state = (stat.st_mtime_ns, stat.st_size)
+        if state == self.stats_state:
+            return False
+        try:
+            stats = read_fuzzer_stats(self.stats_path)
+        except OSError as e:
+            print(f"Error reading '{self.stats_path}': {e}")
+            return False
+        with self.lock:
+            self.stats = stats
+            self.stats_state = state
+        return True
+
+    def poll_plot(self):
+        try:
+            stat = os.stat(self.plot_path)
+        except OSError:
+            return False
+        identity = (stat.st_dev, stat.st_ino)
+        if identity != self.identity or stat.st_size < self.offset:
+            self.reset_plot(identity)
+        if stat.st_size == self.offset:
+            return False
+
+        try:
+            with open(self.plot_path, 'rb') as f:
+                f.seek(self.offset)
+                while not self.stop_event.is_set():
+                    data = f.read(READ_CHUNK)
+                    if not data:
+                        break
+                    self.offset += len(data)
+                    self.consume(data)
+        except OSError as e:
+            print(f"Error reading '{self.plot_path}': {e}")
+        return True
+
+    def reset_plot(self, identity):
+        with self.lock:
+            self.identity = identity
+            self.offset = 0
+            self.partial = b''
+            self.columns = None
+            self.samples = None
+            self.latest = None
+            self.time_origin = 0
+
+    def consume(self, data):
+        data = self.partial + data
+        end = data.rfind(b'\n') + 1
+        self.partial = data[end:]
+        text = data[:end].decode('ascii', 'replace')
+        if not text:
+            return
+
+        if self.columns is None:
+            if text.startswith('#'):
+                header, _, text = text.partition('\n')
+                self.columns = [name.strip() for name in header[1:].split(',')]
+            else:
+                self.columns = DEFAULT_COLUMNS
+            if self.columns[0] == 'unix_time':
+                self.time_origin = int(self.stats.get('start_time', 0) or 0)
+
+        with span('plot_data_parse', 'background'):
+            rows = parse_rows(text, len(self.columns))
+            if not len(rows):
+                return
+            if self.columns[0] == 'unix_time' and not self.time_origin:
+                self.time_origin = rows[0, 0]
+            with self.lock:
+                if self.samples is None:
+                    self.samples = Downsampled(len(self.columns))
+                self.samples.append(rows[:, 0] - self.time_origin, rows)
+                self.latest = rows[-1]
+
+    def column(self, name):
+        for column in COLUMN_ALIASES.get(name, [name]):
+            if self.columns and column in self.columns:
+                return self.columns.index(column), column
+        return None, None
+
+    def series(self, name):
+        with self.lock:
+            position, column = self.column(name)
+            if position is None or self.samples is None:
+                return None
+            return self.samples.series(position) + (column,)
+
+    def duration(self):
+        with self.lock:
+            return self.samples.duration() if self.samples else 0
+
+    def row_count(self):
+        with self.lock:
+            return self.samples.rows if self.samples else 0
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
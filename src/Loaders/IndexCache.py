@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import struct
+from array import array
+
+from src.Loaders.Scanner import load_store, output_subfolders
+from src.Profiling.Instruments import timed
+from src.Records.Parsers import list_names, parse_name
+from src.Records.RecordStore import RecordStore
+
+INDEX_VERSION = 2
+INDEX_MAGIC = b'AFLQIDX\0'
+HEADER = struct.Struct('<8sII')
+COLUMNS = ['ids', 'folders', 'instances', 'times', 'execs', 'reps', 'ops', 'origs', 'syncs',
+           'src_offsets', 'src_values', 'name_offsets', 'child_offsets', 'child_values']
+
+
+def index_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'afl-queue-gui')
+
+
+def cache_path_for(folder_path, suffix):
+    key = hashlib.sha1(os.path.realpath(folder_path).encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(index_dir(), f"{key}.{suffix}")
+
+
+def index_path_for(folder_path):
+    return cache_path_for(folder_path, 'idx')
+
+
+def folder_states(folder_path):
+    states = {}
+    for subfolder in output_subfolders(folder_path):
+        try:
+            states[subfolder] = os.stat(os.path.join(folder_path, subfolder)).st_mtime_ns
+        except OSError:
+            continue
+    return states
+
+
+def save_index(store, folder_path, states, index_path=None, child_index=None):
+    index_path = index_path or index_path_for(folder_path)
+    if child_index is None:
+        child_index = store.child_index() if store.extra_children else (store.child_offsets, store.child_values)
+    columns = dict(zip(('child_offsets', 'child_values'), child_index))
+
+    arrays = [(name, columns[name] if name in columns else getattr(store, name)) for name in COLUMNS]
+    arrays += [(f"id_records_{code}", records) for code, records in enumerate(store.id_records)]
+    counts = {subfolder: store.folder_count(subfolder) for subfolder in states}
+    for subfolder, _ in store.skipped:
+        if subfolder in counts:
+            counts[subfolder] += 1
+
+    header = {
+        'version': INDEX_VERSION,
+        'folder_path': os.path.realpath(folder_path),
+        'folders': {subfolder: [mtime, counts[subfolder]] for subfolder, mtime in states.items()},
+        'skipped': store.skipped,
+        'strings': store.strings.values,
+        'instances': store.instance_names.values,
+        'sparse_ids': [[code, item_id, record] for (code, item_id), record in store.sparse_id_records.items()],
+        'columns': [[name, column.typecode, column.itemsize, len(column)] for name, column in arrays],
+        'name_blob': len(store.name_blob),
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for _, column in arrays:
+            column.tofile(f)
+        f.write(store.name_blob)
+    os.replace(temp_path, index_path)
+
+
+@timed('read_index', 'load')
+def read_index(index_path):
+    with open(index_path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        return None, None
+    magic, version, header_length = HEADER.unpack_from(data)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        return None, None
+
+    offset = HEADER.size
+    header = json.loads(data[offset:offset + header_length])
+    offset += header_length
+    if header.get('version') != INDEX_VERSION:
+        return None, None
+
+    store = RecordStore()
+    view = memoryview(data)
+    for name, typecode, itemsize, length in header['columns']:
+        column = array(typecode)
+        if column.itemsize != itemsize:
+            return None, None
+        column.frombytes(view[offset:offset + itemsize * length])
+        offset += itemsize * length
+        if name.startswith('id_records_'):
+            store.id_records.append(column)
+        else:
+            setattr(store, name, column)
+    store.name_blob = bytearray(view[offset:offset + header['name_blob']])
+
+    store.int_columns = {'time': store.times, 'execs': store.execs, 'rep': store.reps}
+    store.string_columns = {'op': store.ops, 'orig': store.origs, 'sync': store.syncs}
+    for value in header['strings'][1:]:
+        store.strings.intern(value)
+    for value in header['instances'][1:]:
+        store.instance_names.intern(value)
+    store.sparse_id_records = {(code, item_id): record for code, item_id, record in header['sparse_ids']}
+    store.skipped = [tuple(entry) for entry in header['skipped']]
+    store.linked = len(store)
+    return store, header
+
+
+@timed('load_store_cached', 'load')
+def load_store_cached(folder_path, workers=None, index_path=None):
+    index_path = index_path or index_path_for(folder_path)
+    states = folder_states(folder_path)
+
+    store, header = None, None
+    if os.path.isfile(index_path):
+        try:
+            store, header = read_index(index_path)
+        except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+            print(f"Error reading index '{index_path}': {e}")
+            store, header = None, None
+
+    if store is not None and header['folder_path'] == os.path.realpath(folder_path):
+        changed = apply_delta(store, header, folder_path, states)
+        if changed is not None:
+            if changed:
+                write_index(store, folder_path, states, index_path)
+            return store
+
+    store = load_store(folder_path, workers)
+    write_index(store, folder_path, states, index_path)
+    return store
+
+
+def apply_delta(store, header, folder_path, states):
+    indexed = header['folders']
+    if set(indexed) != set(states):
+        return None
+
+    changed = False
+    for subfolder, mtime in states.items():
+        if indexed[subfolder][0] == mtime:
+            continue
+        changed = True
+
+        known = set(store.iter_names(subfolder))
+        known.update(name for folder, name in store.skipped if folder == subfolder)
+        if len(known) != indexed[subfolder][1]:
+            return None
+
+        names = list_names(os.path.join(folder_path, subfolder))
+        new_names = [name for name in names if name not in known]
+        if len(names) - len(new_names) != len(known):
+            return None
+        store.extend(parse_name(name, subfolder) for name in new_names)
+
+    return changed
+
+
+@timed('write_index', 'load')
+def write_index(store, folder_path, states, index_path, child_index=None):
+    try:
+        save_index(store, folder_path, states, index_path, child_index)
+    except OSError as e:
+        print(f"Error writing index '{index_path}': {e}")
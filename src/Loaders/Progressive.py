@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+
+from src.Loaders.IndexCache import folder_states, index_path_for, write_index
+from src.Loaders.Scanner import build_partial_store, scan_output_dir
+from src.Records.RecordStore import FOLDER_CODES, QUEUE_CODE, split_subfolder
+
+LOAD_CHUNK = 1000
+
+
+def load_order(listings):
+    queues = [listing for listing in listings if FOLDER_CODES[split_subfolder(listing[0])[1]] == QUEUE_CODE]
+    return queues + [listing for listing in listings if listing not in queues]
+
+
+class ProgressiveLoader:
+    def __init__(self, folder_path, chunk_size=LOAD_CHUNK, use_index=True):
+        self.folder_path = folder_path
+        self.chunk_size = chunk_size
+        self.index_path = index_path_for(folder_path) if use_index else None
+        self.states = None
+
+        self.parts = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.save_thread = None
+        self.child_index = None
+        self.done = False
+        self.total = None
+        self.loaded = 0
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, name='progressive-loader', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in (self.thread, self.save_thread):
+            if thread:
+                thread.join()
+        self.thread = self.save_thread = None
+
+    def run(self):
+        try:
+            self.states = folder_states(self.folder_path)
+            listings = scan_output_dir(self.folder_path)
+            self.total = sum(len(names) for _, names in listings)
+            for subfolder, names in load_order(listings):
+                for start in range(0, len(names), self.chunk_size):
+                    if self.stop_event.is_set():
+                        return
+                    self.parts.put(build_partial_store(subfolder, names[start:start + self.chunk_size]))
+        except Exception as e:
+            print(f"Error during file processing: {e}")
+        finally:
+            self.done = True
+
+    def next_part(self):
+        try:
+            return self.parts.get_nowait()
+        except queue.Empty:
+            return None
+
+    def is_finished(self):
+        return self.done and self.parts.empty()
+
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def status_text(self):
+        elapsed = self.elapsed()
+        rate = f"{self.loaded / elapsed:,.0f}/s" if elapsed > 0 else ""
+        if self.finished:
+            return f"Loaded {self.loaded:,} entries in {elapsed:.1f} s ({rate})"
+        if self.total is None:
+            return "Listing output directory…"
+        return f"Loading {self.loaded:,} / {self.total:,} entries ({rate})"
+
+    def start_save(self, store):
+        self.save_thread = threading.Thread(target=self.save, args=(store,), name='index-writer', daemon=True)
+        self.save_thread.start()
+
+    def save(self, store):
+        child_index = store.child_index()
+        if self.index_path and self.states is not None and not self.stop_event.is_set():
+            write_index(store, self.folder_path, self.states, self.index_path, child_index)
+        self.child_index = child_index
+
+    def is_saved(self):
+        return self.child_index is not None
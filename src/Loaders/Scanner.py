@@ -0,0 +1,139 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import compress
+
+from src.Loaders.Archives import is_archive, open_archive
+from src.Profiling.Instruments import timed
+from src.Records.Parsers import ENTRY_PATTERN, list_names, parse_name
+from src.Records.RecordStore import ABSENT, FOLDERS, RecordStore, int_cell
+
+CHUNK_SIZE = 50000
+PARALLEL_THRESHOLD = 100000
+LINE_PATTERN = re.compile(f'^(?:{ENTRY_PATTERN.pattern}|(.*))$', re.MULTILINE)
+
+
+def find_instances(folder_path):
+    if any(os.path.isdir(os.path.join(folder_path, subfolder)) for subfolder in FOLDERS):
+        return ['']
+    try:
+        with os.scandir(folder_path) as entries:
+            names = sorted(entry.name for entry in entries if entry.is_dir() and not entry.name.startswith('.'))
+    except OSError:
+        return []
+    return [name for name in names if os.path.isdir(os.path.join(folder_path, name, 'queue'))]
+
+
+def output_subfolders(folder_path):
+    subfolders = []
+    for instance in find_instances(folder_path):
+        for folder in FOLDERS:
+            subfolder = os.path.join(instance, folder)
+            if os.path.isdir(os.path.join(folder_path, subfolder)):
+                subfolders.append(subfolder)
+    return subfolders
+
+
+def list_subfolder(folder_path, subfolder):
+    subfolder_path = os.path.join(folder_path, subfolder)
+    try:
+        return subfolder, list_names(subfolder_path)
+    except OSError as e:
+        print(f"Error reading a folder '{subfolder_path}': {e}")
+        return subfolder, []
+
+
+@timed('scan_output_dir', 'load')
+def scan_output_dir(folder_path):
+    if is_archive(folder_path):
+        return open_archive(folder_path).listing()
+    if not os.path.isdir(folder_path):
+        print(f"Error when specifying a path '{folder_path}'")
+        return []
+
+    subfolders = output_subfolders(folder_path)
+    with ThreadPoolExecutor(max_workers=min(len(subfolders), 16) or 1) as pool:
+        return list(pool.map(list_subfolder, [folder_path] * len(subfolders), subfolders))
+
+
+@timed('build_partial_store', 'load')
+def build_partial_store(subfolder, names):
+    store = RecordStore(indexed=False)
+    text = '\n'.join(names)
+    if not names or text.count('\n') != len(names) - 1:
+        for name in names:
+            store.append(parse_name(name, subfolder))
+        return store
+
+    ids, _, syncs, srcs, times, execs, ops, reps, tails, others = map(list, zip(*LINE_PATTERN.findall(text)))
+    origs = [None] * len(names)
+    syncs = [value or None for value in syncs]
+    times = [int(value) if value else ABSENT for value in times]
+    execs = [int(value) if value else ABSENT for value in execs]
+    reps = [int(value) if value else ABSENT for value in reps]
+    ops = [value or None for value in ops]
+
+    reparse = ()
+    if any(others) or ':' in ''.join(tails):
+        reparse = [row for row, (other, tail) in enumerate(zip(others, tails)) if other or ':' in tail]
+    dropped = []
+    for row in reparse:
+        file_dict = parse_name(names[row], subfolder)
+        if type(file_dict.get('id')) is not int:
+            dropped.append(row)
+            continue
+        ids[row] = file_dict['id']
+        times[row] = int_cell(file_dict.get('time'))
+        execs[row] = int_cell(file_dict.get('execs'))
+        reps[row] = int_cell(file_dict.get('rep'))
+        ops[row] = file_dict.get('op')
+        origs[row] = file_dict.get('orig')
+        syncs[row] = file_dict.get('sync')
+        srcs[row] = '+'.join(str(int_cell(value)) for value in file_dict.get('src', ()))
+
+    columns = [ids, times, execs, reps, ops, origs, syncs, srcs, names]
+    if dropped:
+        keep = [True] * len(names)
+        for row in dropped:
+            keep[row] = False
+        columns = [list(compress(column, keep)) for column in columns]
+        store.skipped += [(subfolder, names[row]) for row in dropped]
+
+    store.extend_columns(subfolder, *columns)
+    return store
+
+
+@timed('build_stores', 'load')
+def build_stores(listings, workers=None):
+    jobs = []
+    for position, listing in enumerate(listings):
+        for subfolder, names in listing:
+            for start in range(0, len(names), CHUNK_SIZE):
+                jobs.append((position, subfolder, names[start:start + CHUNK_SIZE]))
+
+    total = sum(len(names) for _, _, names in jobs)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or total < PARALLEL_THRESHOLD:
+        parts = [build_partial_store(subfolder, names) for _, subfolder, names in jobs]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(build_partial_store,
+                                  [subfolder for _, subfolder, _ in jobs], [names for _, _, names in jobs]))
+
+    stores = [RecordStore() for _ in listings]
+    for (position, _, _), part in zip(jobs, parts):
+        stores[position].merge(part)
+    for store in stores:
+        store.link_children()
+    return stores
+
+
+def load_stores(folder_paths, workers=None):
+    with ThreadPoolExecutor(max_workers=min(len(folder_paths), 16) or 1) as pool:
+        listings = list(pool.map(scan_output_dir, folder_paths))
+    return build_stores(listings, workers)
+
+
+def load_store(folder_path, workers=None):
+    return load_stores([folder_path], workers)[0]
@@ -0,0 +1,147 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+
+SUBFOLDERS = ['queue', 'crashes', 'hangs']
+POLL_INTERVAL = 1.0
+
+IN_CREATE = 0x00000100
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def load_inotify():
+    if not hasattr(os, 'O_CLOEXEC'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, 'inotify_init1') or not hasattr(libc, 'inotify_add_watch'):
+        return None
+    return libc
+
+
+class OutputWatcher:
+    def __init__(self, folder_path, known_files, subfolders=SUBFOLDERS, use_inotify=True):
+        self.folder_path = folder_path
+        self.subfolders = subfolders
+        self.known = {subfolder: set() for subfolder in subfolders}
+        for subfolder, filename in known_files:
+            if subfolder in self.known:
+                self.known[subfolder].add(filename)
+
+        self.pending = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.libc = load_inotify() if use_inotify else None
+        self.inotify_fd = -1
+        self.watches = {}
+        self.mode = None
+
+    def start(self):
+        if self.libc is not None and self.start_inotify():
+            self.mode = 'inotify'
+            target = self.run_inotify
+        else:
+            self.mode = 'polling'
+            target = self.run_polling
+        self.rescan()
+        self.thread = threading.Thread(target=target, name='output-watcher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        if self.inotify_fd >= 0:
+            os.close(self.inotify_fd)
+            self.inotify_fd = -1
+
+    def drain(self, limit=None):
+        with self.lock:
+            if limit is None or limit >= len(self.pending):
+                batch, self.pending = self.pending, []
+            else:
+                batch, self.pending = self.pending[:limit], self.pending[limit:]
+        return batch
+
+    def add_pending(self, subfolder, filename):
+        known = self.known[subfolder]
+        if filename in known or filename.startswith('.'):
+            return
+        known.add(filename)
+        with self.lock:
+            self.pending.append((subfolder, filename))
+
+    def rescan(self):
+        for subfolder in self.subfolders:
+            subfolder_path = os.path.join(self.folder_path, subfolder)
+            try:
+                with os.scandir(subfolder_path) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            self.add_pending(subfolder, entry.name)
+            except OSError:
+                continue
+
+    def run_polling(self):
+        while not self.stop_event.wait(POLL_INTERVAL):
+            self.rescan()
+
+    def start_inotify(self):
+        fd = self.libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if fd < 0:
+            return False
+
+        for subfolder in self.subfolders:
+            subfolder_path = os.path.join(self.folder_path, subfolder)
+            if not os.path.isdir(subfolder_path):
+                continue
+            wd = self.libc.inotify_add_watch(fd, os.fsencode(subfolder_path), IN_CREATE | IN_MOVED_TO)
+            if wd < 0:
+                os.close(fd)
+                self.watches = {}
+                return False
+            self.watches[wd] = subfolder
+
+        self.inotify_fd = fd
+        return True
+
+    def run_inotify(self):
+        while not self.stop_event.is_set():
+            readable, _, _ = select.select([self.inotify_fd], [], [], POLL_INTERVAL)
+            if not readable:
+                continue
+            try:
+                buffer = os.read(self.inotify_fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                print(f"Error reading inotify events: {e}")
+                self.mode = 'polling'
+                self.run_polling()
+                return
+
+            offset = 0
+            overflow = False
+            while offset < len(buffer):
+                wd, mask, _, name_length = EVENT_HEADER.unpack_from(buffer, offset)
+                offset += EVENT_HEADER.size
+                name = buffer[offset:offset + name_length].rstrip(b'\0')
+                offset += name_length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif not mask & IN_ISDIR and wd in self.watches:
+                    self.add_pending(self.watches[wd], os.fsdecode(name))
+
+            if overflow:
+                self.rescan()
@@ -0,0 +1,195 @@
+import cProfile
+import json
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+MAX_EVENTS = 500000
+BUCKETS_PER_OCTAVE = 4
+MIN_MS = 0.01
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, ms):
+        bucket = max(int(math.log2(max(ms, MIN_MS) / MIN_MS) * BUCKETS_PER_OCTAVE), 0)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += ms
+        self.maximum = max(self.maximum, ms)
+
+    def percentile(self, fraction):
+        target = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return min(MIN_MS * 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE), self.maximum)
+        return self.maximum
+
+    def summary(self):
+        summary = {'count': self.count, 'total_ms': round(self.total, 3),
+                   'mean_ms': round(self.total / self.count, 3) if self.count else 0}
+        for fraction in PERCENTILES:
+            summary[f'p{round(fraction * 100)}_ms'] = round(self.percentile(fraction), 3)
+        summary['max_ms'] = round(self.maximum, 3)
+        return summary
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    __slots__ = ('instruments', 'name', 'category', 'started')
+
+    def __init__(self, instruments, name, category):
+        self.instruments = instruments
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.instruments.record(self.name, self.category, self.started, time.perf_counter())
+        return False
+
+
+class Instruments:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.profile = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.origin = time.perf_counter()
+            self.events = []
+            self.dropped_events = 0
+            self.threads = {}
+            self.timers = {}
+            self.counters = {}
+
+    def enable(self, cprofile=False):
+        self.reset()
+        self.enabled = True
+        if cprofile:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def disable(self):
+        self.enabled = False
+        if self.profile:
+            self.profile.disable()
+
+    def span(self, name, category='stage'):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category)
+
+    def timed(self, name, category='stage'):
+        def decorate(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with Span(self, name, category):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, name, category, started, stopped):
+        if not self.enabled:
+            return
+        thread = threading.get_ident()
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Histogram()
+            timer.add((stopped - started) * 1000)
+            if thread not in self.threads:
+                self.threads[thread] = threading.current_thread().name
+            if len(self.events) < MAX_EVENTS:
+                self.events.append((name, category, started, stopped - started, thread))
+            else:
+                self.dropped_events += 1
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            value = self.counters[name] = self.counters.get(name, 0) + amount
+            if len(self.events) < MAX_EVENTS:
+                self.events.append((name, 'counter', time.perf_counter(), value, None))
+            else:
+                self.dropped_events += 1
+
+    def readout(self, names):
+        with self.lock:
+            parts = []
+            for name in names:
+                timer = self.timers.get(name)
+                if timer and timer.count:
+                    parts.append(f"{name} {timer.percentile(0.5):.1f}/{timer.percentile(0.99):.1f} ms")
+        return "p50/p99: " + ", ".join(parts) if parts else ""
+
+    def report(self):
+        with self.lock:
+            return {
+                'timers': {name: timer.summary() for name, timer in sorted(self.timers.items())},
+                'counters': dict(sorted(self.counters.items())),
+                'dropped_events': self.dropped_events,
+            }
+
+    def trace(self):
+        pid = os.getpid()
+        with self.lock:
+            events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread, 'args': {'name': thread_name}}
+                      for thread, thread_name in self.threads.items()]
+            for name, category, started, value, thread in self.events:
+                timestamp = round((started - self.origin) * 1e6, 1)
+                if thread is None:
+                    events.append({'name': name, 'ph': 'C', 'ts': timestamp, 'pid': pid, 'args': {'value': value}})
+                else:
+                    events.append({'name': name, 'cat': category, 'ph': 'X', 'ts': timestamp,
+                                   'dur': round(value * 1e6, 1), 'pid': pid, 'tid': thread})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.report()}
+
+    def write_trace(self, trace_path):
+        try:
+            with open(trace_path, 'w') as f:
+                json.dump(self.trace(), f)
+        except OSError as e:
+            print(f"Error writing the profile trace '{trace_path}': {e}")
+
+    def write_profile(self, profile_path):
+        if self.profile is None:
+            return
+        try:
+            self.profile.dump_stats(profile_path)
+        except OSError as e:
+            print(f"Error writing the cProfile output '{profile_path}': {e}")
+
+
+INSTRUMENTS = Instruments()
+span = INSTRUMENTS.span
+timed = INSTRUMENTS.timed
+count = INSTRUMENTS.count
@@ -0,0 +1,319 @@
+import threading
+from bisect import bisect_left, bisect_right
+from array import array
+
+import numpy as np
+
+from src.Profiling.Instruments import span
+from src.Records.RecordStore import ABSENT, QUEUE_CODE
+
+IN_PROGRESS = -2
+
+
+class Lineage:
+    def __init__(self, store):
+        self.store = store
+        self.parents = array('q')
+        self.depths = array('q')
+        self.seeds = array('q')
+        self.sizes = array('q')
+        self.faults = array('q')
+        self.fault_records = array('q')
+        self.anchors = array('q')
+        self.extra_parents = {}
+        self.lock = threading.RLock()
+        self.count = 0
+        self.tour_count = None
+
+    def __len__(self):
+        return self.count
+
+    def update(self, stop=None):
+        with self.lock:
+            records = range(self.count, len(self.store) if stop is None else stop)
+            if records:
+                with span('lineage_update'):
+                    self.resolve_parents(records)
+                    self.assign_depths(records)
+                    order = sorted(records, key=self.depths.__getitem__)
+                    self.accumulate(reversed(order), records.start)
+                    self.accumulate_extra(order, records.start)
+                self.count = records.stop
+            return records
+
+    def reset(self):
+        with self.lock:
+            for column in (self.parents, self.depths, self.seeds, self.sizes, self.faults, self.fault_records,
+                           self.anchors):
+                del column[:]
+            self.extra_parents = {}
+            self.count = 0
+            self.tour_count = None
+
+    def resolve_parents(self, records):
+        store = self.store
+        src_offsets = store.src_offsets
+        folders = store.folders
+        parents = self.parents
+        extra_parents = self.extra_parents
+        for record in records:
+            parent = ABSENT
+            if src_offsets[record + 1] > src_offsets[record]:
+                others = None
+                for src_record in store.src_records(record):
+                    if src_record == record or src_record >= records.stop or src_record == parent:
+                        continue
+                    if parent == ABSENT:
+                        parent = src_record
+                    elif others is None:
+                        others = extra_parents[record] = [src_record]
+                    elif src_record not in others:
+                        others.append(src_record)
+            parents.append(parent)
+            if folders[record] != QUEUE_CODE:
+                self.fault_records.append(record)
+
+        extra = len(records)
+        self.depths.extend(array('q', [ABSENT]) * extra)
+        self.seeds.extend(array('q', [ABSENT]) * extra)
+        self.sizes.extend(array('q', [0]) * extra)
+        self.faults.extend(array('q', [0]) * extra)
+        self.anchors.extend(array('q', [ABSENT]) * extra)
+
+    def assign_depths(self, records):
+        parents = self.parents
+        depths = self.depths
+        seeds = self.seeds
+        for record in records:
+            parent = parents[record]
+            if parent != ABSENT and depths[parent] >= 0:
+                depths[record] = depths[parent] + 1
+                seeds[record] = seeds[parent]
+                continue
+            if depths[record] >= 0:
+                continue
+            chain = []
+            current = record
+            while current != ABSENT and depths[current] == ABSENT:
+                depths[current] = IN_PROGRESS
+                chain.append(current)
+                current = parents[current]
+
+            if current != ABSENT and depths[current] == IN_PROGRESS:
+                parents[chain[-1]] = ABSENT
+                current = ABSENT
+            if current == ABSENT:
+                depth = 0
+                seed = chain[-1]
+            else:
+                depth = depths[current] + 1
+                seed = seeds[current]
+            for current in reversed(chain):
+                depths[current] = depth
+                seeds[current] = seed
+                depth += 1
+
+    def accumulate(self, records, first):
+        parents = self.parents
+        sizes = self.sizes
+        faults = self.faults
+        folders = self.store.folders
+
+        for record in records:
+            size = sizes[record] + 1
+            fault = faults[record] + (folders[record] != QUEUE_CODE)
+            sizes[record] = size
+            faults[record] = fault
+            parent = parents[record]
+            if parent >= first:
+                sizes[parent] += size
+                faults[parent] += fault
+                continue
+            while parent != ABSENT:
+                sizes[parent] += size
+                faults[parent] += fault
+                parent = parents[parent]
+
+    def accumulate_extra(self, records, first):
+        parents = self.parents
+        anchors = self.anchors
+        extra_parents = self.extra_parents
+        if not extra_parents:
+            return
+        for record in records:
+            if record in extra_parents:
+                anchors[record] = record
+            else:
+                parent = parents[record]
+                if parent != ABSENT:
+                    anchors[record] = anchors[parent]
+
+        span_anchors = np.array(anchors[first:], dtype=np.int64)
+        anchored = span_anchors >= 0
+        region_anchors, inverse = np.unique(span_anchors[anchored], return_inverse=True)
+        span_faults = np.array(self.store.folders[first:first + len(span_anchors)], dtype=np.int8) != QUEUE_CODE
+        region_sizes = np.bincount(inverse, minlength=len(region_anchors))
+        region_faults = np.bincount(inverse, weights=span_faults[anchored], minlength=len(region_anchors))
+        weights = {anchor: [size, fault] for anchor, size, fault in
+                   zip(region_anchors.tolist(), region_sizes.tolist(), region_faults.astype(np.int64).tolist())}
+
+        ups = {}
+        pending = list(weights)
+        while pending:
+            anchor = pending.pop()
+            parent = parents[anchor]
+            up = anchors[parent] if parent != ABSENT else ABSENT
+            ups[anchor] = up
+            if up != ABSENT and up not in ups:
+                pending.append(up)
+
+        children = {}
+        depths = self.depths
+        for anchor in sorted(ups, key=depths.__getitem__, reverse=True):
+            up = ups[anchor]
+            weight = weights.setdefault(anchor, [0, 0])
+            children.setdefault(up, []).append(anchor)
+            if up != ABSENT:
+                up_weight = weights.setdefault(up, [0, 0])
+                up_weight[0] += weight[0]
+                up_weight[1] += weight[1]
+
+        sizes = self.sizes
+        faults = self.faults
+        seen = set()
+        stack = [(anchor, None) for anchor in children.get(ABSENT, ())]
+        while stack:
+            anchor, added = stack.pop()
+            if added is not None:
+                seen.difference_update(added)
+                continue
+            added = []
+            current = anchor
+            while current != ABSENT and current not in seen:
+                seen.add(current)
+                added.append(current)
+                current = parents[current]
+            size, fault = weights[anchor]
+            pending = list(extra_parents[anchor])
+            while pending:
+                current = pending.pop()
+                if current in seen:
+                    continue
+                seen.add(current)
+                added.append(current)
+                sizes[current] += size
+                faults[current] += fault
+                if parents[current] != ABSENT:
+                    pending.append(parents[current])
+                if current in extra_parents:
+                    pending.extend(extra_parents[current])
+            stack.append((anchor, added))
+            stack.extend((child, None) for child in children.get(anchor, ()))
+
+    def depth(self, record, stop=None):
+        with self.lock:
+            self.update(stop)
+            return self.depths[record]
+
+    def descendants(self, record, stop=None):
+        with self.lock:
+            self.update(stop)
+            return self.sizes[record] - 1
+
+    def fault_count(self, record, stop=None):
+        with self.lock:
+            self.update(stop)
+            return self.faults[record] - (self.store.folders[record] != QUEUE_CODE)
+
+    def path(self, record, stop=None):
+        with self.lock:
+            self.update(stop)
+            path = [record]
+            parent = self.parents[record]
+            while parent != ABSENT:
+                path.append(parent)
+                parent = self.parents[parent]
+        path.reverse()
+        return path
+
+    def seed(self, record, stop=None):
+        with self.lock:
+            self.update(stop)
+            return self.seeds[record]
+
+    def fault_descendants(self, record, limit=None, stop=None):
+        with self.lock:
+            self.update(stop)
+            return self.find_fault_descendants(record, limit, self.count if stop is None else stop)
+
+    def build_tour(self):
+        if self.tour_count == self.count:
+            return
+        with span('lineage_tour'):
+            parents = np.array(self.parents, dtype=np.int64)
+            depths = np.array(self.depths, dtype=np.int64)
+            sizes = np.ones(len(parents), dtype=np.int64)
+            levels = np.argsort(depths, kind='stable')[::-1]
+            bounds = np.flatnonzero(np.diff(depths[levels])) + 1
+            for level in np.split(levels, bounds):
+                linked = level[parents[level] != ABSENT]
+                np.add.at(sizes, parents[linked], sizes[linked])
+
+            order = np.lexsort((np.arange(len(parents)), parents))
+            siblings = parents[order]
+            totals = np.cumsum(sizes[order])
+            firsts = np.flatnonzero(np.append(True, siblings[1:] != siblings[:-1]))
+            before = np.append(0, totals)[firsts]
+            offsets = np.empty(len(parents), dtype=np.int64)
+            offsets[order] = totals - sizes[order] - np.repeat(before, np.diff(np.append(firsts, len(order))))
+            offsets += parents != ABSENT
+
+            tins = offsets
+            ancestors = parents
+            linked = ancestors != ABSENT
+            while linked.any():
+                tins = tins + np.where(linked, tins[ancestors], 0)
+                ancestors = np.where(linked, ancestors[ancestors], ABSENT)
+                linked = ancestors != ABSENT
+
+            faults = np.array(self.fault_records, dtype=np.int64)
+            fault_order = np.argsort(tins[faults], kind='stable')
+            sources = [(source, record) for record, others in self.extra_parents.items() for source in others]
+            edges = np.array(sources, dtype=np.int64).reshape(-1, 2)
+            edge_order = np.argsort(tins[edges[:, 0]], kind='stable')
+            self.tins = tins
+            self.tree_sizes = sizes
+            self.tour_faults = faults[fault_order]
+            self.tour_fault_tins = tins[self.tour_faults]
+            self.tour_edge_tins = tins[edges[edge_order, 0]]
+            self.tour_edge_targets = edges[edge_order, 1]
+            self.tour_count = self.count
+
+    def find_fault_descendants(self, record, limit, stop):
+        if self.faults[record] == 0:
+            return []
+
+        self.build_tour()
+        starts = []
+        ends = []
+        pending = [record]
+        found = []
+        while pending:
+            root = pending.pop()
+            first = int(self.tins[root])
+            position = bisect_right(starts, first)
+            if position and first < ends[position - 1]:
+                continue
+            last = first + int(self.tree_sizes[root])
+            nested = bisect_left(starts, last, position)
+            starts[position:nested] = [first]
+            ends[position:nested] = [last]
+
+            start, end = np.searchsorted(self.tour_fault_tins, [first, last])
+            found.append(self.tour_faults[start:end])
+            start, end = np.searchsorted(self.tour_edge_tins, [first, last])
+            pending.extend(self.tour_edge_targets[start:end].tolist())
+
+        faults = np.unique(np.concatenate(found))
+        faults = faults[(faults != record) & (faults < stop)]
+        return faults[:limit].tolist()
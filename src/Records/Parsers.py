@@ -0,0 +1,136 @@
+import os
+import re
+
+from src.Profiling.Instruments import timed
+
+INT_KEYS = ('id', 'time', 'execs', 'rep')
+
+ENTRY_PATTERN = re.compile(
+    r'id:([0-9]+)'
+    r'(?:,sig:([^,:\s]+))?'
+    r'(?:,sync:([^,:\s]+))?'
+    r'(?:,src:([0-9]+(?:\+[0-9]+)*))?'
+    r'(?:,time:([0-9]+))?'
+    r'(?:,execs:([0-9]+))?'
+    r'(?:,op:([^,:\s]+))?'
+    r'(?:,rep:([0-9]+))?'
+    r'((?:,[^,\n]*)*)')
+COMMON_PATTERN = re.compile(r'id:([0-9]+),src:([0-9]+),time:([0-9]+),execs:([0-9]+),op:([^,:\s]+),rep:([0-9]+)')
+INT_PATTERN = re.compile(r'\s*[+-]?\d+(?:_\d+)*\s*')
+
+
+def int_or_value(value):
+    if value.isdecimal() or INT_PATTERN.fullmatch(value):
+        return int(value)
+    return value
+
+
+def parse_src(value):
+    parts = value.split('+')
+    if all(part.isdecimal() or INT_PATTERN.fullmatch(part) for part in parts):
+        return [int(part) for part in parts]
+    return [value]
+
+
+def parse_parts(parts, file_dict):
+    for part in parts:
+        key, separator, value = part.partition(':')
+        if not separator or ':' in value:
+            continue
+        key, value = key.strip(), value.strip()
+
+        if key in INT_KEYS:
+            value = int_or_value(value)
+        elif key == 'src':
+            value = parse_src(value)
+
+        file_dict[key] = value
+
+
+def parse_name(filename, subfolder):
+    match = COMMON_PATTERN.fullmatch(filename)
+    if match is not None:
+        item_id, src, time, execs, op, rep = match.groups()
+        return {'id': int(item_id), 'src': [int(src)], 'time': int(time), 'execs': int(execs), 'op': op,
+                'rep': int(rep), 'filename': filename, 'folder': subfolder}
+
+    match = ENTRY_PATTERN.fullmatch(filename)
+    if match is None:
+        file_dict = {}
+        parse_parts(filename.split(','), file_dict)
+    else:
+        item_id, sig, sync, src, time, execs, op, rep, tail = match.groups()
+        file_dict = {'id': int(item_id)}
+        if sig is not None:
+            file_dict['sig'] = sig
+        if sync is not None:
+            file_dict['sync'] = sync
+        if src is not None:
+            file_dict['src'] = [int(part) for part in src.split('+')]
+        if time is not None:
+            file_dict['time'] = int(time)
+        if execs is not None:
+            file_dict['execs'] = int(execs)
+        if op is not None:
+            file_dict['op'] = op
+        if rep is not None:
+            file_dict['rep'] = int(rep)
+        if tail:
+            parse_parts(tail[1:].split(','), file_dict)
+
+    file_dict['filename'] = filename
+    file_dict['folder'] = subfolder
+    return file_dict
+
+
+def list_names(subfolder_path):
+    with os.scandir(subfolder_path) as entries:
+        return sorted(entry.name for entry in entries if entry.is_file())
+
+
+@timed('parse_filename', 'load')
+def parse_filename(folder_path):
+    if not os.path.isdir(folder_path):
+        print(f"Error when specifying a path '{folder_path}'")
+        return []
+
+    parsed_files = []
+    subfolders = ['queue', 'crashes', 'hangs']
+
+    for subfolder in subfolders:
+        subfolder_path = os.path.join(folder_path, subfolder)
+        if not os.path.isdir(subfolder_path):
+            continue
+
+        try:
+            files = list_names(subfolder_path)
+        except Exception as e:
+            print(f"Error reading a folder '{subfolder_path}': {e}")
+            continue
+
+        for filename in files:
+            parsed_files.append(parse_name(filename, subfolder))
+
+    return parsed_files
+
+
+def link_children(file_dicts, id_to_element):
+    for file_dict in file_dicts:
+        src_values = file_dict.get('src')
+        if not src_values or file_dict.get('folder') in ['crashes', 'hangs']:
+            continue
+
+        for src_value in src_values:
+            try:
+                parent_element = id_to_element.get(('queue', src_value))
+                if parent_element:
+                    parent_element.setdefault('children', []).append(file_dict['id'])
+            except Exception as e:
+                print(f"Error when adding a child to a parent item: {e}")
+
+
+@timed('reformat_dict', 'load')
+def reformat_dict(parsed_files):
+    id_to_element = {(file_dict.get('folder'), file_dict.get('id')): file_dict for file_dict in parsed_files}
+    link_children(parsed_files, id_to_element)
+    return parsed_files
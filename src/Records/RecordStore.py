@@ -0,0 +1,460 @@
+import os
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+import numpy as np
+
+from src.Records.Parsers import parse_name
+
+FOLDERS = ['queue', 'crashes', 'hangs']
+FOLDER_CODES = {folder: code for code, folder in enumerate(FOLDERS)}
+QUEUE_CODE = FOLDER_CODES['queue']
+
+ABSENT = -1
+RAW = -2
+TYPECODE_DTYPES = {'b': np.int8, 'h': np.int16, 'i': np.int32, 'q': np.int64, 'Q': np.uint64}
+
+
+class StringTable:
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+
+    def intern(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+def split_subfolder(subfolder):
+    return os.path.split(subfolder)
+
+
+def to_array(typecode, values):
+    column = array(typecode)
+    column.frombytes(np.ascontiguousarray(values, dtype=TYPECODE_DTYPES[typecode]).tobytes())
+    return column
+
+
+def int_cell(value):
+    if value is None:
+        return ABSENT
+    if type(value) is int and value >= 0:
+        return value
+    return RAW
+
+
+class RecordStore:
+    def __init__(self, indexed=True):
+        self.ids = array('q')
+        self.folders = array('b')
+        self.times = array('q')
+        self.execs = array('q')
+        self.reps = array('q')
+        self.ops = array('i')
+        self.origs = array('i')
+        self.syncs = array('i')
+        self.instances = array('h')
+        self.int_columns = {'time': self.times, 'execs': self.execs, 'rep': self.reps}
+        self.string_columns = {'op': self.ops, 'orig': self.origs, 'sync': self.syncs}
+        self.strings = StringTable()
+        self.instance_names = StringTable()
+
+        self.src_offsets = array('Q', [0])
+        self.src_values = array('q')
+
+        self.name_offsets = array('Q', [0])
+        self.name_blob = bytearray()
+
+        self.child_offsets = array('Q', [0])
+        self.child_values = array('q')
+        self.extra_children = {}
+        self.linked = 0
+
+        self.indexed = indexed
+        self.id_records = []
+        self.sparse_id_records = {}
+        self.skipped = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_parsed(cls, parsed_files):
+        store = cls()
+        store.extend(parsed_files)
+        return store
+
+    def append(self, file_dict):
+        get = file_dict.get
+        item_id = get('id')
+        instance, folder = split_subfolder(get('folder') or '')
+        folder_code = FOLDER_CODES.get(folder)
+        if type(item_id) is not int or folder_code is None:
+            self.skipped.append((get('folder'), get('filename')))
+            return None
+
+        return self.append_fields(item_id, folder_code, int_cell(get('time')), int_cell(get('execs')),
+                                  int_cell(get('rep')), get('op'), get('orig'),
+                                  [int_cell(src_value) for src_value in get('src', ())], file_dict['filename'],
+                                  get('sync'), self.instance_names.intern(instance) - 1)
+
+    def append_fields(self, item_id, folder_code, time, execs, rep, op, orig, src_values, filename,
+                      sync=None, instance=0):
+        record = len(self.ids)
+        self.ids.append(item_id)
+        self.folders.append(folder_code)
+        self.instances.append(instance)
+        self.times.append(time)
+        self.execs.append(execs)
+        self.reps.append(rep)
+        self.ops.append(self.strings.intern(op))
+        self.origs.append(self.strings.intern(orig))
+        self.syncs.append(self.strings.intern(sync))
+
+        self.src_values.extend(src_values)
+        self.src_offsets.append(len(self.src_values))
+
+        self.name_blob += filename.encode('utf-8', 'surrogateescape')
+        self.name_offsets.append(len(self.name_blob))
+
+        if self.indexed:
+            self.index_id(self.id_slot(instance, folder_code), item_id, record)
+        return record
+
+    def extend(self, file_dicts):
+        first = len(self.ids)
+        for file_dict in file_dicts:
+            self.append(file_dict)
+        self.link_children()
+        return range(first, len(self.ids))
+
+    def intern_all(self, values):
+        codes = {value: self.strings.intern(value) for value in dict.fromkeys(values)}
+        return list(map(codes.__getitem__, values))
+
+    def extend_columns(self, subfolder, ids, times, execs, reps, ops, origs, syncs, srcs, names):
+        instance_name, folder = split_subfolder(subfolder)
+        folder_code = FOLDER_CODES[folder]
+        instance = self.instance_names.intern(instance_name) - 1
+        offset = len(self.ids)
+        self.ids.fromlist(list(map(int, ids)))
+        count = len(self.ids) - offset
+        self.folders.extend(array('b', [folder_code]) * count)
+        self.instances.extend(array('h', [instance]) * count)
+        self.times.fromlist(times)
+        self.execs.fromlist(execs)
+        self.reps.fromlist(reps)
+        self.ops.fromlist(self.intern_all(ops))
+        self.origs.fromlist(self.intern_all(origs))
+        self.syncs.fromlist(self.intern_all(syncs))
+
+        src_base = len(self.src_values)
+        src_text = '+'.join(filter(None, srcs))
+        if src_text:
+            self.src_values.fromlist(list(map(int, src_text.split('+'))))
+        src_counts = list(map(bool, srcs))
+        if len(self.src_values) - src_base != sum(src_counts):
+            src_counts = [value.count('+') + 1 if value else 0 for value in srcs]
+        self.src_offsets.fromlist(list(accumulate(src_counts, initial=src_base))[1:])
+
+        text = ''.join(names)
+        if text.isascii():
+            blob, lengths = text.encode('ascii'), map(len, names)
+        else:
+            encoded = [name.encode('utf-8', 'surrogateescape') for name in names]
+            blob, lengths = b''.join(encoded), map(len, encoded)
+        name_base = len(self.name_blob)
+        self.name_blob += blob
+        self.name_offsets.fromlist(list(accumulate(lengths, initial=name_base))[1:])
+
+        if self.indexed:
+            self.index_ids(self.id_slot(instance, folder_code), np.array(self.ids[offset:]),
+                           np.arange(offset, len(self.ids)))
+        return range(offset, len(self.ids))
+
+    def merge(self, part):
+        offset = len(self.ids)
+        if not len(part):
+            self.skipped += part.skipped
+            return range(offset, offset)
+        self.ids.extend(part.ids)
+        self.folders.extend(part.folders)
+        instance_map = np.array([self.instance_names.intern(name) - 1 for name in part.instance_names.values[1:]],
+                                dtype=np.int64)
+        self.instances.extend(to_array('h', instance_map[np.array(part.instances)]))
+        for key, column in self.int_columns.items():
+            column.extend(part.int_columns[key])
+
+        code_map = np.array([self.strings.intern(value) for value in part.strings.values], dtype=np.int64)
+        for key, column in self.string_columns.items():
+            column.extend(to_array('i', code_map[np.array(part.string_columns[key])]))
+
+        src_base = len(self.src_values)
+        self.src_values.extend(part.src_values)
+        self.src_offsets.extend(to_array('Q', np.array(part.src_offsets[1:]) + src_base))
+
+        name_base = len(self.name_blob)
+        self.name_blob += part.name_blob
+        self.name_offsets.extend(to_array('Q', np.array(part.name_offsets[1:]) + name_base))
+
+        ids = np.array(part.ids)
+        records = np.arange(offset, len(self.ids))
+        slots = np.array(self.instances[offset:], dtype=np.int64) * len(FOLDERS) + np.array(part.folders)
+        for slot in np.unique(slots).tolist():
+            selected = slots == slot
+            self.index_ids(slot, ids[selected], records[selected])
+        self.skipped += part.skipped
+        return range(offset, len(self.ids))
+
+    def id_slot(self, instance, folder_code):
+        slot = instance * len(FOLDERS) + folder_code
+        while slot >= len(self.id_records):
+            self.id_records.append(array('q'))
+        return slot
+
+    def index_id(self, slot, item_id, record):
+        records = self.id_records[slot]
+        if 0 <= item_id < len(records):
+            records[item_id] = record
+        elif 0 <= item_id < 4 * len(self.ids) + 1024:
+            records.extend([ABSENT] * (item_id - len(records)))
+            records.append(record)
+        else:
+            self.sparse_id_records[(slot, item_id)] = record
+
+    def index_ids(self, slot, ids, records):
+        while slot >= len(self.id_records):
+            self.id_records.append(array('q'))
+        table = self.id_records[slot]
+        dense = (ids >= 0) & ((ids < len(table)) | (ids < 4 * len(self.ids) + 1024))
+        for item_id, record in zip(ids[~dense].tolist(), records[~dense].tolist()):
+            self.sparse_id_records[(slot, item_id)] = record
+        ids, records = ids[dense], records[dense]
+        if not len(ids):
+            return
+
+        size = int(ids.max()) + 1
+        if size > len(table):
+            table.extend(array('q', [ABSENT]) * (size - len(table)))
+        last = len(ids) - 1 - np.unique(ids[::-1], return_index=True)[1]
+        view = np.frombuffer(table, dtype=np.int64)
+        view[ids[last]] = records[last]
+        del view
+
+    def lookup_id(self, slot, item_id):
+        if slot < len(self.id_records):
+            records = self.id_records[slot]
+            if 0 <= item_id < len(records):
+                return records[item_id]
+        return self.sparse_id_records.get((slot, item_id), ABSENT)
+
+    def record_for(self, folder, item_id, instance=''):
+        folder_code = FOLDER_CODES.get(folder)
+        instance_code = self.instance_names.codes.get(instance)
+        if folder_code is None or instance_code is None:
+            return None
+        record = self.lookup_id((instance_code - 1) * len(FOLDERS) + folder_code, item_id)
+        return record if record != ABSENT else None
+
+    def parent_records(self, record):
+        if self.folders[record] != QUEUE_CODE:
+            return []
+        return self.src_records(record)
+
+    def src_records(self, record):
+        instance = self.instances[record]
+        sync = self.syncs[record]
+        if sync:
+            instance = self.instance_names.codes.get(self.strings.values[sync], 0) - 1
+            if instance < 0:
+                return []
+
+        slot = instance * len(FOLDERS) + QUEUE_CODE
+        parents = []
+        for src_value in self.src_values[self.src_offsets[record]:self.src_offsets[record + 1]]:
+            parent = self.lookup_id(slot, src_value)
+            if parent != ABSENT:
+                parents.append(parent)
+        return parents
+
+    def link_children(self):
+        if self.linked == 0:
+            self.build_child_index()
+        else:
+            for record in range(self.linked, len(self.ids)):
+                for parent in self.parent_records(record):
+                    self.extra_children.setdefault(parent, []).append(record)
+        self.linked = len(self.ids)
+
+    def relink(self):
+        self.linked = 0
+        self.link_children()
+
+    def build_child_index(self):
+        self.child_offsets, self.child_values = self.child_index()
+        self.extra_children = {}
+
+    def child_index(self):
+        count = len(self.ids)
+        src_offsets = np.array(self.src_offsets[:count + 1], dtype=np.int64)
+        src_values = np.array(self.src_values[:src_offsets[-1]], dtype=np.int64)
+        edge_records = np.repeat(np.arange(count), np.diff(src_offsets))
+
+        instances = np.array(self.instances[:count], dtype=np.int64)
+        syncs = np.array(self.syncs[:count], dtype=np.int64)
+        if syncs.any():
+            sync_instances = np.array([self.instance_names.codes.get(value, 0) - 1 for value in self.strings.values],
+                                      dtype=np.int64)
+            instances = np.where(syncs > 0, sync_instances[syncs], instances)
+        queued = (np.array(self.folders[:count]) == QUEUE_CODE) & (instances >= 0)
+        queued_edges = queued[edge_records]
+        records, src_values = edge_records[queued_edges], src_values[queued_edges]
+        slots = instances[records] * len(FOLDERS) + QUEUE_CODE
+
+        parents = np.full(len(records), ABSENT, dtype=np.int64)
+        for slot in np.unique(slots).tolist():
+            selected = np.flatnonzero(slots == slot)
+            values = src_values[selected]
+            table = np.array(self.id_records[slot], dtype=np.int64) if slot < len(self.id_records) else parents[:0]
+            dense = (values >= 0) & (values < len(table))
+            parents[selected[dense]] = table[values[dense]]
+            if self.sparse_id_records:
+                for position, value in zip(selected[~dense].tolist(), values[~dense].tolist()):
+                    parents[position] = self.sparse_id_records.get((slot, value), ABSENT)
+
+        linked = parents != ABSENT
+        parents, records = parents[linked], records[linked]
+        order = np.argsort(parents, kind='stable')
+        counts = np.zeros(count + 1, dtype=np.int64)
+        counts[1:] = np.cumsum(np.bincount(parents, minlength=count))
+        return to_array('Q', counts), to_array('q', records[order])
+
+    def child_count(self, record):
+        count = len(self.extra_children.get(record, ()))
+        if record + 1 < len(self.child_offsets):
+            count += self.child_offsets[record + 1] - self.child_offsets[record]
+        return count
+
+    def has_children(self, record):
+        if record + 1 < len(self.child_offsets) and self.child_offsets[record + 1] > self.child_offsets[record]:
+            return True
+        return record in self.extra_children
+
+    def children(self, record, start=0, stop=None):
+        base_count = 0
+        base_start = 0
+        if record + 1 < len(self.child_offsets):
+            base_start = self.child_offsets[record]
+            base_count = self.child_offsets[record + 1] - base_start
+        if stop is None:
+            stop = self.child_count(record)
+
+        result = list(self.child_values[base_start + min(start, base_count):base_start + min(stop, base_count)])
+        if stop > base_count:
+            extra = self.extra_children.get(record, [])
+            result += extra[max(start - base_count, 0):stop - base_count]
+        return result
+
+    def child_row(self, record, child):
+        base_start = 0
+        base_stop = 0
+        if record + 1 < len(self.child_offsets):
+            base_start = self.child_offsets[record]
+            base_stop = self.child_offsets[record + 1]
+        position = bisect_left(self.child_values, child, base_start, base_stop)
+        if position < base_stop and self.child_values[position] == child:
+            return position - base_start
+
+        extra = self.extra_children.get(record, [])
+        position = bisect_left(extra, child)
+        if position < len(extra) and extra[position] == child:
+            return base_stop - base_start + position
+        return None
+
+    def id(self, record):
+        return self.ids[record]
+
+    def folder(self, record):
+        return FOLDERS[self.folders[record]]
+
+    def instance(self, record):
+        return self.instance_names.values[self.instances[record] + 1]
+
+    def subfolder(self, record):
+        return os.path.join(self.instance(record), self.folder(record))
+
+    def filename(self, record):
+        name = self.name_blob[self.name_offsets[record]:self.name_offsets[record + 1]]
+        return name.decode('utf-8', 'surrogateescape')
+
+    def has_src(self, record):
+        return self.src_offsets[record + 1] > self.src_offsets[record]
+
+    def src(self, record):
+        values = self.src_values[self.src_offsets[record]:self.src_offsets[record + 1]]
+        if RAW in values:
+            return self.parsed(record).get('src', [])
+        return list(values)
+
+    def parsed(self, record):
+        return parse_name(self.filename(record), self.folder(record))
+
+    def get(self, record, key, default=None):
+        if key == 'id':
+            return self.ids[record]
+        if key == 'folder':
+            return self.folder(record)
+        if key == 'instance':
+            return self.instance(record)
+        if key == 'filename':
+            return self.filename(record)
+        if key == 'src':
+            return self.src(record) or default
+        if key == 'children':
+            return [self.ids[child] for child in self.children(record)] or default
+        if key in self.int_columns:
+            value = self.int_columns[key][record]
+            if value == ABSENT:
+                return default
+            if value != RAW:
+                return value
+        elif key in self.string_columns:
+            value = self.strings.values[self.string_columns[key][record]]
+            return default if value is None else value
+        return self.parsed(record).get(key, default)
+
+    def record_dict(self, record):
+        file_dict = self.parsed(record)
+        children = self.get(record, 'children')
+        if children:
+            file_dict['children'] = children
+        return file_dict
+
+    def iter_files(self):
+        for record in range(len(self.ids)):
+            yield self.subfolder(record), self.filename(record)
+
+    def subfolder_records(self, subfolder):
+        instance, folder = split_subfolder(subfolder)
+        instance_code = self.instance_names.codes.get(instance)
+        if instance_code is None:
+            return []
+        folder_code = FOLDER_CODES[folder]
+        instance_code -= 1
+        return [record for record in range(len(self.ids))
+                if self.folders[record] == folder_code and self.instances[record] == instance_code]
+
+    def iter_names(self, subfolder):
+        for record in self.subfolder_records(subfolder):
+            yield self.filename(record)
+
+    def folder_count(self, subfolder):
+        return len(self.subfolder_records(subfolder))
+
+    def instance_list(self):
+        return self.instance_names.values[1:]
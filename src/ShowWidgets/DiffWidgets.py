@@ -0,0 +1,223 @@
+import difflib
+import mmap
+import os
+
+import numpy as np
+
+from src.Loaders.Archives import archive_for
+from src.Profiling.Instruments import timed
+from src.ShowWidgets.DumpWidgets import BYTES_PER_ROW, HEX_CELLS, NULL_COLOR, ROWS_PER_PAGE
+
+COMPARE_CHUNK = 1024 * 1024
+DIFF_WINDOW = 4096
+ANCHOR_SIZE = 32
+MAX_ANCHOR_BYTES = 32 * 1024 * 1024
+
+SAME = 0
+CHANGED = 1
+INSERTED = 2
+MARK_COLORS = {CHANGED: '#f0d050', INSERTED: '#60c060'}
+DELETED_COLOR = '#e04040'
+
+
+def map_file(file_path):
+    archive = archive_for(file_path)
+    if archive is not None:
+        data = archive.read(file_path)
+        return np.frombuffer(data, dtype=np.uint8), data
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return np.zeros(0, dtype=np.uint8), None
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return np.frombuffer(data, dtype=np.uint8), data
+
+
+def common_prefix(old, new):
+    size = min(len(old), len(new))
+    for start in range(0, size, COMPARE_CHUNK):
+        stop = min(start + COMPARE_CHUNK, size)
+        mismatch = np.flatnonzero(old[start:stop] != new[start:stop])
+        if len(mismatch):
+            return start + int(mismatch[0])
+    return size
+
+
+def common_suffix(old, new, limit):
+    size = min(len(old), len(new), limit)
+    for start in range(0, size, COMPARE_CHUNK):
+        stop = min(start + COMPARE_CHUNK, size)
+        mismatch = np.flatnonzero(old[len(old) - stop:len(old) - start][::-1] != new[len(new) - stop:len(new) - start][::-1])
+        if len(mismatch):
+            return start + int(mismatch[0])
+    return size
+
+
+def changed_runs(old, new, old_start, new_start):
+    mask = np.concatenate(([False], old != new, [False]))
+    edges = np.flatnonzero(mask[1:] != mask[:-1])
+    opcodes = []
+    for start, stop in zip(edges[::2].tolist(), edges[1::2].tolist()):
+        opcodes.append(('replace', old_start + start, old_start + stop, new_start + start, new_start + stop))
+    return opcodes
+
+
+def window_keys(data):
+    values = data.astype(np.int64)
+    sums = np.concatenate(([0], np.cumsum(values)))
+    weighted = np.concatenate(([0], np.cumsum(values * np.arange(len(values)))))
+    starts = np.arange(len(data) - ANCHOR_SIZE + 1)
+    totals = sums[starts + ANCHOR_SIZE] - sums[starts]
+    moments = weighted[starts + ANCHOR_SIZE] - weighted[starts] - starts * totals
+    return (moments << 16) | totals
+
+
+def anchors(old, new):
+    if min(len(old), len(new)) < ANCHOR_SIZE or max(len(old), len(new)) > MAX_ANCHOR_BYTES:
+        return []
+    old_keys = window_keys(old)[::ANCHOR_SIZE]
+    unique_keys, counts = np.unique(old_keys, return_counts=True)
+    unique_keys = unique_keys[counts == 1]
+    positions = {key: position * ANCHOR_SIZE for position, key in enumerate(old_keys.tolist())}
+
+    new_keys = window_keys(new)
+    candidates = np.flatnonzero(np.isin(new_keys, unique_keys))
+
+    matches = []
+    old_end = new_end = 0
+    for new_position in candidates.tolist():
+        if new_position < new_end:
+            continue
+        old_position = positions[int(new_keys[new_position])]
+        if old_position < old_end:
+            continue
+        length = common_prefix(old[old_position:], new[new_position:])
+        if length < ANCHOR_SIZE:
+            continue
+        back = common_suffix(old[old_end:old_position], new[new_end:new_position], min(old_position - old_end, new_position - new_end))
+        matches.append((old_position - back, new_position - back, length + back))
+        old_end = old_position + length
+        new_end = new_position + length
+    return matches
+
+
+def diff_gap(old, new, old_start, new_start):
+    if not len(old) and not len(new):
+        return []
+    if not len(old):
+        return [('insert', old_start, old_start, new_start, new_start + len(new))]
+    if not len(new):
+        return [('delete', old_start, old_start + len(old), new_start, new_start)]
+    if len(old) == len(new) and np.count_nonzero(old != new) * 2 <= len(old):
+        return changed_runs(old, new, old_start, new_start)
+    if len(old) <= DIFF_WINDOW and len(new) <= DIFF_WINDOW:
+        matcher = difflib.SequenceMatcher(None, old.tobytes(), new.tobytes(), autojunk=False)
+        return [(tag, old_start + i1, old_start + i2, new_start + j1, new_start + j2)
+                for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+    return [('replace', old_start, old_start + len(old), new_start, new_start + len(new))]
+
+
+def diff_bytes(old, new):
+    prefix = common_prefix(old, new)
+    suffix = common_suffix(old[prefix:], new[prefix:], min(len(old), len(new)) - prefix)
+    old_middle = old[prefix:len(old) - suffix]
+    new_middle = new[prefix:len(new) - suffix]
+
+    if len(old_middle) == len(new_middle) or max(len(old_middle), len(new_middle)) <= DIFF_WINDOW:
+        return diff_gap(old_middle, new_middle, prefix, prefix)
+
+    opcodes = []
+    old_end = new_end = 0
+    for old_position, new_position, length in anchors(old_middle, new_middle):
+        opcodes.extend(diff_gap(old_middle[old_end:old_position], new_middle[new_end:new_position],
+                                prefix + old_end, prefix + new_end))
+        old_end = old_position + length
+        new_end = new_position + length
+    opcodes.extend(diff_gap(old_middle[old_end:], new_middle[new_end:], prefix + old_end, prefix + new_end))
+    return opcodes
+
+
+class ByteDiff:
+    def __init__(self, file_path, parent_path, parent_label):
+        self.file_path = file_path
+        self.parent_label = parent_label
+        new, self.data = map_file(file_path)
+        old, old_data = map_file(parent_path)
+        self.old_size = len(old)
+        self.size = len(new)
+        try:
+            self.opcodes = diff_bytes(old, new)
+        finally:
+            del new, old
+            if isinstance(old_data, mmap.mmap):
+                old_data.close()
+            if self.data is None:
+                self.data = b''
+
+        self.row_count = (self.size + BYTES_PER_ROW - 1) // BYTES_PER_ROW
+        self.marks = np.zeros(self.size, dtype=np.uint8)
+        self.deletions = {}
+        self.changed = self.inserted = self.deleted = 0
+        for tag, i1, i2, j1, j2 in self.opcodes:
+            if tag == 'replace':
+                self.marks[j1:j2] = CHANGED
+                self.changed += j2 - j1
+                if i2 - i1 > j2 - j1:
+                    self.deletions[j2] = self.deletions.get(j2, 0) + (i2 - i1) - (j2 - j1)
+                    self.deleted += (i2 - i1) - (j2 - j1)
+                elif j2 - j1 > i2 - i1:
+                    self.marks[j1 + (i2 - i1):j2] = INSERTED
+                    self.changed -= (j2 - j1) - (i2 - i1)
+                    self.inserted += (j2 - j1) - (i2 - i1)
+            elif tag == 'insert':
+                self.marks[j1:j2] = INSERTED
+                self.inserted += j2 - j1
+            elif tag == 'delete':
+                self.deletions[j1] = self.deletions.get(j1, 0) + i2 - i1
+                self.deleted += i2 - i1
+
+    def summary(self):
+        return (f"vs {self.parent_label}: {self.old_size} → {self.size} bytes, {len(self.opcodes)} ranges, "
+                f"{self.changed} changed, {self.inserted} inserted, {self.deleted} deleted")
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b''
+
+    def render_cells(self, chunk, marks):
+        cells = []
+        start = 0
+        for i in range(1, len(chunk) + 1):
+            if i == len(chunk) or marks[i] != marks[start]:
+                text = ''.join(HEX_CELLS[b] for b in chunk[start:i])
+                color = MARK_COLORS.get(marks[start])
+                cells.append(f'<span style="background-color:{color}">{text}</span>' if color else text)
+                start = i
+        return ''.join(cells)
+
+    def render_row(self, row):
+        offset = row * BYTES_PER_ROW
+        chunk = self.data[offset:offset + BYTES_PER_ROW]
+        marks = self.marks[offset:offset + BYTES_PER_ROW].tolist()
+        stop = offset + len(chunk) + (row >= self.row_count - 1)
+        deleted = [(position, self.deletions[position]) for position in range(offset, stop) if position in self.deletions]
+        text = f'<font color="{NULL_COLOR}">{offset:08x}</font>&nbsp;&nbsp;' + self.render_cells(chunk, marks)
+        if deleted:
+            notes = ', '.join(f'-{count}@{position:x}' for position, count in deleted)
+            text += f'&nbsp;<font color="{DELETED_COLOR}">{notes}</font>'
+        return text
+
+    def render_rows(self, start_row, row_count=ROWS_PER_PAGE):
+        end_row = min(start_row + row_count, max(self.row_count, 1))
+        return '<br>'.join(self.render_row(row) for row in range(start_row, end_row))
+
+
+@timed('diff_parents', 'selection')
+def diff_parents(file_path, parents):
+    diffs = []
+    for parent_path, parent_label in parents:
+        try:
+            diffs.append(ByteDiff(file_path, parent_path, parent_label))
+        except (OSError, ValueError) as e:
+            diffs.append(f"Error comparing with {parent_label}: {e}")
+    return diffs
@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_BYTE_BUDGET = 32 * 1024 * 1024
+
+
+class DumpCache:
+    def __init__(self, byte_budget=DEFAULT_BYTE_BUDGET):
+        self.byte_budget = byte_budget
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def contains(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def put(self, key, value):
+        size = len(value)
+        if size > self.byte_budget:
+            return
+
+        with self.lock:
+            old_value = self.entries.pop(key, None)
+            if old_value is not None:
+                self.total_bytes -= len(old_value)
+
+            self.entries[key] = value
+            self.total_bytes += size
+
+            while self.total_bytes > self.byte_budget:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats_text(self):
+        with self.lock:
+            return (f"Dump cache: {self.hits} hits, {self.misses} misses, "
+                    f"{len(self.entries)} entries, "
+                    f"{self.total_bytes // 1024} / {self.byte_budget // 1024} KiB")
@@ -1,18 +1,136 @@
+import mmap
 import os
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+
+from src.Loaders.Archives import archive_for
+from src.Profiling.Instruments import timed
+from src.ShowWidgets.DumpCache import DumpCache
+
+BYTES_PER_ROW = 16
+ROWS_PER_PAGE = 64
+
+NULL_COLOR = '#808080'
+PRINTABLE_COLOR = '#00a0a0'
+WHITESPACE_COLOR = '#00a000'
+ASCII_OTHER_COLOR = '#a000a0'
+NON_ASCII_COLOR = '#a0a000'
+
+
+def byte_style(byte):
+    if byte == 0:
+        return NULL_COLOR, '0'
+    if byte in b' \t\n\r\x0b\x0c':
+        return WHITESPACE_COLOR, '_'
+    if 0x20 < byte < 0x7f:
+        return PRINTABLE_COLOR, escape(chr(byte))
+    if byte < 0x80:
+        return ASCII_OTHER_COLOR, '&bull;'
+    return NON_ASCII_COLOR, '&times;'
+
+
+BYTE_COLORS = []
+HEX_CELLS = []
+ASCII_CELLS = []
+for value in range(256):
+    color, char = byte_style(value)
+    BYTE_COLORS.append(color)
+    HEX_CELLS.append(f'{value:02x}&nbsp;')
+    ASCII_CELLS.append(char)
+
+
+def colorize(chunk, cells):
+    runs = []
+    start = 0
+    for i in range(1, len(chunk) + 1):
+        if i == len(chunk) or BYTE_COLORS[chunk[i]] != BYTE_COLORS[chunk[start]]:
+            text = ''.join(cells[b] for b in chunk[start:i])
+            runs.append(f'<font color="{BYTE_COLORS[chunk[start]]}">{text}</font>')
+            start = i
+    return ''.join(runs)
+
+
+class HexDump:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.first_page = None
+        self.data = b''
+        archive = archive_for(file_path)
+        if archive is not None:
+            self.data = archive.read(file_path)
+            self.size = len(self.data)
+            self.cache_key = (file_path, self.size, archive.mtime_ns)
+        else:
+            stat = os.stat(file_path)
+            self.size = stat.st_size
+            self.cache_key = (file_path, stat.st_size, stat.st_mtime_ns)
+        if self.size and archive is None:
+            with open(file_path, 'rb') as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.size = len(self.data)
+        self.row_count = (self.size + BYTES_PER_ROW - 1) // BYTES_PER_ROW
+
+    def render_row(self, row):
+        offset = row * BYTES_PER_ROW
+        chunk = self.data[offset:offset + BYTES_PER_ROW]
+        half = BYTES_PER_ROW // 2
+        padding = '&nbsp;' * (3 * (BYTES_PER_ROW - len(chunk)))
+        return (f'<font color="{NULL_COLOR}">{offset:08x}</font>&nbsp;&nbsp;'
+                + colorize(chunk[:half], HEX_CELLS) + '&nbsp;' + colorize(chunk[half:], HEX_CELLS)
+                + padding + '&nbsp;' + colorize(chunk, ASCII_CELLS))
+
+    def render_rows(self, start_row, row_count=ROWS_PER_PAGE):
+        if start_row == 0 and row_count == ROWS_PER_PAGE and self.first_page is not None:
+            return self.first_page
+        end_row = min(start_row + row_count, self.row_count)
+        return '<br>'.join(self.render_row(row) for row in range(start_row, end_row))
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b''
 
 
 class DumpWidgets:
-    @staticmethod
-    def generate_hex_dump(file_path):
-        if not os.path.isfile(file_path):
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else DumpCache()
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dump-prefetch')
+        self.prefetch_futures = []
+
+    @timed('generate_hex_dump', 'selection')
+    def generate_hex_dump(self, file_path):
+        if archive_for(file_path) is None and not os.path.isfile(file_path):
             return f"Error: File '{file_path}' does not exist"
 
         try:
-            command = f"hexyl {file_path} 2>&1 | ./terminal-to-html-3.14.0-linux-amd64 -preview"
-            result = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            if result.returncode != 0:
-                return f"Error: {result.stderr}"
-            return result.stdout
-        except Exception as e:
-            return str(e)
+            hex_dump = HexDump(file_path)
+        except (OSError, ValueError) as e:
+            return f"Error: {e}"
+
+        first_page = self.cache.get(hex_dump.cache_key)
+        if first_page is None:
+            first_page = hex_dump.render_rows(0)
+            self.cache.put(hex_dump.cache_key, first_page)
+        hex_dump.first_page = first_page
+        return hex_dump
+
+    def warm(self, file_path):
+        try:
+            hex_dump = HexDump(file_path)
+        except (OSError, ValueError):
+            return
+        try:
+            if not self.cache.contains(hex_dump.cache_key):
+                self.cache.put(hex_dump.cache_key, hex_dump.render_rows(0))
+        finally:
+            hex_dump.close()
+
+    def prefetch(self, file_paths):
+        for future in self.prefetch_futures:
+            future.cancel()
+        self.prefetch_futures = [self.prefetch_executor.submit(self.warm, file_path) for file_path in file_paths]
+
+    def shutdown(self):
+        for future in self.prefetch_futures:
+            future.cancel()
+        self.prefetch_executor.shutdown(wait=False)
@@ -0,0 +1,115 @@
+import numpy as np
+from PyQt5.QtCore import QPointF, QRectF, Qt
+from PyQt5.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt5.QtWidgets import QWidget
+
+MARGIN_LEFT = 64
+MARGIN_RIGHT = 12
+MARGIN_TOP = 18
+MARGIN_BOTTOM = 18
+MARK_HEIGHT = 6
+AXIS_COLOR = '#808080'
+CURVE_COLORS = ['#2060c0', '#d07020', '#20a040', '#a03080']
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 86400:
+        return f"{seconds // 86400}d {seconds % 86400 // 3600:02d}h"
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def format_value(value):
+    if abs(value) >= 1e9:
+        return f"{value / 1e9:.1f}G"
+    if abs(value) >= 1e6:
+        return f"{value / 1e6:.1f}M"
+    if abs(value) >= 1e4:
+        return f"{value / 1e3:.0f}k"
+    if value == int(value) or abs(value) >= 100:
+        return f"{value:.0f}"
+    return f"{value:.2f}"
+
+
+def pixel_columns(xs, lows, highs, lasts, width):
+    columns = np.clip(xs.astype(np.int64), 0, max(width - 1, 0))
+    starts = np.flatnonzero(np.concatenate(([True], columns[1:] != columns[:-1])))
+    if len(starts) == len(xs):
+        return xs, lows, highs, lasts
+    ends = np.concatenate((starts[1:], [len(xs)])) - 1
+    return (xs[ends], np.minimum.reduceat(lows, starts), np.maximum.reduceat(highs, starts), lasts[ends])
+
+
+def polygon(xs, ys):
+    return QPolygonF([QPointF(x, y) for x, y in zip(xs.tolist(), ys.tolist())])
+
+
+class TimeSeriesPlot(QWidget):
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.curves = []
+        self.marks = None
+        self.duration = 0
+        self.setMinimumHeight(110)
+
+    def set_data(self, curves, duration, marks=None):
+        self.curves = [curve for curve in curves if curve is not None and len(curve[0])]
+        self.duration = duration
+        self.marks = marks
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        area = QRectF(MARGIN_LEFT, MARGIN_TOP, max(self.width() - MARGIN_LEFT - MARGIN_RIGHT, 1),
+                      max(self.height() - MARGIN_TOP - MARGIN_BOTTOM, 1))
+        painter.setPen(QPen(QColor(AXIS_COLOR)))
+        painter.drawRect(area)
+
+        title = self.title
+        if self.curves:
+            title += ": " + ", ".join(curve[4] for curve in self.curves)
+        painter.drawText(QRectF(0, 0, self.width(), MARGIN_TOP), Qt.AlignCenter, title)
+        if not self.curves or self.duration <= 0:
+            painter.drawText(area, Qt.AlignCenter, "No data")
+            return
+
+        low = min(float(np.nanmin(curve[1])) for curve in self.curves)
+        high = max(float(np.nanmax(curve[2])) for curve in self.curves)
+        if high <= low:
+            high = low + 1
+        painter.drawText(QRectF(0, area.top() - 6, MARGIN_LEFT - 4, 12), Qt.AlignRight | Qt.AlignVCenter,
+                         format_value(high))
+        painter.drawText(QRectF(0, area.bottom() - 6, MARGIN_LEFT - 4, 12), Qt.AlignRight | Qt.AlignVCenter,
+                         format_value(low))
+        painter.drawText(QRectF(area.left(), area.bottom(), area.width(), MARGIN_BOTTOM), Qt.AlignRight,
+                         format_duration(self.duration))
+        painter.drawText(QRectF(area.left(), area.bottom(), area.width(), MARGIN_BOTTOM), Qt.AlignLeft, "0")
+
+        x_scale = area.width() / self.duration
+        y_scale = area.height() / (high - low)
+        for position, (times, lows, highs, lasts, _) in enumerate(self.curves):
+            xs, lows, highs, lasts = pixel_columns(times * x_scale, lows, highs, lasts, int(area.width()))
+            xs = xs + area.left()
+            color = QColor(CURVE_COLORS[position % len(CURVE_COLORS)])
+            if np.any(highs > lows):
+                band = QColor(color)
+                band.setAlpha(60)
+                painter.setPen(Qt.NoPen)
+                painter.setBrush(band)
+                painter.drawPolygon(polygon(np.concatenate((xs, xs[::-1])),
+                                            area.bottom() - (np.concatenate((highs, lows[::-1])) - low) * y_scale))
+            painter.setBrush(Qt.NoBrush)
+            painter.setPen(QPen(color, 1.5))
+            painter.drawPolyline(polygon(xs, area.bottom() - (lasts - low) * y_scale))
+
+        if self.marks is not None and len(self.marks):
+            painter.setPen(QPen(QColor('#d02020')))
+            xs = np.unique(np.clip((self.marks * x_scale).astype(np.int64), 0, int(area.width()))) + area.left()
+            for x in xs.tolist():
+                painter.drawLine(QPointF(x, area.bottom()), QPointF(x, area.bottom() - MARK_HEIGHT))
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from src.Profiling.Instruments import count
+
+DEFAULT_WORKERS = 3
+
+
+def discard(result):
+    close = getattr(result, 'close', None)
+    if close:
+        close()
+    elif isinstance(result, list):
+        for item in result:
+            discard(item)
+
+
+class SelectionJobs(QObject):
+    finished = pyqtSignal(int, str, object)
+
+    def __init__(self, workers=DEFAULT_WORKERS, parent=None):
+        super().__init__(parent)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='selection')
+        self.generation = 0
+        self.futures = []
+        self.dropped = 0
+
+    def begin(self):
+        for future in self.futures:
+            if future.cancel():
+                self.dropped += 1
+                count('selection_dropped')
+        self.futures = []
+        self.generation += 1
+        return self.generation
+
+    def submit(self, kind, function, *args):
+        self.futures.append(self.executor.submit(self.run, self.generation, kind, function, args))
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def run(self, generation, kind, function, args):
+        if generation != self.generation:
+            self.dropped += 1
+            count('selection_dropped')
+            return
+        try:
+            result = function(*args)
+        except Exception as e:
+            result = f"Error: {e}"
+        if generation != self.generation:
+            self.dropped += 1
+            count('selection_dropped')
+            discard(result)
+            return
+        self.finished.emit(generation, kind, result)
+
+    def shutdown(self):
+        self.begin()
+        self.executor.shutdown(wait=False)
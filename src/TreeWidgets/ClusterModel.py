@@ -0,0 +1,70 @@
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, Qt
+
+HEADERS = ["Cluster", "Size"]
+
+
+class ClusterModel(QAbstractItemModel):
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.clusters = []
+
+    def set_clusters(self, clusters):
+        self.beginResetModel()
+        self.clusters = clusters
+        self.endResetModel()
+
+    def record(self, index):
+        if not index.isValid():
+            return None
+        cluster = index.internalId()
+        if cluster:
+            return self.clusters[cluster - 1][index.row()]
+        return self.clusters[index.row()][0]
+
+    def label(self, record):
+        return f"{self.store.subfolder(record)}:{self.store.id(record)}"
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if parent.isValid():
+            return self.createIndex(row, column, parent.row() + 1)
+        return self.createIndex(row, column, 0)
+
+    def parent(self, index):
+        if not index.isValid() or not index.internalId():
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self.clusters)
+        if parent.internalId() or parent.column() != 0:
+            return 0
+        members = self.clusters[parent.row()]
+        return len(members) if len(members) > 1 else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        return self.rowCount(parent) > 0
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        cluster = index.internalId()
+        if cluster:
+            if index.column() == 0:
+                return self.label(self.clusters[cluster - 1][index.row()])
+            return None
+        members = self.clusters[index.row()]
+        if index.column() == 0:
+            return f"#{index.row() + 1} {self.label(members[0])}"
+        return str(len(members))
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[section]
+        return None
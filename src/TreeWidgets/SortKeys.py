@@ -0,0 +1,242 @@
+from bisect import bisect_right
+
+import numpy as np
+
+from src.Profiling.Instruments import span
+from src.Records.RecordStore import ABSENT
+from src.ShowWidgets.PlotWidgets import format_duration
+
+SORT_FIELDS = ['id', 'src', 'folder', 'time', 'execs', 'op', 'size', 'descendants', 'dups']
+HASH_FIELDS = ('size', 'dups')
+GROUP_MODES = [(None, "No grouping"), ('op', "Group by op"), ('time', "Group by time window")]
+GROUP_MIN_CHILDREN = 64
+MAX_TIME_BUCKETS = 24
+TIME_WINDOWS = [1000, 10000, 60000, 600000, 3600000, 6 * 3600000, 86400000, 7 * 86400000]
+
+
+def column_values(column, start, stop):
+    return np.array(column[start:stop], dtype=np.int64)
+
+
+def padded_values(column, start, stop, fill):
+    values = np.full(stop - start, fill, dtype=np.int64)
+    head = column_values(column, start, min(stop, len(column)))
+    values[:len(head)] = head
+    return values
+
+
+class SortKeys:
+    def __init__(self, store, lineage, hashes=None):
+        self.store = store
+        self.lineage = lineage
+        self.hashes = hashes
+        self.reset()
+
+    def reset(self):
+        self.orders = {}
+        self.keys = {}
+        self.ranks = {}
+        self.versions = {}
+
+    def available(self, field):
+        return field not in HASH_FIELDS or self.hashes is not None
+
+    def version(self, field):
+        if field == 'op':
+            return len(self.store.strings.values)
+        if field == 'descendants':
+            self.lineage.update()
+            return len(self.lineage)
+        if field in HASH_FIELDS:
+            return self.hashes.hashed
+        return 0
+
+    def values(self, field, start, stop):
+        store = self.store
+        if field == 'id':
+            return column_values(store.ids, start, stop)
+        if field == 'folder':
+            return column_values(store.folders, start, stop)
+        if field in store.int_columns:
+            return column_values(store.int_columns[field], start, stop)
+        if field == 'op':
+            strings = store.strings.values
+            ranks = np.full(len(strings), ABSENT, dtype=np.int64)
+            ranks[sorted(range(1, len(strings)), key=strings.__getitem__)] = np.arange(len(strings) - 1)
+            return ranks[column_values(store.ops, start, stop)]
+        if field == 'src':
+            offsets = column_values(store.src_offsets, start, stop + 1)
+            values = np.full(stop - start, ABSENT, dtype=np.int64)
+            present = np.flatnonzero(offsets[1:] > offsets[:-1])
+            if len(present):
+                firsts = offsets[present]
+                src_values = column_values(store.src_values, int(firsts.min()), int(firsts.max()) + 1)
+                values[present] = src_values[firsts - firsts.min()]
+            return values
+        if field == 'descendants':
+            return column_values(self.lineage.sizes, start, stop)
+        if field == 'size':
+            return padded_values(self.hashes.sizes, start, stop, ABSENT)
+        groups = padded_values(self.hashes.groups, start, stop, ABSENT)
+        group_sizes = np.append(column_values(self.hashes.group_sizes, 0, len(self.hashes.group_sizes)), 0)
+        return group_sizes[groups]
+
+    def refresh(self, field):
+        count = len(self.store)
+        version = self.version(field)
+        order = self.orders.get(field)
+        if order is not None and self.versions[field] == version:
+            if len(order) == count:
+                return
+            with span('sort_keys_merge'):
+                start = len(order)
+                keys = self.values(field, start, count)
+                local = np.argsort(keys, kind='stable')
+                new_keys = keys[local]
+                positions = np.searchsorted(self.keys[field], new_keys, side='right')
+                order = np.insert(order, positions, local + start)
+                sorted_keys = np.insert(self.keys[field], positions, new_keys)
+        else:
+            with span('sort_keys_build'):
+                keys = self.values(field, 0, count)
+                order = np.argsort(keys, kind='stable')
+                sorted_keys = keys[order]
+
+        ranks = np.empty(count, dtype=np.int64)
+        ranks[order] = np.arange(count)
+        self.orders[field] = order
+        self.keys[field] = sorted_keys
+        self.ranks[field] = ranks
+        self.versions[field] = version
+
+    def sort(self, field, records, reverse=False):
+        self.refresh(field)
+        records = np.array(records, dtype=np.int64)
+        ordered = self.orders[field][np.sort(self.ranks[field][records])]
+        if reverse:
+            ordered = ordered[::-1]
+        return ordered.tolist()
+
+    def insert(self, field, records, new_records, reverse=False):
+        new_records = np.array(new_records, dtype=np.int64)
+        if field is None:
+            old_keys = np.array(records, dtype=np.int64)
+            new_records = new_keys = np.sort(new_records)
+        else:
+            self.refresh(field)
+            old_keys = self.ranks[field][np.array(records, dtype=np.int64)]
+            new_keys = np.sort(self.ranks[field][new_records])
+            new_records = self.orders[field][new_keys]
+        if reverse:
+            old_keys, new_keys, new_records = -old_keys, -new_keys[::-1], new_records[::-1]
+        positions = np.searchsorted(old_keys, new_keys)
+        merged = np.insert(np.array(records, dtype=np.int64), positions, new_records)
+        return merged.tolist(), (positions + np.arange(len(positions))).tolist()
+
+
+class Bucket:
+    __slots__ = ('key', 'label', 'row', 'records', 'nodes', 'rows')
+
+    def __init__(self, key, label, row, records):
+        self.key = key
+        self.label = label
+        self.row = row
+        self.records = records
+        self.nodes = []
+        self.rows = None
+
+    def set_records(self, records):
+        self.records = records
+        self.rows = None
+
+    def record_row(self, record):
+        if self.rows is None:
+            self.rows = {child: row for row, child in enumerate(self.records)}
+        return self.rows.get(record)
+
+
+class Grouping:
+    def __init__(self, store, mode, records):
+        self.store = store
+        self.mode = mode
+        self.window = self.time_window(records) if mode == 'time' else None
+        self.buckets = []
+        self.bucket_keys = {}
+
+        records = np.array(records, dtype=np.int64)
+        keys = self.record_keys(records)
+        order = np.argsort(keys, kind='stable')
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+        stops = np.append(starts[1:], len(order))
+        grouped = records[order]
+        parts = [(int(key), grouped[start:stop].tolist())
+                 for key, start, stop in zip(unique_keys.tolist(), starts.tolist(), stops.tolist())]
+        if mode == 'op':
+            parts.sort(key=lambda part: self.label(part[0]))
+        for key, bucket_records in parts:
+            self.new_bucket(key, bucket_records)
+
+    def time_window(self, records):
+        times = column_values(self.store.times, 0, len(self.store.times))[np.array(records, dtype=np.int64)]
+        times = times[times >= 0]
+        span_ms = int(times.max() - times.min()) if len(times) else 0
+        for window in TIME_WINDOWS:
+            if span_ms // window < MAX_TIME_BUCKETS:
+                return window
+        return TIME_WINDOWS[-1]
+
+    def record_keys(self, records):
+        if self.mode == 'op':
+            return column_values(self.store.ops, 0, len(self.store.ops))[records]
+        times = column_values(self.store.times, 0, len(self.store.times))[records]
+        return np.where(times >= 0, times // self.window, ABSENT)
+
+    def record_key(self, record):
+        if self.mode == 'op':
+            return self.store.ops[record]
+        time = self.store.times[record]
+        return time // self.window if time >= 0 else ABSENT
+
+    def label(self, key):
+        if self.mode == 'op':
+            return self.store.strings.values[key] or "(no op)"
+        if key == ABSENT:
+            return "(no time)"
+        return f"{format_duration(key * self.window // 1000)} – {format_duration((key + 1) * self.window // 1000)}"
+
+    def bucket_order(self, key):
+        return self.label(key) if self.mode == 'op' else key
+
+    def new_bucket(self, key, records):
+        bucket = Bucket(key, self.label(key), len(self.buckets), records)
+        self.buckets.append(bucket)
+        self.bucket_keys[key] = bucket
+        return bucket
+
+    def bucket_for(self, record):
+        return self.bucket_keys.get(self.record_key(record))
+
+    def add(self, records, insert):
+        added = {}
+        for record, key in zip(records, self.record_keys(np.array(records, dtype=np.int64)).tolist()):
+            added.setdefault(key, []).append(record)
+
+        changed = []
+        new_buckets = []
+        for key, bucket_records in added.items():
+            bucket = self.bucket_keys.get(key)
+            if bucket is None:
+                orders = [self.bucket_order(bucket.key) for bucket in self.buckets]
+                bucket = Bucket(key, self.label(key), bisect_right(orders, self.bucket_order(key)),
+                                insert([], bucket_records)[0])
+                self.buckets.insert(bucket.row, bucket)
+                self.bucket_keys[key] = bucket
+                new_buckets.append(bucket)
+            else:
+                merged, positions = insert(bucket.records, bucket_records)
+                bucket.set_records(merged)
+                changed.append((bucket, positions))
+
+        for row, bucket in enumerate(self.buckets):
+            bucket.row = row
+        return changed, sorted(bucket.row for bucket in new_buckets)
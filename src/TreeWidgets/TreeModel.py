@@ -0,0 +1,471 @@
+from bisect import bisect_left
+
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, Qt
+
+from src.Profiling.Instruments import timed
+from src.Records.RecordStore import FOLDER_CODES
+from src.ShowWidgets.PlotWidgets import format_duration
+from src.TreeWidgets.SortKeys import GROUP_MIN_CHILDREN, SORT_FIELDS, Bucket, Grouping, SortKeys
+
+FETCH_BATCH = 256
+HEADERS = ["ID", "Src", "Index", "Time", "Execs", "Op", "Size", "Descendants", "Dups"]
+INDEX_MAP = {'queue': 'Q', 'crashes': 'C', 'hangs': 'H'}
+RecordRole = Qt.UserRole + 1
+QUEUE_CODE = FOLDER_CODES['queue']
+
+
+class TreeNode:
+    __slots__ = ('record', 'parent', 'row', 'children', 'bucket')
+
+    def __init__(self, record, parent, row, bucket=None):
+        self.record = record
+        self.parent = parent
+        self.row = row
+        self.children = []
+        self.bucket = bucket
+
+
+class TreeModel(QAbstractItemModel):
+    def __init__(self, store, lineage, hashes=None, instance=None, parent=None, sort_keys=None, group_mode=None):
+        super().__init__(parent)
+        self.store = store
+        self.lineage = lineage
+        self.hashes = hashes
+        self.instance = instance
+        self.sort_keys = sort_keys or SortKeys(store, lineage, hashes)
+        self.group_mode = group_mode
+        self.filtered_children = {}
+        self.sort_field = None
+        self.sort_reverse = False
+        self.ordered_children = {}
+        self.sorted_rows = {}
+        self.groupings = {}
+        self.inserting = False
+        self.root = TreeNode(None, None, 0)
+        self.record_nodes = {}
+        self.top_level_records, _ = self.build_links(range(len(store)))
+        self.top_level_set = set(self.top_level_records)
+
+    def visible(self, record):
+        return self.instance is None or self.store.instances[record] == self.instance
+
+    def view_parents(self, record):
+        if self.store.folders[record] != QUEUE_CODE or not self.store.has_src(record):
+            return []
+        return [parent for parent in self.store.parent_records(record) if self.visible(parent)]
+
+    def build_links(self, records):
+        new_top_level = []
+        new_children = {}
+
+        for record in records:
+            if not self.visible(record):
+                continue
+            parents = self.view_parents(record)
+            if not parents:
+                new_top_level.append(record)
+            for parent_record in parents:
+                new_children.setdefault(parent_record, []).append(record)
+
+        return new_top_level, new_children
+
+    @timed('tree_add_records', 'ui')
+    def add_records(self, records):
+        new_top_level, new_children = self.build_links(records)
+
+        old_count = len(self.top_level_records)
+        self.top_level_records.extend(new_top_level)
+        self.top_level_set.update(new_top_level)
+        self.append_children(None, new_top_level, old_count, [self.root])
+
+        for parent_record, children in new_children.items():
+            self.filtered_children.pop(parent_record, None)
+            old_count = self.store_child_count(parent_record) - len(children)
+            self.append_children(parent_record, children, old_count, self.record_nodes.get(parent_record, []))
+
+    def append_children(self, record, children, old_count, nodes):
+        rows = range(old_count, old_count + len(children))
+        if record in self.ordered_children:
+            self.ordered_children[record], rows = self.insert_records(self.ordered_children[record], children)
+            self.sorted_rows.pop(record, None)
+        grouping = self.groupings.get(record)
+        if grouping is not None:
+            changed, rows = grouping.add(children, self.insert_records)
+            for bucket, bucket_rows in changed:
+                for node in bucket.nodes:
+                    self.show_inserted(node, bucket_rows)
+        for node in nodes:
+            self.show_inserted(node, rows)
+
+    def insert_records(self, records, new_records):
+        return self.sort_keys.insert(self.sort_field, records, new_records, self.sort_reverse)
+
+    def show_inserted(self, node, rows):
+        if not rows:
+            return
+        parent = self.node_index(node)
+        old_count = self.child_count(node) - len(rows)
+        if old_count == 0 and node is not self.root:
+            self.dataChanged.emit(parent, parent)
+            return
+        fetched = len(node.children) == old_count
+
+        position = 0
+        while position < len(rows) and rows[position] < len(node.children):
+            start = stop = rows[position]
+            while position + 1 < len(rows) and rows[position + 1] == stop + 1:
+                position += 1
+                stop += 1
+            position += 1
+            entries = self.child_records(node, start, stop + 1)
+            self.inserting = True
+            self.beginInsertRows(parent, start, stop)
+            node.children[start:start] = [self.new_node(entry, node, row) for row, entry in enumerate(entries, start)]
+            for row in range(stop + 1, len(node.children)):
+                node.children[row].row = row
+            self.endInsertRows()
+            self.inserting = False
+        if fetched:
+            self.fetch_rows(parent, FETCH_BATCH)
+
+    def node_index(self, node):
+        if node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def node(self, index):
+        if index.isValid():
+            return index.internalPointer()
+        return self.root
+
+    def visible_children(self, record):
+        children = self.filtered_children.get(record)
+        if children is None:
+            children = [child for child in self.store.children(record) if self.visible(child)]
+            self.filtered_children[record] = children
+        return children
+
+    def store_child_count(self, record):
+        if self.instance is None:
+            return self.store.child_count(record)
+        return len(self.visible_children(record))
+
+    def record_child_count(self, record):
+        if record is None:
+            return len(self.top_level_records)
+        return self.store_child_count(record)
+
+    def child_count(self, node):
+        if node.bucket is not None:
+            return len(node.bucket.records)
+        grouping = self.grouping(node.record)
+        if grouping is not None:
+            return len(grouping.buckets)
+        return self.record_child_count(node.record)
+
+    def natural_records(self, record):
+        if record is None:
+            return self.top_level_records
+        if self.instance is not None:
+            return self.visible_children(record)
+        return self.store.children(record)
+
+    def sort_records(self, records):
+        if self.sort_field is None:
+            return sorted(records)
+        return self.sort_keys.sort(self.sort_field, records, self.sort_reverse)
+
+    def ordered_records(self, record):
+        if self.sort_field is None:
+            return self.natural_records(record)
+        records = self.ordered_children.get(record)
+        if records is None:
+            records = self.ordered_children[record] = self.sort_records(self.natural_records(record))
+        return records
+
+    def grouping(self, record):
+        if self.group_mode is None:
+            return None
+        if record not in self.groupings:
+            grouping = None
+            if self.record_child_count(record) >= GROUP_MIN_CHILDREN:
+                grouping = Grouping(self.store, self.group_mode, self.ordered_records(record))
+            self.groupings[record] = grouping
+        return self.groupings[record]
+
+    def child_row(self, node, record):
+        if node.bucket is not None:
+            return node.bucket.record_row(record)
+        grouping = self.grouping(node.record)
+        if grouping is not None:
+            bucket = grouping.bucket_for(record)
+            return None if bucket is None else bucket.row
+        if self.sort_field is not None:
+            rows = self.sorted_rows.get(node.record)
+            if rows is None:
+                rows = {child: row for row, child in enumerate(self.ordered_records(node.record))}
+                self.sorted_rows[node.record] = rows
+            return rows.get(record)
+        if node is self.root or self.instance is not None:
+            records = self.top_level_records if node is self.root else self.visible_children(node.record)
+            row = bisect_left(records, record)
+            if row < len(records) and records[row] == record:
+                return row
+            return None
+        return self.store.child_row(node.record, record)
+
+    def child_records(self, node, start=0, stop=None):
+        if node.bucket is not None:
+            return node.bucket.records[start:stop]
+        grouping = self.grouping(node.record)
+        if grouping is not None:
+            return grouping.buckets[start:stop]
+        if self.sort_field is not None:
+            return self.ordered_records(node.record)[start:stop]
+        if node is self.root:
+            return self.top_level_records[start:stop]
+        if self.instance is not None:
+            return self.visible_children(node.record)[start:stop]
+        return self.store.children(node.record, start, stop)
+
+    def record(self, index):
+        node = self.node(index)
+        if node is self.root:
+            return None
+        return node.record
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = parent.internalPointer() if parent.isValid() else self.root
+        if row < 0 or row >= len(node.children) or column < 0 or column >= len(HEADERS):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.node_index(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self.top_level_records)
+        if parent.column() > 0:
+            return False
+        if parent.internalPointer().bucket is not None:
+            return bool(parent.internalPointer().bucket.records)
+        if self.instance is not None:
+            return self.store_child_count(parent.internalPointer().record) > 0
+        return self.store.has_children(parent.internalPointer().record)
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        return not self.inserting and len(node.children) < self.child_count(node)
+
+    def fetchMore(self, parent):
+        if not self.inserting:
+            self.fetch_rows(parent, FETCH_BATCH)
+
+    def fetch_rows(self, parent, count):
+        node = self.node(parent)
+        first = len(node.children)
+        records = self.child_records(node, first, first + count)
+        if not records:
+            return
+
+        self.inserting = True
+        self.beginInsertRows(parent, first, first + len(records) - 1)
+        for row, record in enumerate(records, first):
+            node.children.append(self.new_node(record, node, row))
+        self.endInsertRows()
+        self.inserting = False
+
+    def new_node(self, entry, parent, row):
+        if isinstance(entry, Bucket):
+            node = TreeNode(None, parent, row, entry)
+            entry.nodes.append(node)
+        else:
+            node = TreeNode(entry, parent, row)
+            self.record_nodes.setdefault(entry, []).append(node)
+        return node
+
+    def detach(self, node):
+        node.row = -1
+        if node.bucket is not None:
+            node.bucket.nodes.remove(node)
+        else:
+            nodes = self.record_nodes[node.record]
+            nodes.remove(node)
+            if not nodes:
+                del self.record_nodes[node.record]
+        for child in node.children:
+            self.detach(child)
+
+    def relayout(self, node, pinned):
+        if not node.children:
+            return
+        old_children = {}
+        count = min(len(node.children), FETCH_BATCH)
+        for child in node.children:
+            old_children.setdefault(child.record if child.bucket is None else child.bucket, []).append(child)
+            if child in pinned and child.bucket is None:
+                count = max(count, self.child_row(node, child.record) + 1)
+
+        children = []
+        for row, entry in enumerate(self.child_records(node, 0, count)):
+            reused = old_children.get(entry)
+            child = reused.pop() if reused else self.new_node(entry, node, row)
+            child.row = row
+            children.append(child)
+        for stale in old_children.values():
+            for child in stale:
+                self.detach(child)
+        node.children = children
+        for child in children:
+            self.relayout(child, pinned)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        record = node.record
+
+        if node.bucket is not None:
+            if role == Qt.DisplayRole and index.column() == 0:
+                return f"{node.bucket.label} ({len(node.bucket.records)})"
+            return None
+        if role == Qt.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return str(self.store.id(record))
+            if column == 1:
+                return ', '.join(map(str, self.store.src(record)))
+            if column == 2:
+                return INDEX_MAP[self.store.folder(record)]
+            if column == 3:
+                time = self.store.get(record, 'time')
+                return format_duration(time // 1000) if isinstance(time, int) else str(time or '')
+            if column == 4:
+                return str(self.store.get(record, 'execs', ''))
+            if column == 5:
+                return self.store.get(record, 'op', '')
+            if column == 6:
+                size = self.hashes.file_size(record) if self.hashes is not None else -1
+                return str(size) if size >= 0 else ''
+            if column == 7:
+                return str(self.lineage.descendants(record))
+            if self.hashes is not None and self.hashes.group_size(record) > 1:
+                return str(self.hashes.group_size(record))
+            return ''
+        if role == RecordRole:
+            return index.internalPointer().record
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[section]
+        return None
+
+    @timed('tree_sort', 'ui')
+    def sort(self, column, order=Qt.AscendingOrder):
+        sort_field = SORT_FIELDS[column] if 0 <= column < len(SORT_FIELDS) else 'id'
+        if not self.sort_keys.available(sort_field):
+            sort_field = 'id'
+        sort_reverse = order == Qt.DescendingOrder
+        if sort_field == 'id' and not sort_reverse:
+            sort_field = None
+        if sort_field is None and self.sort_field is None:
+            return
+
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        old_nodes = [(index.internalPointer(), index.column()) for index in old_indexes]
+        pinned = set()
+        for node, _ in old_nodes:
+            while node is not None and node not in pinned:
+                pinned.add(node)
+                node = node.parent
+        self.sort_field = sort_field
+        self.sort_reverse = sort_reverse
+        self.ordered_children = {}
+        self.sorted_rows = {}
+        for grouping in self.groupings.values():
+            if grouping is not None:
+                for bucket in grouping.buckets:
+                    bucket.set_records(self.sort_records(bucket.records))
+        self.relayout(self.root, pinned)
+        self.changePersistentIndexList(old_indexes, [
+            self.createIndex(node.row, column, node) if node.row >= 0 else QModelIndex()
+            for node, column in old_nodes])
+        self.layoutChanged.emit()
+
+    def set_group_mode(self, group_mode):
+        if group_mode == self.group_mode:
+            return
+        self.beginResetModel()
+        self.group_mode = group_mode
+        self.groupings = {}
+        self.root.children = []
+        self.record_nodes = {}
+        self.endResetModel()
+
+    def neighbour_records(self, index, child_limit):
+        node = self.node(index)
+        if node is self.root:
+            return []
+        if node.bucket is not None:
+            return self.child_records(node, 0, child_limit)
+        siblings = self.child_records(node.parent, max(node.row - 1, 0), node.row + 2)
+        records = [record for record in siblings if record != node.record]
+        children = self.child_records(node, 0, child_limit)
+        return records + [child for child in children if not isinstance(child, Bucket)]
+
+    def record_path(self, record):
+        path = [record]
+        seen = {record}
+        while record not in self.top_level_set:
+            parent_record = next(iter(self.view_parents(record)), None)
+            if parent_record is None or parent_record in seen:
+                return None
+            path.append(parent_record)
+            seen.add(parent_record)
+            record = parent_record
+        path.reverse()
+        return path
+
+    def indexes_for_record(self, record):
+        return [self.node_index(node) for node in self.record_nodes.get(record, [])]
+
+    def index_for_record(self, record):
+        nodes = self.record_nodes.get(record)
+        if nodes:
+            return self.node_index(nodes[0])
+
+        path = self.record_path(record)
+        if path is None:
+            return QModelIndex()
+
+        index = QModelIndex()
+        for path_record in path:
+            if self.grouping(self.node(index).record) is not None:
+                index = self.child_index(index, path_record)
+                if not index.isValid():
+                    return QModelIndex()
+            index = self.child_index(index, path_record)
+            if not index.isValid():
+                return QModelIndex()
+        return index
+
+    def child_index(self, index, record):
+        row = self.child_row(self.node(index), record)
+        if row is None:
+            return QModelIndex()
+        if row >= self.rowCount(index):
+            self.fetch_rows(index, row + 1 - self.rowCount(index))
+        return self.index(row, 0, index)